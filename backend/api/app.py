@@ -4,16 +4,21 @@ from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.loader import load_activities
-from api.routes import base, activities
+from api.loader import boot
+from api.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from api.routes import base, activities, gear, webhook
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Application lifespan context: pre-load activities at startup."""
+    """Application lifespan context: make the default athlete servable at startup.
+
+    A current summary is enough for the aggregate endpoints; raw activities are then
+    mapped on first use.
+    """
     try:
-        ok = await to_thread.run_sync(load_activities)
-        print(f"Startup: activities loaded -> {ok}")
+        source = await to_thread.run_sync(boot)
+        print(f"Startup: serving from {source}")
     except Exception as e:
         print(f"Startup: failed to load activities: {e}")
     yield
@@ -34,5 +39,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 app.include_router(base.router)
 app.include_router(activities.router)
+app.include_router(gear.router)
+app.include_router(webhook.router)
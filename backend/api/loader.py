@@ -1,20 +1,237 @@
-"""Load activities from JSON file at startup."""
+"""Per-athlete activity datasets, loaded lazily and kept under a memory budget.
+
+Datasets are memory-mapped snapshots (see strava.snapshot) shared by every worker
+process; a worker re-attaches when another one publishes a newer generation.
+"""
 
-import json
 import os
+import threading
+import time
+from collections import OrderedDict
+
+from api.warmup import scheduler
+from strava.athletes import (
+    DEFAULT_ATHLETE,
+    activities_path,
+    env_path,
+    load_commute_config,
+    load_gear_config,
+    streams_dir,
+    validate_athlete_id,
+)
+from strava.search import SearchIndex
+from strava.snapshot import SnapshotActivities, ensure_snapshot, read_generation, snapshot_path_for
+from strava.storage import open_storage
+from strava.streams import StreamStore
+from strava.summary import Summary, load_summary
+
+DATA_DIR = os.path.abspath(
+    os.environ.get("STRAVA_DATA_DIR", os.path.join(os.path.dirname(__file__), ".."))
+)
+DATA_PATH = activities_path(DATA_DIR)
+
+# Total budget for resident (mapped) datasets
+MEMORY_BUDGET_MB = int(os.environ.get("STRAVA_MEMORY_BUDGET_MB", "512"))
+
+# How often a worker checks whether another process published a newer snapshot
+GENERATION_CHECK_SECONDS = 1.0
+
+
+class Dataset:
+    """One athlete's loaded activities plus the caches derived from them."""
+
+    def __init__(self, athlete_id: str, activities: SnapshotActivities):
+        self.athlete_id = athlete_id
+        self.activities = activities
+        self.size_bytes = activities.size_bytes
+        # The snapshot generation, identical in every worker attached to it
+        self.version = activities.generation
+        self.checked_at = time.monotonic()
+        self._cache: dict = {}
+        self._cache_lock = threading.Lock()
+
+    def cached_value(self, key, default=None):
+        """The value cached under key, without computing it."""
+        return self._cache.get(key, default)
+
+    def cached(self, key, compute):
+        """Return the derived value for key, computing it once for this dataset."""
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        value = compute()
+        with self._cache_lock:
+            return self._cache.setdefault(key, value)
+
+    def cached_items(self) -> list[tuple]:
+        """The (key, value) pairs computed so far."""
+        with self._cache_lock:
+            return list(self._cache.items())
+
+    def prime(self, key, value):
+        """Cache a value derived elsewhere, e.g. patched from the previous version's."""
+        with self._cache_lock:
+            self._cache.setdefault(key, value)
+
+
+class DatasetRegistry:
+    """LRU of athlete datasets, evicting the least recently used beyond the budget."""
+
+    def __init__(self, data_dir: str, memory_budget_bytes: int):
+        self._data_dir = data_dir
+        self._budget = memory_budget_bytes
+        self._datasets: OrderedDict[str, Dataset] = OrderedDict()
+        self._summaries: dict[str, Summary] = {}
+        self._lock = threading.Lock()
+        self._athlete_locks: dict[str, threading.RLock] = {}
+
+    def storage(self, athlete_id: str):
+        """The athlete's JSON, SQLite or journal storage (see STRAVA_STORAGE)."""
+        return open_storage(self._data_dir, athlete_id)
+
+    def env_path(self, athlete_id: str) -> str | None:
+        # None lets StravaAuth use its historical default (.env next to the code, or the environment)
+        if athlete_id == DEFAULT_ATHLETE:
+            return None
+        return env_path(self._data_dir, athlete_id)
+
+    def commute_config(self, athlete_id: str) -> dict:
+        """The athlete's commute.json settings ({} for the config.py defaults)."""
+        return load_commute_config(self._data_dir, athlete_id)
+
+    def gear_config(self, athlete_id: str) -> dict:
+        """The athlete's gear.json names and service intervals ({} for the defaults)."""
+        return load_gear_config(self._data_dir, athlete_id)
 
-DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'activities.json'))
+    def streams(self, athlete_id: str, client=None) -> StreamStore:
+        """The athlete's activity streams, downloaded on demand when client is given."""
+        return StreamStore(streams_dir(self._data_dir, athlete_id), client)
 
-_activities: list[dict] = []
+    def athlete_lock(self, athlete_id: str) -> threading.RLock:
+        """Lock serialising loads and syncs of a single athlete."""
+        with self._lock:
+            return self._athlete_locks.setdefault(athlete_id, threading.RLock())
 
+    def peek(self, athlete_id: str) -> Dataset | None:
+        """The athlete's dataset if it is already resident, without loading anything."""
+        with self._lock:
+            return self._datasets.get(athlete_id)
 
-def load_activities() -> bool:
-    global _activities
-    with open(DATA_PATH) as f:
-        _activities = json.load(f)
-    print(f"Loaded {len(_activities)} activities from {DATA_PATH}")
+    def summary(self, athlete_id: str) -> Summary | None:
+        """The precomputed summary written at the last save, if it is still current."""
+        validate_athlete_id(athlete_id)
+        path = self.storage(athlete_id).path
+        current = self._summaries.get(athlete_id)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if current is not None and current.source == (st.st_mtime_ns, st.st_size):
+            return current
+        summary = load_summary(path)
+        with self._lock:
+            if summary is None:
+                self._summaries.pop(athlete_id, None)
+            else:
+                self._summaries[athlete_id] = summary
+        return summary
+
+    def get(self, athlete_id: str) -> Dataset:
+        validate_athlete_id(athlete_id)
+        with self._lock:
+            dataset = self._datasets.get(athlete_id)
+            if dataset is not None:
+                self._datasets.move_to_end(athlete_id)
+        if dataset is not None and not self._is_stale(dataset):
+            return dataset
+        with self.athlete_lock(athlete_id):
+            # Another thread may have attached it while we waited
+            with self._lock:
+                current = self._datasets.get(athlete_id)
+            if current is not None and current is not dataset:
+                return current
+            return self._load(athlete_id)
+
+    def reload(self, athlete_id: str) -> Dataset:
+        """Re-attach an athlete's snapshot. Caller should hold athlete_lock()."""
+        validate_athlete_id(athlete_id)
+        return self._load(athlete_id)
+
+    def _is_stale(self, dataset: Dataset) -> bool:
+        now = time.monotonic()
+        if now - dataset.checked_at < GENERATION_CHECK_SECONDS:
+            return False
+        dataset.checked_at = now
+        path = snapshot_path_for(self.storage(dataset.athlete_id).path)
+        return read_generation(path) != dataset.version
+
+    def _load(self, athlete_id: str) -> Dataset:
+        storage = self.storage(athlete_id)
+        ensure_snapshot(storage)
+        return self.attach(Dataset(athlete_id, SnapshotActivities(snapshot_path_for(storage.path))))
+
+    def attach(self, dataset: Dataset) -> Dataset:
+        """Make dataset the athlete's resident one. Caller should hold athlete_lock()."""
+        athlete_id = dataset.athlete_id
+        with self._lock:
+            previous = self._datasets.get(athlete_id)
+            self._datasets[athlete_id] = dataset
+            self._datasets.move_to_end(athlete_id)
+            self._evict()
+        print(
+            f"Attached {len(dataset.activities)} activities for athlete {athlete_id} "
+            f"(snapshot generation {dataset.version})"
+        )
+        if dataset.cached_value("search") is None:
+            scheduler.submit(
+                f"search index of athlete {athlete_id}", search_index, dataset, previous
+            )
+        return dataset
+
+    def _evict(self):
+        # Always keep the most recently used dataset, even if it alone exceeds the budget
+        total = sum(d.size_bytes for d in self._datasets.values())
+        while total > self._budget and len(self._datasets) > 1:
+            athlete_id, dataset = self._datasets.popitem(last=False)
+            total -= dataset.size_bytes
+            # The storage's in-memory copy (a replayed journal) goes with the dataset
+            self.storage(athlete_id).release()
+            print(f"Evicted dataset of athlete {athlete_id} ({dataset.size_bytes // 1024} KiB)")
+
+
+registry = DatasetRegistry(DATA_DIR, MEMORY_BUDGET_MB * 1024 * 1024)
+
+
+def search_index(dataset: Dataset, previous: Dataset | None = None) -> SearchIndex:
+    """The dataset's text search index, refreshed from the previous generation's if built."""
+
+    def _build() -> SearchIndex:
+        old = previous.cached_value("search") if previous is not None else None
+        if old is not None:
+            return old.refreshed(dataset.activities)
+        return SearchIndex(dataset.activities)
+
+    return dataset.cached("search", _build)
+
+
+def load_activities(athlete_id: str = DEFAULT_ATHLETE) -> bool:
+    with registry.athlete_lock(athlete_id):
+        registry.reload(athlete_id)
     return True
 
 
-def get_activities() -> list[dict]:
-    return _activities
+def boot(athlete_id: str = DEFAULT_ATHLETE) -> str:
+    """Make an athlete servable at startup: from the summary if current, else the snapshot."""
+    if registry.summary(athlete_id) is not None:
+        return "summary"
+    load_activities(athlete_id)
+    return "snapshot"
+
+
+def get_dataset(athlete_id: str = DEFAULT_ATHLETE) -> Dataset:
+    return registry.get(athlete_id)
+
+
+def get_activities(athlete_id: str = DEFAULT_ATHLETE) -> SnapshotActivities:
+    return registry.get(athlete_id).activities
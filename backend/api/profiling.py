@@ -0,0 +1,95 @@
+"""Request profiling middleware (opt-in).
+
+With STRAVA_PROFILE_SLOW_MS set, every request is sampled and the stacks of those
+slower than the threshold are kept. With STRAVA_PROFILE_HEADER=1, a request sent
+with an "X-Profile: 1" header is always kept. Profiles go to STRAVA_PROFILE_DIR
+(default <data dir>/profiles), which keeps the STRAVA_PROFILE_KEEP most recent.
+
+The sampler runs for every request while STRAVA_PROFILE_SLOW_MS is set, slow or not;
+STRAVA_PROFILE_INTERVAL_MS (default 20) trades its overhead against resolution.
+
+Samples cover every thread, so requests running at the same time share theirs; the
+metadata records how many were in flight.
+"""
+
+import os
+import time
+from urllib.parse import parse_qsl
+
+from anyio import to_thread
+
+from api.loader import DATA_DIR, registry
+from strava.athletes import DEFAULT_ATHLETE
+from strava.profiling import ProfileStore, StackSampler
+
+PROFILE_SLOW_MS = float(os.environ.get("STRAVA_PROFILE_SLOW_MS", "0"))
+PROFILE_HEADER = os.environ.get("STRAVA_PROFILE_HEADER", "") == "1"
+PROFILE_DIR = os.environ.get("STRAVA_PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+PROFILE_KEEP = int(os.environ.get("STRAVA_PROFILE_KEEP", "50"))
+PROFILE_INTERVAL_MS = float(os.environ.get("STRAVA_PROFILE_INTERVAL_MS", "20"))
+
+PROFILING_ENABLED = PROFILE_SLOW_MS > 0 or PROFILE_HEADER
+
+
+def _dataset_version(params: dict) -> int | None:
+    dataset = registry.peek(params.get("athlete", DEFAULT_ATHLETE))
+    return dataset.version if dataset is not None else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, store: ProfileStore | None = None, slow_ms: float = PROFILE_SLOW_MS,
+                 header: bool = PROFILE_HEADER):
+        self.app = app
+        self.store = store or ProfileStore(PROFILE_DIR, PROFILE_KEEP)
+        self.slow_ms = slow_ms
+        self.header = header
+        self.sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        forced = self.header and (b"x-profile", b"1") in scope["headers"]
+        if not forced and self.slow_ms <= 0:
+            return await self.app(scope, receive, send)
+
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = self.sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            try:
+                if forced or elapsed_ms >= self.slow_ms:
+                    await self._save(scope, start, elapsed_ms, status, forced)
+            finally:
+                # After saving, which reads the samples stop() may clear
+                self.sampler.stop()
+
+    async def _save(self, scope, start: float, elapsed_ms: float, status: int | None, forced: bool):
+        params = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+        meta = {
+            "route": scope["path"],
+            "method": scope["method"],
+            "params": params,
+            "status": status,
+            "duration_ms": round(elapsed_ms, 1),
+            "trigger": "header" if forced else f"slower than {self.slow_ms:g} ms",
+            "dataset_version": _dataset_version(params),
+            "concurrent_requests": self.sampler.active,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        folded = self.sampler.samples_since(start)
+        try:
+            base = await to_thread.run_sync(
+                self.store.save_folded, f"{scope['method']} {scope['path']}", folded, meta
+            )
+            print(f"Profiled {scope['method']} {scope['path']} ({elapsed_ms:.0f} ms): {base}.folded")
+        except OSError as e:
+            print(f"Could not write profile for {scope['path']}: {e}")
@@ -0,0 +1,121 @@
+"""Fast JSON responses with serialized and compressed bodies cached per dataset version.
+
+orjson and brotli are optional (`pip install strava-stats[fast]`); without them the
+stdlib json encoder and gzip-only negotiation are used.
+"""
+
+import gzip
+import hashlib
+import json
+
+from fastapi import Request, Response
+
+from api.singleflight import flights
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+def columnar(rows: list[dict], fields: tuple[str, ...], dictionary: tuple[str, ...] = ()) -> dict:
+    """Rows as parallel arrays (format=columnar on aggregate endpoints).
+
+    Fields in `dictionary` are sent as indexes into a list of their distinct values,
+    so repeated strings such as sport types are written once.
+    """
+    columns = {}
+    dictionaries = {}
+    for field in fields:
+        values = [r[field] for r in rows]
+        if field in dictionary:
+            codes: dict = {}
+            values = [codes.setdefault(v, len(codes)) for v in values]
+            dictionaries[field] = list(codes)
+        columns[field] = values
+    return {"length": len(rows), "columns": columns, "dictionaries": dictionaries}
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips FastAPI's jsonable_encoder and uses the fast serializer."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class CachedBody:
+    """A serialized body plus the compressed variants produced so far."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self._encoded: dict[str, bytes] = {"identity": body}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=6)
+            self._encoded[encoding] = data
+        return data
+
+
+def _negotiate(accept_encoding: str, size: int) -> str:
+    if size < MIN_COMPRESS_BYTES:
+        return "identity"
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def cached_body(dataset, key, build) -> CachedBody:
+    """The serialized body of build() for key, computed once per dataset version."""
+    return dataset.cached(("json",) + tuple(key), lambda: CachedBody(dumps(build())))
+
+
+async def cached_json(request: Request, dataset, key, build) -> Response:
+    """Serve build()'s result as JSON, serializing and compressing once per dataset version.
+
+    The cache lives on the Dataset, so a new snapshot generation starts a fresh one.
+    key must identify the endpoint and every parameter that affects the content. On a
+    miss, build() runs in a worker thread shared by all concurrent identical requests.
+    """
+    cached = dataset.cached_value(("json",) + tuple(key))
+    if cached is None:
+        # The dataset object stands for its version: a reload creates a new one
+        flight_key = ("json", id(dataset)) + tuple(key)
+        cached = await flights.run(flight_key, cached_body, dataset, key, build)
+    headers = {"ETag": cached.etag, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == cached.etag:
+        return Response(status_code=304, headers=headers)
+
+    encoding = _negotiate(request.headers.get("accept-encoding", ""), len(cached.body))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(cached.encoded(encoding), media_type="application/json", headers=headers)
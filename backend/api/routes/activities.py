@@ -1,36 +1,240 @@
 """Routes for activity endpoints."""
 
+import threading
+from bisect import bisect_left, insort
 from collections import defaultdict
-from datetime import date, datetime
+from collections.abc import Callable
+from datetime import datetime, timezone
 from io import BytesIO
+from typing import Literal
 from urllib.parse import quote
 
 from anyio import to_thread
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 
-from api.loader import DATA_PATH, get_activities, load_activities
-from strava import ActivityStorage, CommuteDetector, CommuteReport, StravaAuth, StravaClient
+from api.loader import Dataset, get_dataset, registry, search_index
+from api.responses import FastJSONResponse, cached_body, cached_json, columnar
+from api.singleflight import bounded_render, flights, render_slots, warmup_render_slots
+from api.warmup import WARMUP_REPORTS, scheduler
+from strava import ActivityFilter, CommuteDetector
+from strava.athletes import DEFAULT_ATHLETE
+from strava.changes import ChangeLog, ChangeSet, changes_path_for, diff_activities, month_bucket
+from strava.commute import PlaceDistances
+from strava.config import REPORT_CUTOFF_DAY, STREAMS_PER_SYNC
+from strava.efforts import BestEfforts, efforts_path_for
+from strava.export import EARLIEST, EXPORT_FORMATS, LATEST, export, parse_fields
+from strava.gear import GearLedger, gear_path_for
+from strava.index import ActivityIndex
+from strava.periods import MAX_YEAR, MIN_YEAR, ReportingPeriods
+from strava.snapshot import (
+    FIELDS,
+    SnapshotActivities,
+    build_snapshot,
+    patch_snapshot,
+    source_signature,
+)
+from strava.sports import resolve_sport
+from strava.summary import Summary, write_summary_aggregates
+from strava.timeseries import TrainingSeries
 
 router = APIRouter(prefix="/activities", tags=["activities"])
 
+# Aggregate endpoints answer with an array of objects, or parallel arrays with
+# ?format=columnar. Labels and month names are left for the client to derive.
+WireFormat = Literal["rows", "columnar"]
+MONTHLY_COLUMNS = ("year", "month", "sport_type", "total_km")
+COMMUTE_MONTH_COLUMNS = ("year", "month")
+COMMUTE_PERIOD_COLUMNS = ("year", "month", "start", "end", "trips", "days", "km", "amount")
+
 MONTH_NAMES = [
     "January", "February", "March", "April", "May", "June",
     "July", "August", "September", "October", "November", "December",
 ]
 
 
-@router.get("/monthly-totals")
-async def get_monthly_totals():
-    """Return total distance in km per (year, month, sport_type)."""
-    activities = get_activities()
+async def _dataset(athlete: str) -> Dataset:
+    """Resolve an athlete's dataset, loading it off the event loop on first access."""
+    try:
+        return await to_thread.run_sync(get_dataset, athlete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No activities stored for athlete {athlete}")
+
+
+async def _aggregates(
+    athlete: str, detector: CommuteDetector | None = None
+) -> Dataset | Summary:
+    """Source for aggregate endpoints: the resident dataset, else a current summary made
+    with the same commute settings (no need to map raw activities), else the dataset."""
+    if registry.peek(athlete) is None:
+        try:
+            summary = await to_thread.run_sync(registry.summary, athlete)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if summary is not None and (detector is None or summary.covers(detector)):
+            return summary
+    return await _dataset(athlete)
+
+
+def _parse_place(value: str) -> dict:
+    try:
+        name, lat, lon, *radius = value.split(":")
+        place = {"name": name, "lat": float(lat), "lon": float(lon)}
+        if radius:
+            place["radius_km"] = float(radius[0])
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid place {value!r}, expected name:lat:lon[:radius_km]"
+        )
+    return place
+
+
+def commute_detector(
+    athlete: str = DEFAULT_ATHLETE,
+    place: list[str] | None = Query(
+        None, description="name:lat:lon[:radius_km]; repeat for each place"
+    ),
+    radius_km: float | None = Query(None, gt=0),
+    hour_start: int | None = Query(None, ge=0, le=24),
+    hour_end: int | None = Query(None, ge=0, le=24),
+) -> CommuteDetector:
+    """Commute settings for a request: query overrides, else the athlete's commute.json."""
+    try:
+        config = dict(registry.commute_config(athlete))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if place:
+        config["places"] = [_parse_place(p) for p in place]
+    if radius_km is not None:
+        config["radius_km"] = radius_km
+    if hour_start is not None:
+        config["work_hour_start"] = hour_start
+    if hour_end is not None:
+        config["work_hour_end"] = hour_end
+    if len(config.get("places", [None, None])) < 2:
+        raise HTTPException(status_code=400, detail="At least two places are needed")
+    return CommuteDetector.from_config(config)
+
+
+def _place_distances(dataset: Dataset) -> PlaceDistances:
+    return dataset.cached("place-distances", lambda: PlaceDistances(dataset.activities))
+
+
+def _commutes(dataset: Dataset | Summary, detector: CommuteDetector) -> list[dict]:
+    if isinstance(dataset, Summary):
+        return dataset.commutes  # _aggregates() checked it covers these settings
+    return dataset.cached(
+        ("commutes", detector.cache_key()),
+        lambda: detector.get_commute_activities(dataset.activities, _place_distances(dataset)),
+    )
+
+
+def _index(dataset: Dataset, detector: CommuteDetector) -> ActivityIndex:
+    def _build() -> ActivityIndex:
+        routes = detector.routes(dataset.activities, _place_distances(dataset))
+        return ActivityIndex(dataset.activities, [r is not None for r in routes])
+
+    return dataset.cached(("index", detector.cache_key()), _build)
+
+
+DEFAULT_LIST_FIELDS = (
+    "id", "name", "sport_type", "start_date", "distance", "moving_time", "total_elevation_gain",
+)
+
+
+@router.get("", response_class=FastJSONResponse)
+async def list_activities(
+    sport: str | None = None,
+    after: datetime | None = None,
+    before: datetime | None = None,
+    commute: bool | None = None,
+    fields: str | None = Query(None, description="Comma-separated fields to return"),
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    athlete: str = DEFAULT_ATHLETE,
+    detector: CommuteDetector = Depends(commute_detector),
+):
+    """List activities by start time, one page at a time, with optional filters and projection."""
+    selected = DEFAULT_LIST_FIELDS
+    if fields:
+        selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+    unknown = [f for f in selected if f not in FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    dataset = await _dataset(athlete)
+    key = ("index", id(dataset), detector.cache_key())
+    index = await flights.run(key, _index, dataset, detector)
+    try:
+        positions, next_cursor = index.query(
+            sport, after, before, commute, cursor, limit, descending=order == "desc"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    activities = dataset.activities
+    rows = []
+    for i in positions:
+        a = activities[i]
+        rows.append({f: a.get(f) for f in selected})
+    return FastJSONResponse(
+        {"activities": rows, "next_cursor": next_cursor, "version": dataset.version}
+    )
+
 
-    totals: dict[tuple[int, int, str], float] = defaultdict(float)
-    for a in activities:
-        dt = datetime.fromisoformat(a["start_date"].replace("Z", "+00:00"))
-        sport = a.get("sport_type", "Unknown")
-        totals[(dt.year, dt.month, sport)] += a.get("distance", 0)
+SEARCH_FIELDS = ("id", "name", "sport_type", "start_date", "distance", "location_city", "device_name")
 
+
+@router.get("/search", response_class=FastJSONResponse)
+async def search_activities(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    fuzzy: bool = True,
+    athlete: str = DEFAULT_ATHLETE,
+):
+    """Find activities by name, city or device: exact, prefix and fuzzy matches, best first."""
+    dataset = await _dataset(athlete)
+    index = dataset.cached_value("search")
+    if index is None:
+        # Normally built in the background as soon as the dataset is attached
+        index = await flights.run(("search", id(dataset)), search_index, dataset)
+    activities = dataset.activities
+    results = []
+    for activity_id, score in index.search(q, limit, fuzzy):
+        a = activities[index.position(activity_id)]
+        results.append({**{f: a.get(f) for f in SEARCH_FIELDS}, "score": score})
+    return FastJSONResponse({"results": results, "version": dataset.version})
+
+
+def _monthly_cube(dataset: Dataset) -> dict[tuple[int, int, str], tuple[float, int]]:
+    """(distance in m, activity count) per (year, month, sport_type); the count tells a
+    webhook delta when a bucket empties."""
+
+    def _build() -> dict[tuple[int, int, str], tuple[float, int]]:
+        cube: dict[tuple[int, int, str], tuple[float, int]] = {}
+        for a in dataset.activities:
+            bucket = month_bucket(a)
+            distance, count = cube.get(bucket, (0.0, 0))
+            cube[bucket] = (distance + a.get("distance", 0), count + 1)
+        return cube
+
+    return dataset.cached("monthly-cube", _build)
+
+
+def _monthly_totals(dataset: Dataset | Summary) -> list[dict]:
+    def _build() -> list[dict]:
+        if isinstance(dataset, Summary):
+            return _monthly_rows(dataset.monthly)
+        cube = _monthly_cube(dataset)
+        return _monthly_rows({bucket: distance for bucket, (distance, _) in cube.items()})
+
+    return dataset.cached("monthly-totals", _build)
+
+
+def _monthly_rows(totals: dict[tuple[int, int, str], float]) -> list[dict]:
     result = [
         {
             "year": year,
@@ -46,76 +250,491 @@ async def get_monthly_totals():
     return result
 
 
+def _encode(rows: list[dict], wire: WireFormat, fields: tuple[str, ...]):
+    if wire == "columnar":
+        return columnar(rows, fields, dictionary=("sport_type",))
+    return rows
+
+
+@router.get("/monthly-totals", response_class=FastJSONResponse)
+async def get_monthly_totals(
+    request: Request,
+    athlete: str = DEFAULT_ATHLETE,
+    wire: WireFormat = Query("rows", alias="format"),
+):
+    """Return total distance in km per (year, month, sport_type)."""
+    dataset = await _aggregates(athlete)
+    return await cached_json(
+        request,
+        dataset,
+        ("monthly-totals", wire),
+        lambda: _encode(_monthly_totals(dataset), wire, MONTHLY_COLUMNS),
+    )
+
+
+@router.get("/training-load", response_class=FastJSONResponse)
+async def get_training_load(
+    request: Request, sport: str | None = None, athlete: str = DEFAULT_ATHLETE
+):
+    """Return dense daily series with 7/28/42-day rolling sums and ATL/CTL/TSB."""
+    dataset = await _dataset(athlete)
+
+    def _build() -> dict:
+        activities = ActivityFilter(dataset.activities)
+        if sport:
+            activities = activities.by_sport(sport)
+        return TrainingSeries(activities.activities).to_dict()
+
+    return await cached_json(request, dataset, ("training-load", sport), _build)
+
+
 @router.post("/fetch")
-async def fetch_from_strava():
+async def fetch_from_strava(athlete: str = DEFAULT_ATHLETE):
     """Fetch all activities from the Strava API, persist to disk, and reload the cache."""
     def _do_fetch() -> int:
-        auth = StravaAuth()
-        client = StravaClient(auth)
-        activities = client.fetch_all_activities()
-        ActivityStorage(DATA_PATH).save(activities)
-        load_activities()
-        return len(activities)
+        # Imported here so that workers only load requests/dotenv when a sync happens
+        from strava import StravaAuth, StravaClient
+
+        # Only this athlete's shard is locked, written and reloaded
+        with registry.athlete_lock(athlete):
+            auth = StravaAuth(registry.env_path(athlete))
+            client = StravaClient(auth)
+            activities = client.fetch_all_activities()
+            storage = registry.storage(athlete)
+            try:
+                previous = registry.get(athlete).activities
+            except FileNotFoundError:
+                previous = []
+            base = getattr(previous, "source", None)
+            detector = CommuteDetector.from_config(registry.commute_config(athlete))
+            changes = diff_activities(
+                previous, activities, detector, ReportingPeriods().period_of
+            )
+            storage.save(activities)
+            # Publishes a new generation; other workers pick it up on their next request
+            version = build_snapshot(storage, activities)
+            ChangeLog(changes_path_for(storage.path)).append(version, changes)
+            registry.reload(athlete)
+            GearLedger(gear_path_for(storage.path), registry.gear_config(athlete)).sync(
+                activities, source_signature(storage.path), changes, base
+            )
+            dataset = registry.get(athlete)
+            # The summary just saved lists the periods with the same settings, so the
+            # task list is known without classifying commutes on this thread
+            summary = registry.summary(athlete)
+            period_keys = list(summary.period_summaries) if summary is not None else []
+            scheduler.schedule(
+                athlete, dataset.version, _warmup_tasks(dataset, detector, period_keys)
+            )
+            # Only new or edited activities are scanned; the stream backlog is spread
+            # over syncs to stay within Strava's rate limit
+            scanned = BestEfforts(efforts_path_for(storage.path)).update(
+                activities, registry.streams(athlete, client), limit=STREAMS_PER_SYNC
+            )
+        return len(activities), scanned
 
     try:
-        count = await to_thread.run_sync(_do_fetch)
+        # Concurrent syncs of one athlete share a single Strava download
+        count, scanned = await flights.run(("fetch", athlete), _do_fetch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    return {"fetched": count}
+    return {"fetched": count, "efforts_scanned": scanned}
+
+
+def _warmup_tasks(
+    dataset: Dataset, detector: CommuteDetector, period_keys: list[tuple[int, int]]
+) -> list[tuple[str, Callable]]:
+    """What a dashboard visit needs after a sync, for the athlete's own settings:
+    aggregates first, then the reports of the WARMUP_REPORTS most recent periods."""
+    periods = ReportingPeriods()
+    settings = (detector.cache_key(), periods.cutoff_day)
+    tasks = [
+        ("monthly-totals", lambda: cached_body(
+            dataset, ("monthly-totals", "rows"), lambda: _monthly_totals(dataset)
+        )),
+        ("commutes", lambda: _period_index(dataset, detector, periods)),
+        ("commute-months", lambda: cached_body(
+            dataset,
+            ("commute-months",) + settings + ("rows",),
+            lambda: _commute_months(_period_index(dataset, detector, periods)),
+        )),
+        ("commute-periods", lambda: cached_body(
+            dataset, ("commute-periods",) + settings + ("rows",),
+            lambda: _commute_periods(dataset, detector, periods),
+        )),
+    ]
+    # Newest first: recent periods are the ones being claimed; older ones render on demand
+    for y, m in sorted(period_keys, reverse=True)[:WARMUP_REPORTS]:
+        tasks.append((
+            f"report {y}-{m:02d}",
+            lambda y=y, m=m: _report_bytes(
+                dataset, detector, periods, y, m, slots=warmup_render_slots
+            ),
+        ))
+    return tasks
+
+
+def _commute_time(row: dict) -> datetime:
+    return row["datetime"]
+
 
+def _patched_commutes(rows: list[dict], removed: list[dict], added: list[dict]) -> list[dict]:
+    """A copy of commute rows (sorted by time) without the removed activities' rows and
+    with the added ones, found and placed by bisection."""
+    rows = list(rows)
+    for row in removed:
+        i = bisect_left(rows, row["datetime"], key=_commute_time)
+        while i < len(rows) and rows[i]["datetime"] == row["datetime"]:
+            if rows[i].get("id") == row["id"]:
+                del rows[i]
+                break
+            i += 1
+    for row in added:
+        insort(rows, row, key=_commute_time)
+    return rows
 
-def _period_of_date(d: date) -> tuple[int, int]:
-    """Return the (year, month) reporting period a date belongs to.
 
-    Periods run from the 21st of the previous month to the 20th of the returned month.
-    E.g. Dec 22 → (year+1 if Dec, 1) = January of next year.
-         Jan 5  → (year, 1) = January.
-         Jan 21 → (year, 2) = February.
+def carry_caches(
+    previous: Dataset, dataset: Dataset, before: list, after: list, placed: dict[int, int]
+):
+    """Seed dataset, previous patched by patch_snapshot(), with previous's derived values
+    updated for the activities replaced (before) and written (after).
+
+    The monthly cube, commute rows, period indexes and search index take the delta;
+    reports of untouched periods are kept. Positional or whole-history values (activity
+    index, place distances, training load, response bodies) are rebuilt on first use.
     """
-    if d.day >= 21:
-        if d.month == 12:
-            return d.year + 1, 1
-        return d.year, d.month + 1
-    return d.year, d.month
+    cube = previous.cached_value("monthly-cube")
+    if cube is not None:
+        cube = dict(cube)
+        for a in before:
+            bucket = month_bucket(a)
+            distance, count = cube[bucket]
+            if count == 1:
+                del cube[bucket]
+            else:
+                cube[bucket] = (distance - a.get("distance", 0), count - 1)
+        for a in after:
+            bucket = month_bucket(a)
+            distance, count = cube.get(bucket, (0.0, 0))
+            cube[bucket] = (distance + a.get("distance", 0), count + 1)
+        dataset.prime("monthly-cube", cube)
 
+    # Commute rows of the old and new versions, per commute settings in use
+    deltas: dict[tuple, tuple[list[dict], list[dict]]] = {}
 
-@router.get("/commute-months")
-async def get_commute_months():
-    """Return the list of reporting periods that contain commute activities."""
-    activities = get_activities()
-    detector = CommuteDetector()
-    commutes = detector.get_commute_activities(activities)
+    def commute_delta(settings: tuple) -> tuple[list[dict], list[dict]]:
+        if settings not in deltas:
+            detector = CommuteDetector.from_cache_key(settings)
+            deltas[settings] = (
+                detector.get_commute_activities(before), detector.get_commute_activities(after)
+            )
+        return deltas[settings]
+
+    cached = previous.cached_items()
+    touched: dict[tuple, set[tuple[int, int]]] = {}
+    for key, value in cached:
+        if key[0] == "commutes":
+            dataset.prime(key, _patched_commutes(value, *commute_delta(key[1])))
+        elif key[0] == "period-index":
+            _, settings, cutoff_day = key
+            removed, added = commute_delta(settings)
+            periods = ReportingPeriods(cutoff_day)
+            by_period: dict[tuple[int, int], tuple[list, list]] = defaultdict(lambda: ([], []))
+            for row in removed:
+                by_period[periods.period_of(row["date"])][0].append(row)
+            for row in added:
+                by_period[periods.period_of(row["date"])][1].append(row)
+            index = dict(value)
+            for period, (gone, new) in by_period.items():
+                rows = _patched_commutes(index.get(period, []), gone, new)
+                if rows:
+                    index[period] = rows
+                else:
+                    index.pop(period, None)
+            dataset.prime(key, index)
+            touched[(settings, cutoff_day)] = set(by_period)
+    for key, value in cached:
+        # ("report", settings, cutoff_day, year, month) only depends on its period's rows
+        if key[0] == "report" and key[1:3] in touched and key[3:] not in touched[key[1:3]]:
+            dataset.prime(key, value)
+
+    search = previous.cached_value("search")
+    if search is not None:
+        activities = dataset.activities
+        deleted = {a["id"] for a in before} - {a["id"] for a in after}
+        dataset.prime(
+            "search", search.patched([(row, activities[row]) for row in placed.values()], deleted)
+        )
+
+
+def apply_activity_changes(
+    athlete: str, changed: list[dict], deleted_ids=(), client=None
+) -> ChangeSet:
+    """Apply a few individually known changes (webhook events) without a full sync.
+
+    Storage is upserted, the snapshot patched instead of rebuilt, and the new generation
+    starts from the previous one's derived values patched with the change (see
+    carry_caches). Caller should hold athlete_lock().
+    """
+    storage = registry.storage(athlete)
+    try:
+        previous = registry.get(athlete)
+        if previous.activities.source != source_signature(storage.path):
+            # Saved since it was attached by something else (main.py --fetch): the
+            # changes must be diffed against what is stored now
+            previous = registry.reload(athlete)
+    except FileNotFoundError:
+        previous = None
+    before = []
+    if previous is not None:
+        activities = previous.activities
+        wanted = {a["id"] for a in changed} | set(deleted_ids)
+        before = [activities[row] for row in activities.rows_of(wanted).values()]
+    detector = CommuteDetector.from_config(registry.commute_config(athlete))
+    periods = ReportingPeriods()
+    changes = diff_activities(before, changed, detector, periods.period_of)
+    if not changes:
+        return changes
+    touched = changes.updated | changes.deleted
+    before = [a for a in before if a["id"] in touched]
+    after = [a for a in changed if a["id"] in changes.updated]
+
+    if previous is not None:
+        # The summary is written from these below, so keep them in the carried caches
+        _monthly_cube(previous)
+        _period_index(previous, detector, periods)
+    if after:
+        storage.upsert(after, summary=False)
+    if changes.deleted:
+        storage.delete(changes.deleted, summary=False)
+    patched = None
+    if previous is not None:
+        patched = patch_snapshot(storage, previous.activities, after, changes.deleted)
+    if patched is None:
+        # Nothing stored before, or another worker published meanwhile: rebuild in full
+        build_snapshot(storage)
+        dataset = registry.reload(athlete)
+    else:
+        dataset = Dataset(athlete, SnapshotActivities(previous.activities.path))
+        carry_caches(previous, dataset, before, after, patched[1])
+        registry.attach(dataset)
+    ChangeLog(changes_path_for(storage.path)).append(dataset.version, changes)
+
+    cube = _monthly_cube(dataset)
+    write_summary_aggregates(
+        storage.path,
+        {bucket: distance for bucket, (distance, _) in cube.items()},
+        _commutes(dataset, detector),
+        _period_index(dataset, detector, periods),
+    )
+    ledger = GearLedger(gear_path_for(storage.path), registry.gear_config(athlete))
+    if not ledger.is_new:  # a new ledger is built from storage on first use
+        source = source_signature(storage.path)
+        if previous is not None and ledger.source == previous.activities.source:
+            ledger.apply(after, changes.deleted, source)
+        else:
+            # It missed a save that bypassed it: rebuild from what is stored now
+            ledger.sync(storage.load(), source)
+    scheduler.schedule(
+        athlete, dataset.version, _warmup_tasks(dataset, detector, list(changes.commute_periods))
+    )
+    BestEfforts(efforts_path_for(storage.path)).apply(
+        after, changes.deleted, registry.streams(athlete, client), limit=STREAMS_PER_SYNC
+    )
+    return changes
 
-    periods: set[tuple[int, int]] = set()
-    for c in commutes:
-        periods.add(_period_of_date(c["date"]))
 
+@router.get("/warmup", response_class=FastJSONResponse)
+async def get_warmup_status(athlete: str = DEFAULT_ATHLETE):
+    """Progress of the cache warm-up started by the athlete's last sync."""
+    return FastJSONResponse(scheduler.status(athlete))
+
+
+@router.get("/best-efforts", response_class=FastJSONResponse)
+async def get_best_efforts(athlete: str = DEFAULT_ATHLETE, sport: str | None = None):
+    """Return the best-effort leaderboards per sport: fastest times over 1/5/10/40 km
+    and the farthest distance in 1 h, best first."""
+    try:
+        path = efforts_path_for(registry.storage(athlete).path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    efforts = await to_thread.run_sync(BestEfforts, path)
+    return FastJSONResponse(efforts.leaderboard(resolve_sport(sport) if sport else None))
+
+
+def reporting_periods(
+    cutoff_day: int = Query(REPORT_CUTOFF_DAY, ge=1, le=31, description="Last day of each period"),
+) -> ReportingPeriods:
+    return ReportingPeriods(cutoff_day)
+
+
+def _period_index(
+    dataset: Dataset | Summary, detector: CommuteDetector, periods: ReportingPeriods
+) -> dict[tuple[int, int], list[dict]]:
+    """Commute rows by reporting period, built once per dataset version and settings."""
+    return dataset.cached(
+        ("period-index", detector.cache_key(), periods.cutoff_day),
+        lambda: periods.index(_commutes(dataset, detector)),
+    )
+
+
+def _period_label(year: int, month: int) -> str:
+    return f"{MONTH_NAMES[month - 1]} {year}"
+
+
+def _commute_months(index: dict[tuple[int, int], list[dict]]) -> list[dict]:
     return [
-        {"year": y, "month": m, "label": f"{MONTH_NAMES[m - 1]} {y}"}
-        for y, m in sorted(periods, reverse=True)
+        {"year": y, "month": m, "label": _period_label(y, m)}
+        for y, m in sorted(index, reverse=True)
     ]
 
 
-@router.get("/report")
-async def download_report(year: int, month: int):
-    """Generate and stream an Excel commute report for the given period (21st prev → 20th)."""
-    activities = get_activities()
-    detector = CommuteDetector()
-    commutes = detector.get_commute_activities(activities)
+@router.get("/commute-months", response_class=FastJSONResponse)
+async def get_commute_months(
+    request: Request,
+    athlete: str = DEFAULT_ATHLETE,
+    detector: CommuteDetector = Depends(commute_detector),
+    periods: ReportingPeriods = Depends(reporting_periods),
+    wire: WireFormat = Query("rows", alias="format"),
+):
+    """Return the list of reporting periods that contain commute activities."""
+    dataset = await _aggregates(athlete, detector)
+    return await cached_json(
+        request,
+        dataset,
+        ("commute-months", detector.cache_key(), periods.cutoff_day, wire),
+        lambda: _encode(
+            _commute_months(_period_index(dataset, detector, periods)), wire, COMMUTE_MONTH_COLUMNS
+        ),
+    )
+
+
+def _commute_periods(
+    dataset: Dataset | Summary, detector: CommuteDetector, periods: ReportingPeriods
+) -> list[dict]:
+    stored = None
+    if isinstance(dataset, Summary) and dataset.cutoff_day == periods.cutoff_day:
+        stored = dataset.period_summaries
+    result = []
+    for (y, m), rows in sorted(_period_index(dataset, detector, periods).items(), reverse=True):
+        start, end = periods.date_range(y, m)
+        result.append({
+            "year": y,
+            "month": m,
+            "label": _period_label(y, m),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            **(stored[(y, m)] if stored else periods.summarize(rows)),
+        })
+    return result
+
+
+@router.get("/commute-periods", response_class=FastJSONResponse)
+async def get_commute_periods(
+    request: Request,
+    athlete: str = DEFAULT_ATHLETE,
+    detector: CommuteDetector = Depends(commute_detector),
+    periods: ReportingPeriods = Depends(reporting_periods),
+    wire: WireFormat = Query("rows", alias="format"),
+):
+    """Return trips, days, km and reimbursement amount for every reporting period."""
+    dataset = await _aggregates(athlete, detector)
+    return await cached_json(
+        request,
+        dataset,
+        ("commute-periods", detector.cache_key(), periods.cutoff_day, wire),
+        lambda: _encode(
+            _commute_periods(dataset, detector, periods), wire, COMMUTE_PERIOD_COLUMNS
+        ),
+    )
+
 
-    prev_month = 12 if month == 1 else month - 1
-    prev_year = year - 1 if month == 1 else year
-    start_date = date(prev_year, prev_month, 21)
-    end_date = date(year, month, 20)
+@router.get("/changes", response_class=FastJSONResponse)
+async def get_changes(since: int = Query(..., ge=0), athlete: str = DEFAULT_ATHLETE):
+    """Return what changed after dataset version `since`.
+
+    Changed aggregate buckets and commute periods come with their current values, so a
+    client can patch its copy of /monthly-totals and /commute-months. When the change
+    log does not reach back to `since`, `reset` is true and the client should refetch.
+    """
+    dataset = await _dataset(athlete)
+    log = ChangeLog(changes_path_for(registry.storage(athlete).path))
+    changes = await to_thread.run_sync(log.since, since, dataset.version)
+    if changes is None:
+        return FastJSONResponse({"version": dataset.version, "reset": True})
 
-    filtered = [c for c in commutes if start_date <= c["date"] <= end_date]
+    totals = {
+        (r["year"], r["month"], r["sport_type"]): r["total_km"] for r in _monthly_totals(dataset)
+    }
+    # Periods were recorded with the athlete's own settings, not per-request overrides
+    detector = CommuteDetector.from_config(registry.commute_config(athlete))
+    current_periods = _period_index(dataset, detector, ReportingPeriods())
+    return FastJSONResponse({
+        "version": dataset.version,
+        "reset": False,
+        "updated_ids": sorted(changes.updated),
+        "deleted_ids": sorted(changes.deleted),
+        "monthly_totals": [
+            {
+                "year": y,
+                "month": m,
+                "month_name": MONTH_NAMES[m - 1],
+                "sport_type": sport,
+                "total_km": totals.get((y, m, sport), 0.0),
+            }
+            for y, m, sport in sorted(changes.buckets, reverse=True)
+        ],
+        "commute_months": [
+            {
+                "year": y,
+                "month": m,
+                "label": _period_label(y, m),
+                "present": (y, m) in current_periods,
+            }
+            for y, m in sorted(changes.commute_periods, reverse=True)
+        ],
+    })
 
-    def _generate() -> bytes:
-        return CommuteReport(filtered, year, month).generate_to_bytes()
 
+def _report_bytes(
+    dataset: Dataset | Summary,
+    detector: CommuteDetector,
+    periods: ReportingPeriods,
+    year: int,
+    month: int,
+    slots: threading.BoundedSemaphore = render_slots,
+) -> bytes:
+    """The period's workbook, rendered once per dataset version and settings."""
+    def _render() -> bytes:
+        from strava import CommuteReport  # openpyxl is only needed for reports
+
+        filtered = _period_index(dataset, detector, periods).get((year, month), [])
+        return bounded_render(
+            CommuteReport(filtered, year, month).generate_to_bytes, slots=slots
+        )
+
+    return dataset.cached(
+        ("report", detector.cache_key(), periods.cutoff_day, year, month), _render
+    )
+
+
+@router.get("/report")
+async def download_report(
+    year: int = Query(ge=MIN_YEAR, le=MAX_YEAR),
+    month: int = Query(ge=1, le=12),
+    athlete: str = DEFAULT_ATHLETE,
+    detector: CommuteDetector = Depends(commute_detector),
+    periods: ReportingPeriods = Depends(reporting_periods),
+):
+    """Generate and stream an Excel commute report for a period (by default 21st prev → 20th)."""
+    dataset = await _aggregates(athlete, detector)
+    key = ("report", id(dataset), detector.cache_key(), periods.cutoff_day, year, month)
     try:
-        xlsx_bytes = await to_thread.run_sync(_generate)
+        xlsx_bytes = await flights.run(key, _report_bytes, dataset, detector, periods, year, month)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -127,3 +746,43 @@ async def download_report(year: int, month: int):
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"},
     )
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+@router.get("/export")
+async def export_activities(
+    fmt: Literal["csv", "ndjson", "parquet"] = Query("csv", alias="format"),
+    sport: str | None = None,
+    after: datetime | None = None,
+    before: datetime | None = None,
+    fields: str | None = Query(None, description="Comma-separated fields to export"),
+    athlete: str = DEFAULT_ATHLETE,
+):
+    """Stream the activities matching the filters as CSV, NDJSON or Parquet.
+
+    Rows are encoded batch by batch while the response is sent, so memory stays flat
+    however many activities match.
+    """
+    dataset = await _dataset(athlete)
+    query = ActivityFilter(dataset.activities)
+    if sport is not None:
+        query = query.by_sport(sport)
+    if after is not None or before is not None:
+        query = query.by_date_range(
+            _naive_utc(after) if after else EARLIEST,
+            _naive_utc(before) if before else LATEST,
+        )
+    try:
+        chunks = export(query, parse_fields(fields), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Starlette iterates the (synchronous) generator in its thread pool
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="activities_{athlete}.{fmt}"'},
+    )
@@ -0,0 +1,56 @@
+"""Routes for gear mileage and maintenance."""
+
+from anyio import to_thread
+from fastapi import APIRouter, HTTPException
+
+from api.loader import registry
+from api.responses import FastJSONResponse
+from strava.athletes import DEFAULT_ATHLETE
+from strava.gear import GearLedger, gear_path_for
+from strava.snapshot import source_signature
+
+router = APIRouter(prefix="/gear", tags=["gear"])
+
+
+def _ledger(athlete: str) -> GearLedger:
+    """The athlete's gear ledger, rebuilt from the stored activities unless it is current."""
+    with registry.athlete_lock(athlete):
+        storage = registry.storage(athlete)
+        ledger = GearLedger(gear_path_for(storage.path), registry.gear_config(athlete))
+        source = source_signature(storage.path)
+        if ledger.is_new or ledger.source != source:
+            # First use, or saved by something that did not sync the ledger (the CLI)
+            ledger.sync(storage.load(), source)
+        return ledger
+
+
+async def _run(fn, athlete: str):
+    try:
+        return await to_thread.run_sync(fn, athlete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No activities stored for athlete {athlete}")
+
+
+@router.get("", response_class=FastJSONResponse)
+async def list_gear(athlete: str = DEFAULT_ATHLETE):
+    """Return distance, time, elevation, activity count and component wear per gear,
+    plus the components due for service."""
+    ledger = await _run(_ledger, athlete)
+    return FastJSONResponse({"gear": ledger.all_gear(), "alerts": ledger.alerts()})
+
+
+@router.post("/{gear_id}/service", response_class=FastJSONResponse)
+async def record_service(gear_id: str, component: str, athlete: str = DEFAULT_ATHLETE):
+    """Record that a component was serviced, resetting its wear counter."""
+
+    def _service(athlete: str) -> dict:
+        # Held across load and write so a concurrent sync is not overwritten
+        with registry.athlete_lock(athlete):
+            ledger = _ledger(athlete)
+            if gear_id not in ledger:
+                raise HTTPException(status_code=404, detail=f"Unknown gear {gear_id}")
+            return ledger.service(gear_id, component)
+
+    return FastJSONResponse(await _run(_service, athlete))
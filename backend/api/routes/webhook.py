@@ -0,0 +1,142 @@
+"""Routes for Strava's push subscription (webhook).
+
+Strava checks the callback with a GET handshake, then POSTs one event per change and
+expects a reply within two seconds. Events are therefore queued and applied one at
+a time in arrival order on a background thread: each fetches only its activity and
+patches storage, the snapshot and the derived caches (see apply_activity_changes).
+"""
+
+import hmac
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from api.loader import DATA_DIR, registry
+from api.responses import FastJSONResponse
+from api.routes.activities import apply_activity_changes
+from strava.athletes import athlete_for_owner
+from strava.webhook import WebhookEvent, stored_fields
+
+# Shared secret given to Strava when creating the subscription; the handshake fails without it
+VERIFY_TOKEN = os.environ.get("STRAVA_WEBHOOK_VERIFY_TOKEN")
+# When set, events for any other subscription are rejected
+SUBSCRIPTION_ID = os.environ.get("STRAVA_WEBHOOK_SUBSCRIPTION_ID")
+# Strava id of the default athlete (the single-user layout). Events of any other owner
+# without an athletes/<owner id>/ shard are ignored.
+DEFAULT_OWNER_ID = os.environ.get("STRAVA_ATHLETE_ID")
+
+router = APIRouter(prefix="/webhook", tags=["webhook"])
+
+
+def apply_event(event: WebhookEvent) -> str:
+    """Apply one event; returns "applied", "unchanged" or "ignored"."""
+    if not event.is_activity:
+        # Revoked access leaves the stored data alone; the tokens simply stop working
+        print(f"Ignoring {event.object_type} {event.aspect_type} event of owner {event.owner_id}")
+        return "ignored"
+    athlete = athlete_for_owner(DATA_DIR, event.owner_id, DEFAULT_OWNER_ID)
+    if athlete is None:
+        print(f"Ignoring {event.aspect_type} event of unknown owner {event.owner_id}")
+        return "ignored"
+    with registry.athlete_lock(athlete):
+        client, activity = None, None
+        if event.aspect_type != "delete":
+            # Imported here so that workers only load requests/dotenv when an event arrives
+            from strava import StravaAuth, StravaClient
+
+            client = StravaClient(StravaAuth(registry.env_path(athlete)))
+            activity = client.fetch_activity(event.object_id)
+            owner = (activity or {}).get("athlete") or {}
+            if activity is not None and owner.get("id") != event.owner_id:
+                # Fetched with this shard's tokens, but not the event owner's activity
+                print(
+                    f"Ignoring {event.aspect_type} event of owner {event.owner_id}: "
+                    f"activity {event.object_id} belongs to {owner.get('id')}"
+                )
+                return "ignored"
+        if activity is None:
+            # Deleted, or gone by the time it was fetched
+            changes = apply_activity_changes(athlete, [], [event.object_id], client)
+        else:
+            changes = apply_activity_changes(athlete, [stored_fields(activity)], (), client)
+    return "applied" if changes else "unchanged"
+
+
+class EventQueue:
+    """Applies events on a single background thread, so they land in arrival order."""
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webhook")
+        self._lock = threading.Lock()
+        self._outcomes: Counter = Counter()
+        self._pending = 0
+        self._last: dict | None = None
+
+    def submit(self, event: WebhookEvent):
+        with self._lock:
+            self._pending += 1
+        self._pool.submit(self._run, event)
+
+    def _run(self, event: WebhookEvent):
+        start = time.perf_counter()
+        error = None
+        try:
+            outcome = apply_event(event)
+        except Exception as e:
+            outcome, error = "failed", str(e)
+            print(
+                f"Webhook {event.aspect_type} of {event.object_type} {event.object_id} failed: {e}"
+            )
+        with self._lock:
+            self._pending -= 1
+            self._outcomes[outcome] += 1
+            self._last = {
+                **event.to_dict(),
+                "outcome": outcome,
+                "error": error,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"pending": self._pending, "outcomes": dict(self._outcomes), "last": self._last}
+
+
+events = EventQueue()
+
+
+@router.get("")
+async def verify_subscription(
+    mode: str = Query(..., alias="hub.mode"),
+    token: str = Query(..., alias="hub.verify_token"),
+    challenge: str = Query(..., alias="hub.challenge"),
+):
+    """Answer Strava's subscription handshake by echoing the challenge."""
+    if mode != "subscribe" or not VERIFY_TOKEN or not hmac.compare_digest(
+        token.encode(), VERIFY_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid verify token")
+    return {"hub.challenge": challenge}
+
+
+@router.post("")
+async def receive_event(request: Request):
+    """Queue a Strava event and acknowledge it at once."""
+    try:
+        event = WebhookEvent.from_payload(await request.json())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if SUBSCRIPTION_ID and str(event.subscription_id) != SUBSCRIPTION_ID:
+        raise HTTPException(status_code=403, detail="Unknown subscription")
+    events.submit(event)
+    return {"queued": True}
+
+
+@router.get("/status", response_class=FastJSONResponse)
+async def get_webhook_status():
+    """Events waiting to be applied, outcomes so far and the last event handled."""
+    return FastJSONResponse(events.status())
@@ -0,0 +1,52 @@
+"""Request coalescing for expensive endpoints.
+
+Concurrent requests for the same computation (same endpoint, parameters and dataset
+version) share one run in a worker thread instead of each starting their own.
+Workbook renders are additionally bounded by a semaphore, so a burst of report
+downloads cannot occupy every thread of the pool.
+"""
+
+import asyncio
+import os
+import threading
+from collections.abc import Callable, Hashable
+
+from anyio import to_thread
+
+# Report workbooks rendered at the same time, per worker process
+MAX_CONCURRENT_RENDERS = int(os.environ.get("STRAVA_MAX_RENDERS", "2"))
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, fn: Callable, *args):
+        """Run fn(*args) in a thread, or join the identical call already in flight.
+
+        The shared run is shielded: a caller that disconnects does not cancel it for
+        the others waiting on the same key.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(to_thread.run_sync(fn, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+flights = SingleFlight()
+
+# A threading semaphore (not asyncio's), since renders wait for it in worker threads
+render_slots = threading.BoundedSemaphore(MAX_CONCURRENT_RENDERS)
+# Post-sync warm-up renders take their own slot, so downloads never queue behind them
+warmup_render_slots = threading.BoundedSemaphore(1)
+
+
+def bounded_render(fn: Callable, *args, slots: threading.BoundedSemaphore = render_slots):
+    """Call fn(*args) once a render slot is free."""
+    with slots:
+        return fn(*args)
@@ -0,0 +1,120 @@
+"""Post-sync warm-up of derived artifacts.
+
+After a sync the first visitor of each page would pay for the cold computation.
+The scheduler precomputes a list of artifacts in priority order on a small thread
+pool, so it never competes with requests for more than a couple of threads. A newer
+sync of the same athlete cancels the pending work of the previous one.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+WARMUP_WORKERS = int(os.environ.get("STRAVA_WARMUP_WORKERS", "2"))
+# Report workbooks rendered after a sync: the most recent periods only
+WARMUP_REPORTS = int(os.environ.get("STRAVA_WARMUP_REPORTS", "3"))
+
+
+class WarmupJob:
+    """One athlete's warm-up for one dataset version, with its progress."""
+
+    def __init__(self, athlete_id: str, version: int, tasks: list[tuple[str, Callable]]):
+        self.athlete_id = athlete_id
+        self.version = version
+        self.tasks = tasks
+        self.done = 0
+        self.failed: list[str] = []
+        self.running: set[str] = set()
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def state(self) -> str:
+        if self.finished_at is not None:
+            return "done"
+        return "cancelled" if self.cancelled else "running"
+
+    def run_task(self, label: str, fn: Callable):
+        if self.cancelled:
+            return
+        with self._lock:
+            self.running.add(label)
+        try:
+            fn()
+        except Exception as e:
+            print(f"Warm-up of {label} for athlete {self.athlete_id} failed: {e}")
+            with self._lock:
+                self.failed.append(label)
+        finally:
+            with self._lock:
+                self.running.discard(label)
+                self.done += 1
+                if self.done == len(self.tasks) and not self.cancelled:
+                    self.finished_at = time.time()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "version": self.version,
+                "total": len(self.tasks),
+                "done": self.done,
+                "failed": list(self.failed),
+                "running": sorted(self.running),
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class WarmupScheduler:
+    def __init__(self, workers: int = WARMUP_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup")
+        self._jobs: dict[str, WarmupJob] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, athlete_id: str, version: int, tasks: list[tuple[str, Callable]]) -> WarmupJob:
+        """Queue (label, fn) tasks, highest priority first, superseding any earlier job."""
+        job = WarmupJob(athlete_id, version, tasks)
+        with self._lock:
+            previous = self._jobs.get(athlete_id)
+            if previous is not None:
+                previous.cancel()
+            self._jobs[athlete_id] = job
+        # The pool is FIFO, so submission order is priority order
+        for label, fn in tasks:
+            self._pool.submit(job.run_task, label, fn)
+        if not tasks:
+            job.finished_at = time.time()
+        return job
+
+    def submit(self, label: str, fn: Callable, *args):
+        """Run a one-off background task on the same pool, outside any athlete's job."""
+
+        def _run():
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Background {label} failed: {e}")
+
+        self._pool.submit(_run)
+
+    def status(self, athlete_id: str) -> dict:
+        with self._lock:
+            job = self._jobs.get(athlete_id)
+        if job is None:
+            return {"state": "idle"}
+        return job.to_dict()
+
+
+scheduler = WarmupScheduler()
@@ -0,0 +1,181 @@
+"""Load test of the API: local uvicorn on a synthetic dataset, async clients, a dashboard mix.
+
+Usage (from backend/, needs the `bench` extra for httpx):
+    python -m benchmarks.load_test [--activities 20000] [--concurrency 1,10,50]
+        [--duration 10] [--workers 1] [--output FILE] [--compare OLD_FILE]
+
+Each concurrency level runs for --duration seconds with that many clients looping
+over the route mix. Throughput and p50/p95/p99 latency per route are printed and
+written as JSON (default benchmarks/results/load_<timestamp>.json); --compare prints
+the change against an earlier result file.
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.synthetic import write_dataset
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Route -> share of requests, roughly what the dashboard issues per page view
+MIX = {
+    "/activities/monthly-totals": 40,
+    "/activities/commute-months": 30,
+    "/health": 20,
+    "/activities/report": 10,
+}
+STARTUP_TIMEOUT = 120
+
+
+def _arg(name: str, default: str) -> str:
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def start_server(data_dir: str, port: int, workers: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONPATH": BACKEND_DIR, "STRAVA_DATA_DIR": data_dir},
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not become healthy in time")
+
+
+async def _client(http: httpx.AsyncClient, routes, weights, report_params, deadline, rng, samples):
+    while time.perf_counter() < deadline:
+        route = rng.choices(routes, weights)[0]
+        params = rng.choice(report_params) if route == "/activities/report" else None
+        start = time.perf_counter()
+        try:
+            resp = await http.get(route, params=params)
+            ok = resp.status_code < 400
+        except httpx.TransportError:
+            ok = False
+        samples[route].append((time.perf_counter() - start, ok))
+
+
+async def run_level(base_url: str, concurrency: int, duration: float, report_params, seed: int) -> dict:
+    routes, weights = list(MIX), list(MIX.values())
+    samples = {route: [] for route in routes}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        # Warm the per-dataset caches so every level measures steady state
+        for route in routes:
+            await http.get(route, params=report_params[0] if route == "/activities/report" else None)
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            _client(http, routes, weights, report_params, deadline, random.Random(seed + i), samples)
+            for i in range(concurrency)
+        ))
+
+    result = {"concurrency": concurrency, "routes": {}}
+    total = 0
+    for route, route_samples in samples.items():
+        latencies = sorted(t * 1000 for t, _ in route_samples)
+        total += len(route_samples)
+        result["routes"][route] = {
+            "requests": len(route_samples),
+            "errors": sum(1 for _, ok in route_samples if not ok),
+            "rps": round(len(route_samples) / duration, 1),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+        }
+    result["rps"] = round(total / duration, 1)
+    return result
+
+
+def _print_level(level: dict, previous: dict | None):
+    print(f"\nconcurrency {level['concurrency']}: {level['rps']} req/s")
+    print(f"  {'route':<30} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for route, r in level["routes"].items():
+        line = (
+            f"  {route:<30} {r['rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+            f"{r['p99_ms']:>9} {r['errors']:>7}"
+        )
+        old = (previous or {}).get("routes", {}).get(route)
+        if old and old["p95_ms"]:
+            line += f"   p95 {100 * (r['p95_ms'] / old['p95_ms'] - 1):+.0f}%"
+        print(line)
+
+
+def main():
+    n = int(_arg("--activities", "20000"))
+    levels = [int(c) for c in _arg("--concurrency", "1,10,50").split(",")]
+    duration = float(_arg("--duration", "10"))
+    workers = int(_arg("--workers", "1"))
+    output = _arg("--output", os.path.join(RESULTS_DIR, f"load_{time.strftime('%Y%m%d-%H%M%S')}.json"))
+    compare = _arg("--compare", "")
+    previous = {}
+    if compare:
+        with open(compare) as f:
+            previous = {level["concurrency"]: level for level in json.load(f)["levels"]}
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_dataset(data_dir, n)
+        port = _free_port()
+        print(f"Serving {n} synthetic activities on port {port} with {workers} worker(s)")
+        server = start_server(data_dir, port, workers)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            months = httpx.get(f"{base_url}/activities/commute-months", timeout=60).json()
+            report_params = [{"year": m["year"], "month": m["month"]} for m in months[:6]]
+            results = []
+            for i, concurrency in enumerate(levels):
+                level = asyncio.run(run_level(base_url, concurrency, duration, report_params, seed=i * 1000))
+                _print_level(level, previous.get(concurrency))
+                results.append(level)
+        finally:
+            server.terminate()
+            server.wait()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "activities": n,
+            "workers": workers,
+            "duration_s": duration,
+            "mix": MIX,
+            "cpu_count": os.cpu_count(),
+            "levels": results,
+        }, f, indent=2)
+    print(f"\nWrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Bytes per loaded activity: plain Strava dicts vs compact Activity records.
+
+Usage (from backend/):
+    python -m benchmarks.memory [--activities 20000] [--source FILE]
+
+Measured with tracemalloc on the repo's activities.json (or --source) and on a
+synthetic history. The memory-mapped snapshot is listed for reference: it lives in
+the shared page cache, not in each worker's heap.
+"""
+
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import generate_activities
+from strava.activity import Activity
+from strava.snapshot import SnapshotActivities, write_snapshot
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(__file__), "..", "activities.json")
+
+
+def _arg(name: str, default: str) -> str:
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def _allocated(build) -> tuple[object, int]:
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+def measure(raw_json: str) -> dict[str, float]:
+    n = len(json.loads(raw_json))
+    results = {}
+    _, size = _allocated(lambda: json.loads(raw_json))
+    results["dict"] = size / n
+    _, size = _allocated(lambda: [Activity(a) for a in json.loads(raw_json)])
+    results["Activity"] = size / n
+    _, size = _allocated(lambda: [Activity(a, keep_raw=False) for a in json.loads(raw_json)])
+    results["Activity (no raw)"] = size / n
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "activities.snapshot")
+        write_snapshot(json.loads(raw_json), path)
+        results["snapshot (mapped)"] = SnapshotActivities(path).size_bytes / n
+    return results
+
+
+def main():
+    source = _arg("--source", DEFAULT_SOURCE)
+    n = int(_arg("--activities", "20000"))
+    datasets = {}
+    if os.path.exists(source):
+        with open(source) as f:
+            datasets[os.path.basename(source)] = f.read()
+    datasets[f"synthetic ({n})"] = json.dumps(generate_activities(n))
+
+    for name, raw_json in datasets.items():
+        results = measure(raw_json)
+        baseline = results["dict"]
+        print(f"\n{name}: {len(json.loads(raw_json))} activities")
+        for kind, per_activity in results.items():
+            print(f"  {kind:<20} {per_activity:>8.0f} B/activity  {per_activity / baseline:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
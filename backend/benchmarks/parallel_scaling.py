@@ -0,0 +1,55 @@
+"""Scaling of ParallelStats from 1 to N worker processes on synthetic data.
+
+Usage (from backend/):
+    python -m benchmarks.parallel_scaling [--sizes 50000,200000] [--workers 8] [--partition year]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_activities
+from strava.parallel import ParallelStats
+from strava.snapshot import SnapshotActivities, write_snapshot
+
+
+def _arg(name: str, default: str) -> str:
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(s) for s in _arg("--sizes", "50000,200000").split(",")]
+    max_workers = int(_arg("--workers", str(os.cpu_count() or 1)))
+    partition = _arg("--partition", "chunks")
+    worker_counts = sorted({1, *[w for w in (2, 4, 8, 16, 32) if w < max_workers], max_workers})
+
+    print(f"{'activities':>10} {'workers':>7} {'by year+sport':>14} {'commutes':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"synthetic-{n}.snapshot")
+            write_snapshot(generate_activities(n), path)
+            snapshot = SnapshotActivities(path)
+            baseline = None
+            for workers in worker_counts:
+                stats = ParallelStats(snapshot, workers, partition=partition, min_parallel_size=0)
+                totals = _time(stats.total_km_by_year_and_sport)
+                commutes = _time(stats.commute_activities)
+                elapsed = totals + commutes
+                baseline = baseline or elapsed
+                print(
+                    f"{n:>10} {workers:>7} {totals:>13.3f}s {commutes:>9.3f}s "
+                    f"{baseline / elapsed:>7.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
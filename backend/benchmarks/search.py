@@ -0,0 +1,73 @@
+"""Search index build, refresh and query latency on a synthetic history.
+
+Usage (from backend/):
+    python -m benchmarks.search [--activities 100000] [--repeat 200]
+
+The index is built from a mapped snapshot, like the API does, then refreshed after
+renaming a few activities and adding new ones (a typical sync).
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import generate_activities
+from strava.search import SearchIndex
+from strava.snapshot import SnapshotActivities, write_snapshot
+
+QUERIES = [
+    "ride", "morning ride", "mor", "strasb", "colmar loop", "garmin", "rivr", "forst hils",
+    "evening commute river", "xyz",
+]
+
+
+def _arg(name: str, default: str) -> str:
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    n = int(_arg("--activities", "100000"))
+    repeat = int(_arg("--repeat", "200"))
+    activities = generate_activities(n)
+    synced = generate_activities(20, seed=1, start=datetime(2026, 2, 1, tzinfo=timezone.utc))
+    synced = [dict(a, id=a["id"] + 10 * n) for a in synced] + activities
+    for a in synced[20:30]:
+        a["name"] = "Renamed gravel outing"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second = os.path.join(tmp, "a.snapshot"), os.path.join(tmp, "b.snapshot")
+        write_snapshot(activities, first)
+        write_snapshot(synced, second)
+        snapshot = SnapshotActivities(first)
+
+        start = time.perf_counter()
+        index = SearchIndex(snapshot)
+        print(f"build    {n} activities: {(time.perf_counter() - start) * 1000:8.1f} ms")
+        start = time.perf_counter()
+        index.refreshed(SnapshotActivities(second))
+        print(f"refresh  20 new, 10 renamed: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        print(f"\n  {'query':<24} {'results':>7} {'p50 ms':>8} {'p99 ms':>8}")
+        for query in QUERIES:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = index.search(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(
+                f"  {query:<24} {len(results):>7} {_percentile(timings, 50):>8.3f} "
+                f"{_percentile(timings, 99):>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
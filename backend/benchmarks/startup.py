@@ -0,0 +1,128 @@
+"""Measure cold-start cost of the CLI and API and check it against the tracked budget.
+
+Usage (from backend/):
+    python -m benchmarks.startup            # report and enforce startup_budget.json
+    python -m benchmarks.startup --update   # rewrite the budget from this run (+25% headroom)
+
+Import time comes from `python -X importtime` in a fresh interpreter; the API
+lifespan (snapshot attach for the default athlete) is timed in-process.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), "startup_budget.json")
+
+TARGETS = {"cli": "main", "api": "api.app"}
+RUNS = 5
+HEADROOM = 1.25
+
+
+def _importtime(code: str) -> list[tuple[int, str]]:
+    """Run code under -X importtime and return (cumulative us, indented name) entries."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONPATH": BACKEND_DIR},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative), name.rstrip()))
+    return entries
+
+
+def _is_top_level(name: str) -> bool:
+    # Nested imports are indented by two extra spaces per level
+    return not name[1:].startswith(" ")
+
+
+def import_profile(module: str, baseline: set[str]) -> tuple[float, set[str]]:
+    """Return (import time in ms, top-level packages imported) for `import module`.
+
+    Modules the bare interpreter already imports (site, encodings, ...) are excluded.
+    """
+    entries = _importtime(f"import {module}")
+    total_us = sum(
+        cumulative
+        for cumulative, name in entries
+        if _is_top_level(name) and name.strip() not in baseline
+    )
+    packages = {name.strip().split(".")[0] for _, name in entries}
+    return total_us / 1000, packages
+
+
+def lifespan_ms() -> float:
+    sys.path.insert(0, BACKEND_DIR)
+    from api.app import app
+
+    async def run():
+        start = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            return (time.perf_counter() - start) * 1000
+
+    return asyncio.run(run())
+
+
+def measure() -> dict:
+    baseline = {name.strip() for _, name in _importtime("pass")}
+    results = {}
+    for target, module in TARGETS.items():
+        timings = []
+        packages = set()
+        for _ in range(RUNS):
+            ms, packages = import_profile(module, baseline)
+            timings.append(ms)
+        results[target] = {"import_ms": round(sorted(timings)[RUNS // 2], 1), "packages": packages}
+    results["api"]["lifespan_ms"] = round(lifespan_ms(), 1)
+    return results
+
+
+def main():
+    results = measure()
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+
+    failures = []
+    for target, limits in budget.items():
+        measured = results[target]
+        for metric in ("import_ms", "lifespan_ms"):
+            if metric not in limits:
+                continue
+            status = "ok" if measured[metric] <= limits[metric] else "OVER"
+            print(f"{target:4} {metric:12} {measured[metric]:8.1f} ms  (budget {limits[metric]} ms) {status}")
+            if status != "ok":
+                failures.append(f"{target} {metric}")
+        for package in limits.get("forbidden_imports", []):
+            if package in measured["packages"]:
+                print(f"{target:4} imports {package} at startup")
+                failures.append(f"{target} imports {package}")
+
+    if "--update" in sys.argv:
+        for target, limits in budget.items():
+            for metric in ("import_ms", "lifespan_ms"):
+                if metric in limits:
+                    limits[metric] = round(results[target][metric] * HEADROOM)
+        with open(BUDGET_PATH, "w") as f:
+            json.dump(budget, f, indent=2)
+            f.write("\n")
+        print(f"Updated {BUDGET_PATH}")
+        return
+
+    if failures:
+        print(f"Startup budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
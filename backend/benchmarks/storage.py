@@ -0,0 +1,92 @@
+"""Cost of a sync per storage backend, by size of the change.
+
+Usage (from backend/):
+    python -m benchmarks.storage [--activities 20000] [--changes 1,10,100,1000]
+
+Each backend holds the same synthetic history. A sync then saves the full list with
+that many activities new or edited, the way /activities/fetch does, and an upsert
+stores just the changed ones, the way a webhook event does. Summaries are left out so
+only storage is timed. Cold load reads the stored history from scratch.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_activities
+from strava.activity import to_dict
+from strava.journal_storage import JournalActivityStorage, _compactor
+from strava.storage import ActivityStorage, open_storage
+
+BACKENDS = ("json", "sqlite", "journal")
+
+
+def _arg(name: str, default: str) -> str:
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def _changed(activities: list[dict], count: int, round_: int) -> list[dict]:
+    """activities with count of them edited (half) or added (half), newest first."""
+    edited = [
+        dict(a, name=f"{a['name']} (edit {round_})") if i < count - count // 2 else a
+        for i, a in enumerate(activities)
+    ]
+    added = generate_activities(count // 2, seed=round_ + 1)
+    next_id = max(a["id"] for a in activities) + 1
+    for i, a in enumerate(added):
+        a["id"] = next_id + i
+    return added + edited
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def _cold_load(backend: str, data_dir: str) -> float:
+    ActivityStorage._cache.clear()
+    JournalActivityStorage._journals.clear()
+    return _timed(lambda: open_storage(data_dir, backend=backend).load())
+
+
+def main():
+    n = int(_arg("--activities", "20000"))
+    changes = [int(c) for c in _arg("--changes", "1,10,100,1000").split(",")]
+    history = generate_activities(n)
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in BACKENDS:
+            data_dir = os.path.join(tmp, backend)
+            storage = open_storage(data_dir, backend=backend)
+            storage.save(history, summary=False)
+            _compactor.submit(lambda: None).result()
+            current, rows = history, {}
+            for round_, count in enumerate(changes):
+                current = _changed(current, count, 2 * round_)
+                sync = _timed(lambda: storage.save(current, summary=False))
+                delta = _changed(current, count, 2 * round_ + 1)
+                # The added activities, then the edited ones
+                upsert = _timed(lambda: storage.upsert(delta[:count], summary=False))
+                current = [to_dict(a) for a in storage.load()]
+                rows[count] = (sync, upsert)
+            # Let compaction settle so cold load reads what a restart would
+            _compactor.submit(lambda: None).result()
+            results[backend] = {"rows": rows, "cold": _cold_load(backend, data_dir)}
+
+    print(f"\n{n} activities, sync / upsert ms by number of changed activities")
+    print(f"  {'changes':>8} " + " ".join(f"{b + ' sync':>13} {b + ' upsert':>15}" for b in BACKENDS))
+    for count in changes:
+        cells = [
+            f"{results[b]['rows'][count][0]:>13.1f} {results[b]['rows'][count][1]:>15.1f}"
+            for b in BACKENDS
+        ]
+        print(f"  {count:>8} " + " ".join(cells))
+    print("\n  cold load ms: " + ", ".join(f"{b} {results[b]['cold']:.0f}" for b in BACKENDS))
+
+
+if __name__ == "__main__":
+    main()
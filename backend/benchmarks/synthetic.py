@@ -0,0 +1,131 @@
+"""Synthetic, Strava-shaped activity histories for benchmarks and load tests."""
+
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+from strava.config import CITY_A, CITY_B
+
+SPORTS = [("InlineSkate", 0.55), ("Ride", 0.3), ("Run", 0.1), ("Walk", 0.05)]
+CITIES = ["Strasbourg", "Geispolsheim", "Illkirch-Graffenstaden", "Colmar", None]
+WORDS = ["Morning", "Afternoon", "Evening", "Lunch", "ride", "skate", "run", "walk",
+         "commute", "loop", "river", "forest", "hills", "easy", "tempo", "long"]
+
+
+def _jitter(rng, place, km=1.5):
+    return [place["lat"] + rng.uniform(-km, km) / 111, place["lon"] + rng.uniform(-km, km) / 74]
+
+
+def generate_activities(n: int, seed: int = 0, start: datetime | None = None) -> list[dict]:
+    """n activities spread over the years before `start`, newest first like Strava.
+
+    About a third are weekday rides or skates between CITY_A and CITY_B, so commute
+    detection has realistic work to do.
+    """
+    rng = random.Random(seed)
+    start = start or datetime(2026, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(hours=max(1.0, 10 * 365 * 24 / max(n, 1)))
+    sports, weights = zip(*SPORTS)
+    activities = []
+    for i in range(n):
+        dt = start - step * i - timedelta(minutes=rng.randint(0, 50))
+        sport = rng.choices(sports, weights)[0]
+        commute = sport in ("InlineSkate", "Ride") and rng.random() < 0.6
+        if commute:
+            a, b = (CITY_A, CITY_B) if rng.random() < 0.5 else (CITY_B, CITY_A)
+            start_latlng, end_latlng = _jitter(rng, a), _jitter(rng, b)
+        else:
+            home = _jitter(rng, CITY_B, km=20)
+            start_latlng, end_latlng = home, _jitter(rng, {"lat": home[0], "lon": home[1]}, km=3)
+        distance = rng.uniform(2_000, 60_000)
+        moving_time = int(distance / rng.uniform(2.5, 8.0))
+        activities.append({
+            "id": 10_000_000_000 + n - i,
+            "name": " ".join(rng.sample(WORDS, 3)).capitalize(),
+            "sport_type": sport,
+            "type": sport,
+            "start_date": dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "start_date_local": (dt + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "utc_offset": 3600.0,
+            "timezone": "(GMT+01:00) Europe/Paris",
+            "distance": round(distance, 1),
+            "moving_time": moving_time,
+            "elapsed_time": moving_time + rng.randint(0, 600),
+            "total_elevation_gain": round(rng.uniform(0, 400), 1),
+            "kilojoules": round(rng.uniform(50, 900), 1) if sport == "Ride" else None,
+            "average_heartrate": round(rng.uniform(100, 170), 1) if rng.random() < 0.8 else None,
+            "max_heartrate": float(rng.randint(150, 195)),
+            "average_speed": round(distance / moving_time, 3),
+            "max_speed": round(distance / moving_time * rng.uniform(1.3, 2.0), 3),
+            "start_latlng": start_latlng,
+            "end_latlng": end_latlng,
+            "gear_id": rng.choice(["b1234567", "b7654321", "g1111111", None]),
+            "location_city": rng.choice(CITIES),
+            "device_name": rng.choice(["Suunto 9 Peak", "Garmin Edge 530", "Strava App"]),
+            "commute": commute,
+            "trainer": False,
+            "manual": False,
+            "private": False,
+        })
+    return activities
+
+
+def write_dataset(data_dir: str, n: int, seed: int = 0) -> str:
+    """Write a synthetic activities.json for the default athlete; returns its path."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, "activities.json")
+    with open(path, "w") as f:
+        json.dump(generate_activities(n, seed), f)
+    return path
+
+
+def generate_streams(activity: dict, seed: int = 0) -> dict:
+    """Distance/time streams consistent with an activity's distance and moving time.
+
+    Samples every few seconds with a speed that drifts around the average, in the
+    Strava key_by_type format, standing in for the streams API.
+    """
+    rng = random.Random(f"{seed}:{activity['id']}")
+    total, moving_time = activity.get("distance") or 0, activity.get("moving_time") or 0
+    if not total or not moving_time:
+        return {}
+    average = total / moving_time
+    distance, time = [0.0], [0]
+    speed = average
+    while distance[-1] < total:
+        step = rng.randint(1, 5)
+        speed = min(max(speed + rng.uniform(-0.3, 0.3), average * 0.5), average * 1.6)
+        time.append(time[-1] + step)
+        distance.append(min(total, distance[-1] + speed * step))
+    return {
+        "distance": {"data": [round(d, 1) for d in distance], "series_type": "distance"},
+        "time": {"data": time, "series_type": "distance"},
+    }
+
+
+def write_streams(directory: str, activities: list[dict], seed: int = 0) -> int:
+    """Write a stream fixture file per activity; returns how many were written."""
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for a in activities:
+        streams = generate_streams(a, seed)
+        with open(os.path.join(directory, f"{a['id']}.json"), "w") as f:
+            json.dump(streams, f, separators=(",", ":"))
+        count += 1
+    return count
+
+
+def main():
+    """python -m benchmarks.synthetic --streams DIR: stream fixtures for activities.json."""
+    if "--streams" not in sys.argv or sys.argv.index("--streams") + 1 >= len(sys.argv):
+        print("Usage: python -m benchmarks.synthetic --streams DIR")
+        sys.exit(1)
+    directory = sys.argv[sys.argv.index("--streams") + 1]
+    with open(os.path.join(os.path.dirname(__file__), "..", "activities.json")) as f:
+        print(f"Wrote {write_streams(directory, json.load(f))} stream files to {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Webhook ingestion against a local stand-in for Strava: latency and consistency.
+
+Usage (from backend/, needs the `bench` extra for httpx):
+    python -m benchmarks.webhook [--activities 20000] [--events 30] [--seed 0]
+
+A fake Strava API (activities and streams) runs in this process; the API runs under
+uvicorn pointed at it with STRAVA_API_URL, the history stored as athlete OWNER_ID
+(athletes/<owner id>/, where events of that owner go). After the subscription
+handshake, a mix of create, update and delete events is posted one at a time, and
+each one's apply time is read from /webhook/status. Finally a second server loads a copy of the resulting
+storage from scratch and every aggregate endpoint must answer exactly the same.
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from benchmarks.load_test import _free_port, _percentile, start_server
+from benchmarks.synthetic import generate_activities, generate_streams
+
+VERIFY_TOKEN = "stand-in-token"
+OWNER_ID = 1
+EVENT_TIMEOUT = 60
+# Endpoints compared between the patched server and the one loaded from scratch
+CHECKS = [
+    ("/activities/monthly-totals", None),
+    ("/activities/commute-months", None),
+    ("/activities/commute-periods", None),
+    ("/activities/search", {"q": "webhook"}),
+]
+
+
+def _arg(name: str, default: str) -> str:
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+class FakeStrava(BaseHTTPRequestHandler):
+    """GET /api/v3/activities/{id} and /api/v3/activities/{id}/streams from `activities`."""
+
+    activities: dict[int, dict] = {}
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) < 4 or parts[:3] != ["api", "v3", "activities"] or not parts[3].isdigit():
+            return self._send(404, {"message": "Record Not Found"})
+        activity = self.activities.get(int(parts[3]))
+        if activity is None:
+            return self._send(404, {"message": "Record Not Found"})
+        if parts[4:] == ["streams"]:
+            return self._send(200, generate_streams(activity))
+        # The detailed representation has more than the list endpoint returns
+        return self._send(200, {**activity, "segment_efforts": [], "laps": [], "calories": 321.0})
+
+    def _send(self, status: int, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _write_athlete(data_dir: str, activities: list[dict]):
+    directory = os.path.join(data_dir, "athletes", str(OWNER_ID))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "activities.json"), "w") as f:
+        json.dump(activities, f)
+    # Tokens that never expire, so StravaAuth does not try to refresh them
+    with open(os.path.join(directory, ".env"), "w") as f:
+        f.write("CLIENT_ID=1\nCLIENT_SECRET=x\nACCESS_TOKEN=x\nREFRESH_TOKEN=x\n")
+        f.write(f"EXPIRES_AT={int(time.time()) + 10 * 365 * 86400}\n")
+
+
+def _events(known: dict[int, dict], count: int, rng: random.Random):
+    """(aspect_type, activity id) pairs, applying each change to `known` as it goes."""
+    next_id = max(known) + 1
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        aspect = rng.choices(["create", "update", "delete"], [5, 4, 1])[0]
+        if aspect == "create":
+            when = start + timedelta(days=rng.randint(0, 60), hours=i)
+            activity = generate_activities(1, seed=rng.randint(0, 10**6), start=when)[0]
+            activity["id"] = next_id
+            next_id += 1
+            known[activity["id"]] = activity
+        else:
+            activity_id = rng.choice(list(known))
+            if aspect == "update":
+                a = known[activity_id]
+                known[activity_id] = dict(
+                    a, name=f"{a['name']} webhook edit", distance=round(a["distance"] * 1.1, 1)
+                )
+            else:
+                del known[activity_id]
+            activity = {"id": activity_id}
+        yield aspect, activity["id"]
+
+
+def _wait_applied(http: httpx.Client, expected: int) -> dict:
+    deadline = time.monotonic() + EVENT_TIMEOUT
+    while time.monotonic() < deadline:
+        status = http.get("/webhook/status").json()
+        if status["pending"] == 0 and sum(status["outcomes"].values()) >= expected:
+            return status
+        time.sleep(0.01)
+    raise RuntimeError("Event was not applied in time")
+
+
+def _snapshot_of(http: httpx.Client) -> dict:
+    results = {}
+    for route, params in CHECKS:
+        body = http.get(route, params={**(params or {}), "athlete": OWNER_ID}).json()
+        if route.endswith("/monthly-totals"):
+            # Rows within a month come in no particular order
+            body = sorted(body, key=lambda r: (r["year"], r["month"], r["sport_type"]))
+        if route.endswith("/search"):
+            body = body["results"]
+        results[route] = body
+    return results
+
+
+def main():
+    n = int(_arg("--activities", "20000"))
+    count = int(_arg("--events", "30"))
+    rng = random.Random(int(_arg("--seed", "0")))
+    activities = generate_activities(n)
+    FakeStrava.activities = {a["id"]: a for a in activities}
+
+    fake = ThreadingHTTPServer(("127.0.0.1", _free_port()), FakeStrava)
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    os.environ["STRAVA_API_URL"] = f"http://127.0.0.1:{fake.server_address[1]}/api/v3"
+    os.environ["STRAVA_WEBHOOK_VERIFY_TOKEN"] = VERIFY_TOKEN
+
+    with tempfile.TemporaryDirectory() as tmp:
+        live_dir, fresh_dir = os.path.join(tmp, "live"), os.path.join(tmp, "fresh")
+        _write_athlete(live_dir, activities)
+        port = _free_port()
+        server = start_server(live_dir, port, 1)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as http:
+                challenge = http.get("/webhook", params={
+                    "hub.mode": "subscribe", "hub.verify_token": VERIFY_TOKEN,
+                    "hub.challenge": "42",
+                }).json()
+                assert challenge == {"hub.challenge": "42"}, challenge
+                # A visited dashboard: the derived caches the events have to keep current
+                _snapshot_of(http)
+                version = http.get(
+                    "/activities", params={"limit": 1, "athlete": OWNER_ID}
+                ).json()["version"]
+
+                timings = {"create": [], "update": [], "delete": []}
+                events = _events(FakeStrava.activities, count, rng)
+                for i, (aspect, activity_id) in enumerate(events):
+                    http.post("/webhook", json={
+                        "object_type": "activity", "object_id": activity_id, "aspect_type": aspect,
+                        "owner_id": OWNER_ID, "subscription_id": 1, "updates": {},
+                        "event_time": int(time.time()),
+                    }).raise_for_status()
+                    last = _wait_applied(http, i + 1)["last"]
+                    if last["outcome"] == "failed":
+                        raise RuntimeError(f"{aspect} of {activity_id} failed: {last['error']}")
+                    timings[aspect].append(last["duration_ms"])
+                live = _snapshot_of(http)
+                changes = http.get(
+                    "/activities/changes", params={"since": version, "athlete": OWNER_ID}
+                ).json()
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(f"{n} activities, {count} events, version {version} -> {changes['version']}")
+        print(f"\n  {'event':<8} {'count':>5} {'p50 ms':>8} {'max ms':>8}")
+        for aspect, values in timings.items():
+            if values:
+                values.sort()
+                print(
+                    f"  {aspect:<8} {len(values):>5} {_percentile(values, 50):>8.1f} "
+                    f"{values[-1]:>8.1f}"
+                )
+
+        # The same storage loaded from scratch: no snapshot, summary or caches to inherit
+        ignore = shutil.ignore_patterns("*.snapshot*", "*.summary.json")
+        shutil.copytree(live_dir, fresh_dir, ignore=ignore)
+        port = _free_port()
+        server = start_server(fresh_dir, port, 1)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as http:
+                fresh = _snapshot_of(http)
+        finally:
+            server.terminate()
+            server.wait()
+    fake.shutdown()
+
+    print()
+    mismatches = 0
+    for route, _ in CHECKS:
+        same = live[route] == fresh[route]
+        mismatches += not same
+        print(f"  {route:<32} {'identical' if same else 'DIFFERENT'}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
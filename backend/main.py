@@ -1,17 +1,38 @@
 import os
 import sys
+import time
 
-from strava import StravaAuth, StravaClient, ActivityStorage, ActivityStats
-from strava import CommuteDetector, CommuteReport
+from strava import ActivityStats, CommuteDetector
+from strava.athletes import DEFAULT_ATHLETE, env_path, load_commute_config, streams_dir
+from strava.config import REPORT_CUTOFF_DAY, STREAMS_PER_SYNC
+from strava.efforts import BestEfforts, efforts_path_for
+from strava.parallel import ParallelStats
+from strava.periods import MAX_YEAR, MIN_YEAR, ReportingPeriods
+from strava.storage import ActivityStorage, open_storage
+from strava.streams import StreamStore
 
 DATA_DIR = os.path.dirname(__file__)
 
 
 def main():
-    storage = ActivityStorage(os.path.join(DATA_DIR, "activities.json"))
-
+    athlete = DEFAULT_ATHLETE
+    if "--athlete" in sys.argv:
+        idx = sys.argv.index("--athlete")
+        if idx + 1 >= len(sys.argv):
+            print("Usage: --athlete ATHLETE_ID")
+            sys.exit(1)
+        athlete = sys.argv[idx + 1]
+    try:
+        storage = open_storage(DATA_DIR, athlete)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    client = None
     if "--fetch" in sys.argv:
-        auth = StravaAuth()
+        from strava import StravaAuth, StravaClient
+
+        auth = StravaAuth(None if athlete == DEFAULT_ATHLETE else env_path(DATA_DIR, athlete))
         client = StravaClient(auth)
         activities = client.fetch_all_activities()
         print(f"\nFetched {len(activities)} activities total.")
@@ -27,40 +48,87 @@ def main():
         try:
             year, month = year_month.split("-")
             year, month = int(year), int(month)
+            if not 1 <= month <= 12 or not MIN_YEAR <= year <= MAX_YEAR:
+                raise ValueError(year_month)
         except ValueError:
             print("Invalid format. Use --report YYYY-MM")
             sys.exit(1)
 
+        cutoff_day = REPORT_CUTOFF_DAY
+        if "--cutoff-day" in sys.argv:
+            idx = sys.argv.index("--cutoff-day")
+            try:
+                cutoff_day = int(sys.argv[idx + 1])
+            except (IndexError, ValueError):
+                print("Usage: --cutoff-day DAY (31 for calendar months)")
+                sys.exit(1)
+        try:
+            periods = ReportingPeriods(cutoff_day)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+
         activities = storage.load()
-        detector = CommuteDetector()
-        commutes = detector.get_commute_activities(activities)
-        # Filter to requested month
-        commutes = [
-            c for c in commutes if c["date"].year == year and c["date"].month == month
-        ]
+        detector = CommuteDetector.from_config(load_commute_config(DATA_DIR, athlete))
+        # Same reporting periods as the API: by default the 21st of the previous month to the 20th
+        commutes = periods.index(detector.get_commute_activities(activities)).get((year, month), [])
 
+        start, end = periods.date_range(year, month)
         if not commutes:
-            print(f"No commute activities found for {year}-{month:02d}")
+            print(f"No commute activities found for {year}-{month:02d} ({start} → {end})")
             sys.exit(0)
 
+        from strava import CommuteReport
+
         report = CommuteReport(commutes, year, month)
-        filepath = report.generate(output_dir=os.path.join(DATA_DIR, "reports"))
+        report_dir = os.path.join(os.path.dirname(storage.path), "reports")
+        filepath = report.generate(output_dir=report_dir)
         print(
             f"Generated report with {len(commutes)} trips over {len(set(c['date'] for c in commutes))} days"
         )
+        print(f"Period: {start} → {end}")
         print(f"Total distance: {sum(c['distance_km'] for c in commutes):.1f} km")
         print(f"Saved to: {filepath}")
         return
 
+    if "--export" in sys.argv:
+        _export(storage, athlete)
+        return
+
+    if "--best-efforts" in sys.argv:
+        # Streams come from <athlete dir>/streams (downloaded there after a --fetch)
+        streams = StreamStore(streams_dir(DATA_DIR, athlete), client)
+        efforts = BestEfforts(efforts_path_for(storage.path))
+        scanned = efforts.update(storage.load(), streams, limit=STREAMS_PER_SYNC if client else None)
+        print(f"Scanned {scanned} activities ({len(efforts)} with streams)")
+        for sport, boards in sorted(efforts.leaderboard().items()):
+            print(f"\n--- Best efforts: {sport} ---")
+            for name, board in boards.items():
+                best = board[0]
+                if "seconds" in best:
+                    value = f"{int(best['seconds'] // 60)}:{int(best['seconds'] % 60):02d}"
+                else:
+                    value = f"{best['meters'] / 1000:.2f} km"
+                print(f"  {name}: {value}  {best['start_date'][:10]}  {best['name']}")
+        return
+
     # Stats on all activities
-    stats = ActivityStats(storage.load())
+    stats = storage.stats()
+    activities = storage.load()
+    in_memory = isinstance(storage, ActivityStorage)
+    if in_memory:
+        # In memory anyway: large histories are aggregated on a process pool
+        totals = ParallelStats(activities)
+    else:
+        # SQL-backed: the database sums the totals
+        totals = stats
 
     print(f"\n--- Total km by sport ---")
-    for sport, km in stats.total_km_by_sport().items():
+    for sport, km in totals.total_km_by_sport().items():
         print(f"  {sport}: {km:.1f} km")
 
     print(f"\n--- Total km by year and sport ---")
-    for year, sports in stats.total_km_by_year_and_sport().items():
+    for year, sports in totals.total_km_by_year_and_sport().items():
         print(f"\n  {year}:")
         for sport, km in sports.items():
             print(f"    {sport}: {km:.1f} km")
@@ -74,12 +142,92 @@ def main():
     print(f"  {biking_2025.total_km():.1f} km")
 
     print(f"\n--- Commute activities in 2025 ---")
-    detector = CommuteDetector()
-    commute_activities = detector.filter_commutes(storage.load())
+    detector = CommuteDetector.from_config(load_commute_config(DATA_DIR, athlete))
+    if in_memory:
+        commute_ids = {row["id"] for row in totals.commute_activities(detector)}
+        commute_activities = [a for a in activities if a.get("id") in commute_ids]
+    else:
+        commute_activities = detector.filter_commutes(activities)
     commute_stats = ActivityStats(commute_activities).by_year(2025)
     for sport, km in commute_stats.total_km_by_sport().items():
         print(f"  {sport}: {km:.1f} km")
 
 
+def _option(name: str) -> str | None:
+    if name not in sys.argv:
+        return None
+    idx = sys.argv.index(name)
+    if idx + 1 >= len(sys.argv):
+        print(f"Missing value for {name}")
+        sys.exit(1)
+    return sys.argv[idx + 1]
+
+
+def _export(storage, athlete: str):
+    """--export FORMAT [--sport S] [--after YYYY-MM-DD] [--before YYYY-MM-DD] [--fields a,b] [--output FILE]"""
+    from datetime import datetime
+
+    from strava.export import EARLIEST, LATEST, export, parse_fields
+
+    fmt = _option("--export")
+    query = storage.filter()
+    if _option("--sport"):
+        query = query.by_sport(_option("--sport"))
+    try:
+        after, before = _option("--after"), _option("--before")
+        if after or before:
+            query = query.by_date_range(
+                datetime.fromisoformat(after) if after else EARLIEST,
+                datetime.fromisoformat(before) if before else LATEST,
+            )
+        chunks = export(query, parse_fields(_option("--fields")), fmt)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    output = _option("--output") or os.path.join(
+        os.path.dirname(storage.path), "exports", f"activities_{athlete}.{fmt}"
+    )
+    if output == "-":
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    size = 0
+    with open(output, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    print(f"Exported {size // 1024} KiB to {output}")
+
+
+def _profiled_main():
+    """main() under cProfile; the profile goes to <data dir>/profiles (--profile)."""
+    from strava.athletes import activities_path
+    from strava.profiling import ProfileStore, profile_call
+    from strava.snapshot import read_generation, snapshot_path_for
+
+    argv = [a for a in sys.argv[1:] if a != "--profile"]
+    athlete = DEFAULT_ATHLETE
+    if "--athlete" in argv and argv.index("--athlete") + 1 < len(argv):
+        athlete = argv[argv.index("--athlete") + 1]
+    try:
+        # Generation of the snapshot the run starts from (0 when there is none yet)
+        version = read_generation(snapshot_path_for(activities_path(DATA_DIR, athlete)))
+    except ValueError:
+        version = None
+    meta = {
+        "command": " ".join(["main.py"] + argv),
+        "params": argv,
+        "dataset_version": version,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    store = ProfileStore(os.path.join(DATA_DIR, "profiles"))
+    profile_call(store, " ".join(["main"] + argv), meta, main)
+
+
 if __name__ == "__main__":
-    main()
+    if "--profile" in sys.argv:
+        _profiled_main()
+    else:
+        main()
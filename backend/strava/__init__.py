@@ -1,7 +1,31 @@
-from .auth import StravaAuth
-from .client import StravaClient
-from .commute import CommuteDetector
-from .filter import ActivityFilter
-from .report import CommuteReport
-from .stats import ActivityStats
-from .storage import ActivityStorage
+# Public classes are imported on first access (PEP 562) so that the heavy
+# dependencies (requests/dotenv for auth and client, openpyxl for reports) are only
+# paid for by code paths that actually use them.
+_EXPORTS = {
+    "StravaAuth": ".auth",
+    "StravaClient": ".client",
+    "CommuteDetector": ".commute",
+    "ActivityFilter": ".filter",
+    "CommuteReport": ".report",
+    "ActivityStats": ".stats",
+    "ActivityStorage": ".storage",
+    "SQLiteActivityStorage": ".sqlite_storage",
+    "JournalActivityStorage": ".journal_storage",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
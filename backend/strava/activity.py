@@ -0,0 +1,121 @@
+"""Compact in-memory activity record.
+
+A Strava activity dict has ~55 keys, nested athlete/map dicts and a hash table per
+activity. Activity keeps the fields the code reads in __slots__, interns repeated
+strings and keeps everything else as compact JSON bytes, decoded only when asked
+for. It is a read-only Mapping, so code using .get() and [] works unchanged.
+"""
+
+import json
+import sys
+from collections.abc import Mapping
+
+# Every field read by filters, stats, commute detection and the snapshot
+SLOT_FIELDS = (
+    "id", "name", "sport_type", "type", "start_date", "start_date_local", "timezone",
+    "utc_offset", "distance", "moving_time", "elapsed_time", "total_elevation_gain",
+    "average_speed", "max_speed", "average_heartrate", "max_heartrate", "kilojoules",
+    "suffer_score", "gear_id", "location_city", "device_name", "commute", "trainer",
+    "manual", "private", "start_latlng", "end_latlng",
+)
+_INTERNED = {"sport_type", "type", "timezone", "gear_id", "location_city", "device_name"}
+_SLOT_SET = frozenset(SLOT_FIELDS)
+
+# Key orders seen so far; Strava sends the same order for every activity, so records
+# share one tuple
+_KEY_ORDERS: dict[tuple, tuple] = {}
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<missing>"
+
+
+_MISSING = _Missing()
+
+
+class Activity(Mapping):
+    __slots__ = SLOT_FIELDS + ("_keys", "_extra")
+
+    def __init__(self, data: dict, keep_raw: bool = True):
+        """Build from a Strava activity dict; keep_raw=False drops non-slot fields."""
+        for field in SLOT_FIELDS:
+            value = data.get(field, _MISSING)
+            if field in _INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            object.__setattr__(self, field, value)
+        if keep_raw:
+            keys = tuple(data)
+            extra = {k: v for k, v in data.items() if k not in _SLOT_SET}
+        else:
+            keys = tuple(k for k in data if k in _SLOT_SET)
+            extra = None
+        object.__setattr__(self, "_keys", _KEY_ORDERS.setdefault(keys, keys))
+        object.__setattr__(
+            self,
+            "_extra",
+            json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode() if extra else None,
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Activity is read-only")
+
+    def _extras(self) -> dict:
+        return json.loads(self._extra) if self._extra else {}
+
+    def __getitem__(self, key):
+        if key in _SLOT_SET:
+            value = getattr(self, key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if key in self._keys:
+            return self._extras()[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        # Fast path for slot fields: no exception machinery
+        if key in _SLOT_SET:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        return super().get(key, default)
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_dict(self) -> dict:
+        """The full activity as a plain dict, in the original key order."""
+        extras = self._extras()
+        return {k: extras[k] if k in extras else getattr(self, k) for k in self._keys}
+
+    def __eq__(self, other):
+        if isinstance(other, Activity):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return Activity, (self.to_dict(),)
+
+    def __repr__(self):
+        return f"Activity(id={self.get('id')!r}, sport_type={self.get('sport_type')!r}, start_date={self.get('start_date')!r})"
+
+
+def as_activity(activity) -> Activity:
+    return activity if isinstance(activity, Activity) else Activity(activity)
+
+
+def to_dict(activity) -> dict:
+    """Plain dict for serialization, whether given an Activity or a dict."""
+    return activity.to_dict() if isinstance(activity, Activity) else activity
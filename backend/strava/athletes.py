@@ -0,0 +1,88 @@
+import json
+import os
+import re
+
+DEFAULT_ATHLETE = "default"
+
+_ATHLETE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def validate_athlete_id(athlete_id: str) -> str:
+    if not _ATHLETE_ID_RE.match(athlete_id):
+        raise ValueError(f"Invalid athlete id: {athlete_id!r}")
+    return athlete_id
+
+
+def athlete_dir(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> str:
+    """Directory holding one athlete's data shard.
+
+    The default athlete keeps the historical single-user layout (files directly in
+    base_dir); every other athlete gets its own athletes/<id>/ directory.
+    """
+    validate_athlete_id(athlete_id)
+    if athlete_id == DEFAULT_ATHLETE:
+        return base_dir
+    return os.path.join(base_dir, "athletes", athlete_id)
+
+
+def athlete_for_owner(
+    base_dir: str, owner_id: int, default_owner_id: str | None = None
+) -> str | None:
+    """The shard of a Strava athlete: athletes/<owner id>/ if there is one, the default
+    athlete (the single-user layout) if owner_id is its Strava id, else None."""
+    athlete_id = str(owner_id)
+    if os.path.isdir(athlete_dir(base_dir, athlete_id)):
+        return athlete_id
+    if default_owner_id is not None and athlete_id == str(default_owner_id):
+        return DEFAULT_ATHLETE
+    return None
+
+
+def activities_path(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> str:
+    return os.path.join(athlete_dir(base_dir, athlete_id), "activities.json")
+
+
+def database_path(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> str:
+    """SQLite storage, used instead of activities.json with STRAVA_STORAGE=sqlite."""
+    return os.path.join(athlete_dir(base_dir, athlete_id), "activities.db")
+
+
+def journal_path(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> str:
+    """Active journal segment, used instead of activities.json with STRAVA_STORAGE=journal."""
+    return os.path.join(athlete_dir(base_dir, athlete_id), "activities.journal")
+
+
+def env_path(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> str:
+    return os.path.join(athlete_dir(base_dir, athlete_id), ".env")
+
+
+def streams_dir(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> str:
+    """Downloaded (or fixture) activity streams, one <activity id>.json per activity."""
+    return os.path.join(athlete_dir(base_dir, athlete_id), "streams")
+
+
+def commute_config_path(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> str:
+    """Optional per-athlete CommuteDetector settings (places, radius_km, work hours)."""
+    return os.path.join(athlete_dir(base_dir, athlete_id), "commute.json")
+
+
+def load_commute_config(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> dict:
+    """The athlete's commute.json settings, or {} to use the defaults from config.py."""
+    try:
+        with open(commute_config_path(base_dir, athlete_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def gear_config_path(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> str:
+    """Optional per-athlete gear names and service intervals ({gear_id: {name, intervals}})."""
+    return os.path.join(athlete_dir(base_dir, athlete_id), "gear.json")
+
+
+def load_gear_config(base_dir: str, athlete_id: str = DEFAULT_ATHLETE) -> dict:
+    try:
+        with open(gear_config_path(base_dir, athlete_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
@@ -2,21 +2,33 @@ import os
 import time
 
 import requests
-from dotenv import load_dotenv
+from dotenv import dotenv_values
 
 
 class StravaAuth:
     TOKEN_URL = "https://www.strava.com/oauth/token"
 
     def __init__(self, env_path=None):
+        # Each athlete has its own token file. Values are read from that file only
+        # (never exported to os.environ) so several athletes can coexist in one
+        # process; the shared app credentials may still come from the environment.
+        default_env = env_path is None
         self._env_path = env_path or os.path.join(os.path.dirname(__file__), "..", ".env")
-        load_dotenv(self._env_path)
+        values = dotenv_values(self._env_path) if os.path.exists(self._env_path) else {}
 
-        self._client_id = os.environ["CLIENT_ID"]
-        self._client_secret = os.environ["CLIENT_SECRET"]
-        self._access_token = os.environ["ACCESS_TOKEN"]
-        self._refresh_token = os.environ["REFRESH_TOKEN"]
-        self._expires_at = int(os.environ["EXPIRES_AT"])
+        def get(key, from_environ):
+            value = values.get(key)
+            if not value and from_environ:
+                value = os.environ.get(key)
+            if not value:
+                raise KeyError(f"{key} not set in {self._env_path}")
+            return value
+
+        self._client_id = get("CLIENT_ID", True)
+        self._client_secret = get("CLIENT_SECRET", True)
+        self._access_token = get("ACCESS_TOKEN", default_env)
+        self._refresh_token = get("REFRESH_TOKEN", default_env)
+        self._expires_at = int(get("EXPIRES_AT", default_env))
 
     @property
     def access_token(self):
@@ -45,6 +57,7 @@ class StravaAuth:
         print("Token refreshed successfully.")
 
     def _persist(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self._env_path)), exist_ok=True)
         with open(self._env_path, "w") as f:
             f.write(f"CLIENT_ID={self._client_id}\n")
             f.write(f"CLIENT_SECRET={self._client_secret}\n")
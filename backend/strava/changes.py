@@ -0,0 +1,129 @@
+"""Per-sync change sets, recorded against snapshot generations.
+
+Each sync diffs the previous dataset with the new one and appends an entry to a
+small JSON log next to activities.json: which activity ids changed or vanished,
+and which aggregate buckets (year, month, sport) and commute periods they touched.
+Clients holding version N can then ask for everything that changed after N.
+"""
+
+import json
+import os
+from datetime import datetime
+
+from .snapshot import FIELDS
+
+# Number of syncs kept in the log; older clients have to reload everything
+MAX_ENTRIES = 100
+
+
+def changes_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".changes.json"
+
+
+def _fingerprint(activity) -> tuple:
+    # Falsy values are folded together: Strava sends [] for missing coordinates,
+    # which snapshots store as None
+    return tuple(activity.get(f) or None for f in FIELDS)
+
+
+def month_bucket(activity) -> tuple[int, int, str]:
+    dt = datetime.fromisoformat(activity["start_date"].replace("Z", "+00:00"))
+    return dt.year, dt.month, activity.get("sport_type", "Unknown")
+
+
+class ChangeSet:
+    def __init__(self):
+        self.updated: set[int] = set()
+        self.deleted: set[int] = set()
+        self.buckets: set[tuple[int, int, str]] = set()
+        self.commute_periods: set[tuple[int, int]] = set()
+
+    def __bool__(self) -> bool:
+        return bool(self.updated or self.deleted)
+
+    def merge(self, other: "ChangeSet"):
+        """Fold a later change set into this one."""
+        self.updated = (self.updated - other.deleted) | other.updated
+        self.deleted = (self.deleted - other.updated) | other.deleted
+        self.buckets |= other.buckets
+        self.commute_periods |= other.commute_periods
+
+    def to_entry(self, version: int) -> dict:
+        return {
+            "version": version,
+            "updated": sorted(self.updated),
+            "deleted": sorted(self.deleted),
+            "buckets": sorted(self.buckets),
+            "commute_periods": sorted(self.commute_periods),
+        }
+
+    @classmethod
+    def from_entry(cls, entry: dict) -> "ChangeSet":
+        changes = cls()
+        changes.updated = set(entry["updated"])
+        changes.deleted = set(entry["deleted"])
+        changes.buckets = {tuple(b) for b in entry["buckets"]}
+        changes.commute_periods = {tuple(p) for p in entry["commute_periods"]}
+        return changes
+
+
+def diff_activities(old, new, detector=None, period_of=None) -> ChangeSet:
+    """Compare two datasets by activity id.
+
+    With a CommuteDetector and a date -> (year, month) period function, the commute
+    periods of both the old and new version of every changed activity are recorded.
+    """
+    changes = ChangeSet()
+    old_by_id = {a.get("id"): a for a in old}
+    touched = []
+    for a in new:
+        previous = old_by_id.pop(a.get("id"), None)
+        if previous is not None and _fingerprint(previous) == _fingerprint(a):
+            continue
+        changes.updated.add(a.get("id"))
+        touched.append(a)
+        if previous is not None:
+            touched.append(previous)
+    for activity_id, previous in old_by_id.items():
+        changes.deleted.add(activity_id)
+        touched.append(previous)
+
+    for a in touched:
+        changes.buckets.add(month_bucket(a))
+        if detector is not None and period_of is not None and detector.is_commute(a):
+            changes.commute_periods.add(period_of(detector._parse_local_dt(a).date()))
+    return changes
+
+
+class ChangeLog:
+    def __init__(self, path: str):
+        self._path = path
+
+    def _read(self) -> list[dict]:
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def append(self, version: int, changes: ChangeSet):
+        entries = self._read()
+        entries.append(changes.to_entry(version))
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries[-MAX_ENTRIES:], f)
+        os.replace(tmp_path, self._path)
+
+    def since(self, version: int, current: int) -> ChangeSet | None:
+        """Merged changes from version (exclusive) to current, or None if the log
+        no longer covers that range and the client must reload in full."""
+        changes = ChangeSet()
+        if version >= current:
+            return changes if version == current else None
+        entries = [e for e in self._read() if version < e["version"] <= current]
+        # Every generation after `version` must be present, otherwise a sync is missing
+        if [e["version"] for e in entries] != list(range(version + 1, current + 1)):
+            return None
+        for entry in entries:
+            changes.merge(ChangeSet.from_entry(entry))
+        return changes
@@ -1,3 +1,4 @@
+import os
 from datetime import datetime
 
 import requests
@@ -6,7 +7,8 @@ from .auth import StravaAuth
 
 
 class StravaClient:
-    BASE_URL = "https://www.strava.com/api/v3"
+    # Overridable to point at a local stand-in (see benchmarks/webhook.py)
+    BASE_URL = os.environ.get("STRAVA_API_URL", "https://www.strava.com/api/v3")
 
     def __init__(self, auth: StravaAuth):
         self._auth = auth
@@ -49,3 +51,23 @@ class StravaClient:
             page += 1
 
         return activities
+
+    def fetch_activity(self, activity_id: int) -> dict | None:
+        """One activity (as the owner sees it), or None if it no longer exists."""
+        resp = self._session.get(f"{self.BASE_URL}/activities/{activity_id}", headers=self._headers)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return resp.json()
+
+    def fetch_streams(self, activity_id: int, keys: tuple[str, ...] = ("distance", "time")) -> dict:
+        """Raw streams of one activity, keyed by type ({"distance": {"data": [...]}, ...})."""
+        resp = self._session.get(
+            f"{self.BASE_URL}/activities/{activity_id}/streams",
+            headers=self._headers,
+            params={"keys": ",".join(keys), "key_by_type": "true"},
+        )
+        if resp.status_code == 404:
+            return {}
+        resp.raise_for_status()
+        return resp.json()
@@ -1,5 +1,8 @@
+import importlib.util
 import math
+import threading
 from datetime import datetime
+from functools import cache
 from zoneinfo import ZoneInfo
 
 from .config import CITY_A, CITY_B, RADIUS_KM, WORK_HOUR_START, WORK_HOUR_END, TIMEZONE
@@ -19,7 +22,110 @@ def _haversine_km(lat1, lon1, lat2, lon2):
     return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 
+@cache
+def _numpy():
+    """numpy if installed (the fast extra), else None; imported on first use only."""
+    if importlib.util.find_spec("numpy") is None:
+        return None
+    import numpy
+
+    return numpy
+
+
+def _haversine_column(lats, lons, lat, lon):
+    """Distances in km from every (lats[i], lons[i]) to one point; NaN where unknown.
+
+    One vectorized pass with numpy, else a Python loop; either result is indexable.
+    """
+    R2 = 2 * 6371
+    rlat, rlon = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(rlat)
+    np = _numpy()
+    if np is not None:
+        la = np.radians(np.asarray(lats, dtype=float))
+        lo = np.radians(np.asarray(lons, dtype=float))
+        h = np.sin((la - rlat) / 2) ** 2 + np.cos(la) * cos_lat * np.sin((lo - rlon) / 2) ** 2
+        return R2 * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    result = []
+    for la, lo in zip(lats, lons):
+        if la != la:  # NaN: no coordinates
+            result.append(math.nan)
+            continue
+        la, lo = radians(la), radians(lo)
+        h = sin((la - rlat) / 2) ** 2 + cos(la) * cos_lat * sin((lo - rlon) / 2) ** 2
+        result.append(R2 * asin(sqrt(min(h, 1.0))))
+    return result
+
+
+def _latlng_columns(activities, field) -> tuple[list[float], list[float]]:
+    if hasattr(activities, "column"):
+        return list(activities.column(f"{field}.lat")), list(activities.column(f"{field}.lng"))
+    lats, lngs = [], []
+    for a in activities:
+        latlng = a.get(field)
+        if latlng and len(latlng) >= 2:
+            lats.append(latlng[0])
+            lngs.append(latlng[1])
+        else:
+            lats.append(math.nan)
+            lngs.append(math.nan)
+    return lats, lngs
+
+
+class PlaceDistances:
+    """Per-dataset cache of start/end distances to places, and of local start times.
+
+    Each place costs one pass over the coordinate columns the first time it is used
+    (vectorized when numpy is installed); afterwards any detector configuration
+    reusing that place only compares numbers.
+    """
+
+    def __init__(self, activities):
+        self._activities = activities
+        self._start = _latlng_columns(activities, "start_latlng")
+        self._end = _latlng_columns(activities, "end_latlng")
+        self._distances: dict[tuple[float, float], tuple] = {}
+        self._local: dict[str, list[datetime]] = {}
+        self._lock = threading.Lock()
+
+    def distances(self, place) -> tuple:
+        """(start distances, end distances) in km from every activity to place."""
+        key = (place["lat"], place["lon"])
+        columns = self._distances.get(key)
+        if columns is None:
+            columns = (
+                _haversine_column(*self._start, *key),
+                _haversine_column(*self._end, *key),
+            )
+            with self._lock:
+                columns = self._distances.setdefault(key, columns)
+        return columns
+
+    def local_datetimes(self, timezone: str) -> list[datetime]:
+        local = self._local.get(timezone)
+        if local is None:
+            tz = ZoneInfo(timezone)
+            local = [
+                datetime.fromisoformat(a["start_date"].replace("Z", "+00:00")).astimezone(tz)
+                for a in self._activities
+            ]
+            with self._lock:
+                local = self._local.setdefault(timezone, local)
+        return local
+
+    def __len__(self) -> int:
+        return len(self._start[0])
+
+
 class CommuteDetector:
+    """Detects commutes between any two of N named places.
+
+    An activity is a commute when it starts within the radius of one place, ends
+    within the radius of another, on a weekday within the work hours. The historic
+    two-city setup (city_a/city_b) is the default list of places.
+    """
+
     def __init__(
         self,
         city_a=CITY_A,
@@ -28,79 +134,161 @@ class CommuteDetector:
         work_hour_start=WORK_HOUR_START,
         work_hour_end=WORK_HOUR_END,
         timezone=TIMEZONE,
+        places=None,
     ):
         self.city_a = city_a
         self.city_b = city_b
         self.radius_km = radius_km
+        self.places = [
+            {**p, "radius_km": p.get("radius_km", radius_km)}
+            for p in (places if places is not None else [city_a, city_b])
+        ]
         self.work_hour_start = work_hour_start
         self.work_hour_end = work_hour_end
+        self.timezone = timezone
         self.tz = ZoneInfo(timezone)
 
+    @classmethod
+    def from_config(cls, config: dict) -> "CommuteDetector":
+        """Build a detector from a JSON-style dict (places, radius_km, work hours, timezone)."""
+        keys = ("places", "radius_km", "work_hour_start", "work_hour_end", "timezone")
+        return cls(**{k: config[k] for k in keys if k in config})
+
+    def cache_key(self) -> tuple:
+        """Hashable identity of this configuration, for caching derived results."""
+        places = tuple((p["name"], p["lat"], p["lon"], p["radius_km"]) for p in self.places)
+        return places, self.work_hour_start, self.work_hour_end, self.timezone
+
+    @classmethod
+    def from_cache_key(cls, key: tuple) -> "CommuteDetector":
+        """The detector a cache_key() was taken from."""
+        places, work_hour_start, work_hour_end, timezone = key
+        return cls(
+            places=[
+                {"name": name, "lat": lat, "lon": lon, "radius_km": radius_km}
+                for name, lat, lon, radius_km in places
+            ],
+            work_hour_start=work_hour_start,
+            work_hour_end=work_hour_end,
+            timezone=timezone,
+        )
+
     def _near_city(self, latlng, city):
         if not latlng or len(latlng) < 2:
             return False
         return (
             _haversine_km(latlng[0], latlng[1], city["lat"], city["lon"])
-            <= self.radius_km
+            <= city.get("radius_km", self.radius_km)
         )
 
     def _parse_local_dt(self, activity):
         dt_utc = datetime.fromisoformat(activity["start_date"].replace("Z", "+00:00"))
         return dt_utc.astimezone(self.tz)
 
-    def is_commute(self, activity):
+    def _in_work_hours(self, local_dt):
+        if local_dt.weekday() >= 5:  # Saturday=5, Sunday=6
+            return False
+        return self.work_hour_start <= local_dt.hour < self.work_hour_end
+
+    @staticmethod
+    def _first_pair(start_near, end_near):
+        # Places are tried in configuration order, matching the historic A→B before B→A
+        for p in start_near:
+            for q in end_near:
+                if p != q:
+                    return p, q
+        return None
+
+    def _route(self, activity):
         start = activity.get("start_latlng")
         end = activity.get("end_latlng")
         if not start or not end:
-            return False
+            return None
+        start_near = [i for i, p in enumerate(self.places) if self._near_city(start, p)]
+        end_near = [i for i, p in enumerate(self.places) if self._near_city(end, p)]
+        return self._first_pair(start_near, end_near)
 
-        # Check location: start near one city, end near the other
-        a_to_b = self._near_city(start, self.city_a) and self._near_city(
-            end, self.city_b
-        )
-        b_to_a = self._near_city(start, self.city_b) and self._near_city(
-            end, self.city_a
-        )
-        if not (a_to_b or b_to_a):
+    def is_commute(self, activity):
+        # Check location: start near one place, end near another
+        if self._route(activity) is None:
             return False
-
         # Check weekday and work hours
-        local_dt = self._parse_local_dt(activity)
-        if local_dt.weekday() >= 5:  # Saturday=5, Sunday=6
-            return False
-        if not (self.work_hour_start <= local_dt.hour < self.work_hour_end):
-            return False
-
-        return True
+        return self._in_work_hours(self._parse_local_dt(activity))
 
     def detect_departure_arrival(self, activity):
-        """Returns (departure_city_name, arrival_city_name)."""
-        start = activity.get("start_latlng")
-        end = activity.get("end_latlng")
-        if self._near_city(start, self.city_a) and self._near_city(end, self.city_b):
-            return self.city_a["name"], self.city_b["name"]
-        return self.city_b["name"], self.city_a["name"]
+        """Returns (departure_place_name, arrival_place_name)."""
+        route = self._route(activity) or (1, 0)
+        return self.places[route[0]]["name"], self.places[route[1]]["name"]
+
+    def routes(self, activities, distances: PlaceDistances | None = None):
+        """Per activity, the (departure, arrival) place indexes of a commute, else None.
+
+        Uses precomputed place distances, so no haversine runs for places already seen.
+        """
+        if distances is None:
+            distances = PlaceDistances(activities)
+        columns = [distances.distances(p) for p in self.places]
+        radii = [p["radius_km"] for p in self.places]
+        local = distances.local_datetimes(self.timezone)
+        np = _numpy()
+        if np is not None:
+            return self._routes_vectorized(np, columns, radii, local)
+        result = []
+        for i in range(len(distances)):
+            start_near = [p for p, (s, _) in enumerate(columns) if s[i] <= radii[p]]
+            if not start_near:
+                result.append(None)
+                continue
+            end_near = [p for p, (_, e) in enumerate(columns) if e[i] <= radii[p]]
+            route = self._first_pair(start_near, end_near)
+            if route is not None and not self._in_work_hours(local[i]):
+                route = None
+            result.append(route)
+        return result
+
+    def _routes_vectorized(self, np, columns, radii, local):
+        # One mask per (departure, arrival) pair, in _first_pair's order; only the rows
+        # that match a pair are looked at one by one, for the work hours
+        starts = [s <= r for (s, _), r in zip(columns, radii)]
+        ends = [e <= r for (_, e), r in zip(columns, radii)]
+        result = [None] * len(local)
+        unmatched = np.ones(len(local), dtype=bool)
+        for p, start in enumerate(starts):
+            for q, end in enumerate(ends):
+                if p == q:
+                    continue
+                rows = np.flatnonzero(unmatched & start & end)
+                unmatched[rows] = False
+                for i in rows.tolist():
+                    if self._in_work_hours(local[i]):
+                        result[i] = (p, q)
+        return result
 
-    def filter_commutes(self, activities):
+    def filter_commutes(self, activities, distances: PlaceDistances | None = None):
         """Return only activities that are commutes (raw, unmodified)."""
-        return [a for a in activities if self.is_commute(a)]
+        routes = self.routes(activities, distances)
+        return [a for a, route in zip(activities, routes) if route is not None]
 
-    def get_commute_activities(self, activities):
+    def get_commute_activities(self, activities, distances: PlaceDistances | None = None):
         """Filter and enrich activities with commute metadata."""
+        if distances is None:
+            distances = PlaceDistances(activities)
+        local = distances.local_datetimes(self.timezone)
         result = []
-        for a in activities:
-            if not self.is_commute(a):
+        for i, route in enumerate(self.routes(activities, distances)):
+            if route is None:
                 continue
-            dep, arr = self.detect_departure_arrival(a)
-            local_dt = self._parse_local_dt(a)
+            a = activities[i]
+            local_dt = local[i]
             result.append(
                 {
                     "date": local_dt.date(),
                     "datetime": local_dt,
-                    "departure": dep,
-                    "arrival": arr,
+                    "departure": self.places[route[0]]["name"],
+                    "arrival": self.places[route[1]]["name"],
                     "distance_km": a.get("distance", 0) / 1000,
                     "name": a.get("name", ""),
+                    "id": a.get("id"),
                 }
             )
         result.sort(key=lambda x: x["datetime"])
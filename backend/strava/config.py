@@ -14,3 +14,34 @@ TIMEZONE = "Europe/Paris"
 
 # Reimbursement rate (€/km)
 RATE_PER_KM = 0.25
+
+# Reimbursement periods end on this day of the month (21st of the previous month to
+# the 20th); 31 gives plain calendar months
+REPORT_CUTOFF_DAY = 20
+
+# Training load (used when an activity has no Strava suffer_score)
+HR_REST = 60
+HR_MAX = 190
+ATL_DAYS = 7   # acute load time constant
+CTL_DAYS = 42  # chronic load time constant
+
+# Best efforts: fastest time over these distances (m), longest distance in these durations (s)
+BEST_EFFORT_DISTANCES = {"1k": 1000, "5k": 5000, "10k": 10000, "40k": 40000}
+BEST_EFFORT_DURATIONS = {"1h": 3600}
+BEST_EFFORTS_TOP = 5  # leaderboard entries kept per sport and effort
+
+# Strava allows 100 requests per 15 minutes; stream downloads stay below that over any
+# 15 minutes, however many syncs run in the process, and per sync
+STREAM_DOWNLOADS_PER_WINDOW = 80
+STREAM_DOWNLOAD_WINDOW_SECONDS = 15 * 60
+STREAMS_PER_SYNC = 80
+
+# Component service intervals (km) by Strava gear kind: "b" bikes, "g" shoes/skates.
+# Override per gear in the athlete's gear.json
+GEAR_SERVICE_INTERVALS_KM = {
+    "b": {"chain": 3000, "brake pads": 2000, "tires": 5000},
+    "g": {"wheels": 600, "bearings": 1500},
+}
+
+# Below this many activities ParallelStats runs single-process (pool start-up costs more)
+PARALLEL_MIN_ACTIVITIES = 50_000
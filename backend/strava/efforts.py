@@ -0,0 +1,196 @@
+"""Best efforts (personal records) per sport, from activity streams.
+
+Each activity is scanned once: a two-pointer window over its distance/time streams
+gives the fastest time for every target distance and the longest distance for every
+target duration in linear time. Results are cached per activity in a JSON file next
+to activities.json together with the all-time leaderboard, so a sync only scans new
+or edited activities and merges them into the leaderboard.
+"""
+
+import json
+import os
+
+from .config import BEST_EFFORT_DISTANCES, BEST_EFFORT_DURATIONS, BEST_EFFORTS_TOP
+
+
+def efforts_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".efforts.json"
+
+
+def fastest_over_distance(distance, time, target: float) -> tuple[float, int, int] | None:
+    """(seconds, start index, end index) of the fastest window covering target meters."""
+    best = None
+    i = 0
+    for j in range(len(distance)):
+        # Latest start that still covers the target from j: the shortest time ending at j
+        while i < j and distance[j] - distance[i + 1] >= target:
+            i += 1
+        if distance[j] - distance[i] >= target:
+            elapsed = time[j] - time[i]
+            if best is None or elapsed < best[0]:
+                best = (elapsed, i, j)
+    return best
+
+
+def farthest_in_duration(distance, time, seconds: float) -> tuple[float, int, int] | None:
+    """(meters, start index, end index) of the longest distance covered within seconds."""
+    if not time or time[-1] - time[0] < seconds:
+        return None
+    best = None
+    i = 0
+    for j in range(len(time)):
+        while time[j] - time[i] > seconds:
+            i += 1
+        covered = distance[j] - distance[i]
+        if best is None or covered > best[0]:
+            best = (covered, i, j)
+    return best
+
+
+def activity_efforts(distance, time) -> dict[str, dict]:
+    """Every configured effort an activity's streams contain."""
+    efforts = {}
+    for name, target in BEST_EFFORT_DISTANCES.items():
+        found = fastest_over_distance(distance, time, target)
+        if found is not None:
+            efforts[name] = {"seconds": found[0], "start_index": found[1], "end_index": found[2]}
+    for name, seconds in BEST_EFFORT_DURATIONS.items():
+        found = farthest_in_duration(distance, time, seconds)
+        if found is not None:
+            efforts[name] = {"meters": found[0], "start_index": found[1], "end_index": found[2]}
+    return efforts
+
+
+def _rank_key(effort: dict) -> float:
+    # Lower is better: time for distance efforts, negated distance for duration efforts
+    return effort["seconds"] if "seconds" in effort else -effort["meters"]
+
+
+def _signature(activity) -> list:
+    # Edits that change what the streams describe make the cached result stale
+    return [activity.get("distance"), activity.get("moving_time"), activity.get("elapsed_time")]
+
+
+class BestEfforts:
+    """Per-activity effort cache plus the incrementally maintained leaderboard."""
+
+    def __init__(self, path: str):
+        self._path = path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        # Keys are activity ids as strings (JSON object keys)
+        self._activities: dict[str, dict] = data.get("activities", {})
+        self._leaderboard: dict[str, dict[str, list[dict]]] = data.get("leaderboard", {})
+
+    def update(self, activities, streams, limit: int | None = None) -> int:
+        """Scan the activities not cached yet (or edited since), drop deleted ones.
+
+        At most `limit` streams are downloaded, within the stream store's budget; the
+        rest, and everything after a failed download, are picked up by the next
+        update. Returns the number of activities scanned.
+        """
+        current = {str(a.get("id")): a for a in activities}
+        removed = [i for i in self._activities if i not in current]
+        return self._apply(current, removed, streams, limit)
+
+    def apply(self, changed, removed_ids, streams, limit: int | None = None) -> int:
+        """Like update(), for a few known changes instead of the whole dataset."""
+        current = {str(a.get("id")): a for a in changed}
+        return self._apply(current, [str(i) for i in removed_ids], streams, limit)
+
+    def _apply(self, current: dict, removed_ids: list[str], streams, limit: int | None) -> int:
+        stale_sports = set()
+        for activity_id in removed_ids:
+            entry = self._activities.pop(activity_id, None)
+            if entry is not None:
+                stale_sports.add(entry["sport_type"])
+        for activity_id, activity in current.items():
+            entry = self._activities.get(activity_id)
+            if entry is not None and entry["signature"] != _signature(activity):
+                stale_sports.add(entry["sport_type"])
+                del self._activities[activity_id]
+
+        scanned, downloads, stopped = [], 0, False
+        for activity_id, a in current.items():
+            if activity_id in self._activities or not a.get("distance"):
+                continue
+            download = not streams.has(activity_id) and streams.can_download
+            if download and (stopped or (limit is not None and downloads >= limit)):
+                continue
+            try:
+                found = streams.get(activity_id)
+            except OSError as e:  # requests' errors included, e.g. a 429 from Strava
+                # What was scanned is kept; the rest waits for the next update
+                print(f"Downloading streams of activity {activity_id} failed: {e}")
+                stopped = True
+                continue
+            except ValueError as e:
+                # A corrupt stream file: skipped, the other activities are still scanned
+                print(f"Reading streams of activity {activity_id} failed: {e}")
+                continue
+            if found is None:
+                # Out of download budget: the rest waits for the next update
+                stopped = stopped or download
+                continue
+            if download:
+                downloads += 1
+            entry = {
+                "sport_type": a.get("sport_type", "Unknown"),
+                "name": a.get("name", ""),
+                "start_date": a.get("start_date"),
+                "signature": _signature(a),
+                "efforts": activity_efforts(*found),
+            }
+            self._activities[activity_id] = entry
+            scanned.append((activity_id, entry))
+
+        # Removals may promote any cached effort: rebuild those sports from the cache.
+        # Additions only compete with the current top entries.
+        for sport in stale_sports:
+            self._leaderboard.pop(sport, None)
+        for activity_id, entry in self._activities.items():
+            if entry["sport_type"] in stale_sports:
+                self._merge(activity_id, entry)
+        for activity_id, entry in scanned:
+            if entry["sport_type"] not in stale_sports:
+                self._merge(activity_id, entry)
+
+        if scanned or stale_sports:
+            self._write()
+        return len(scanned)
+
+    def _merge(self, activity_id: str, entry: dict):
+        boards = self._leaderboard.setdefault(entry["sport_type"], {})
+        for name, effort in entry["efforts"].items():
+            board = boards.setdefault(name, [])
+            board.append({
+                "id": int(activity_id),
+                "name": entry["name"],
+                "start_date": entry["start_date"],
+                **effort,
+            })
+            board.sort(key=_rank_key)
+            del board[BEST_EFFORTS_TOP:]
+
+    def _write(self):
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"activities": self._activities, "leaderboard": self._leaderboard},
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        os.replace(tmp_path, self._path)
+
+    def leaderboard(self, sport_type: str | None = None) -> dict[str, dict[str, list[dict]]]:
+        """{sport_type: {effort name: best entries first}}, optionally for one sport."""
+        if sport_type is None:
+            return self._leaderboard
+        return {sport_type: self._leaderboard.get(sport_type, {})}
+
+    def __len__(self) -> int:
+        return len(self._activities)
@@ -0,0 +1,165 @@
+"""Streaming export of activities as CSV, NDJSON or Parquet.
+
+Writers take any iterable of activities (an ActivityFilter, a SQLActivityFilter, a
+snapshot) and a field projection, and yield encoded chunks as they go: memory holds
+one batch of rows whatever the size of the result, and the first bytes are out
+before the query has finished. Parquet is written one row group at a time and needs
+pyarrow (`pip install strava-stats[export]`).
+"""
+
+import csv
+import importlib.util
+import io
+import json
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+
+from .snapshot import BOOL_FIELDS, FIELDS, FLOAT_FIELDS, INT_FIELDS, LATLNG_FIELDS
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+DEFAULT_EXPORT_FIELDS = (
+    "id", "name", "sport_type", "start_date", "start_date_local", "distance", "moving_time",
+    "elapsed_time", "total_elevation_gain", "average_speed", "average_heartrate", "gear_id",
+    "commute",
+)
+# Stand-ins for an open end of a date range (datetime.max overflows the SQL bound)
+EARLIEST, LATEST = datetime(1900, 1, 1), datetime(9999, 1, 1)
+CHUNK_ROWS = 1000
+PARQUET_ROW_GROUP = 10_000
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def parse_fields(value: str | None) -> tuple[str, ...]:
+    """Comma-separated projection, checked against the exportable fields."""
+    if not value:
+        return DEFAULT_EXPORT_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def export(activities: Iterable, fields: tuple[str, ...], fmt: str) -> Iterator[bytes]:
+    """Encoded chunks of the projected activities, in the given format."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("Parquet export needs pyarrow (pip install strava-stats[export])")
+    rows = ([a.get(f) for f in fields] for a in activities)
+    writer = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}[fmt]
+    return writer(rows, fields)
+
+
+def _batches(rows: Iterator[list], size: int) -> Iterator[list[list]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return json.dumps(value)
+    return value
+
+
+def _csv(rows: Iterator[list], fields: tuple[str, ...]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    # The header goes out before the first row is read
+    yield buffer.getvalue().encode()
+    for batch in _batches(rows, CHUNK_ROWS):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(v) for v in row] for row in batch)
+        yield buffer.getvalue().encode()
+
+
+def _ndjson(rows: Iterator[list], fields: tuple[str, ...]) -> Iterator[bytes]:
+    for batch in _batches(rows, CHUNK_ROWS):
+        yield "".join(
+            json.dumps(dict(zip(fields, row)), ensure_ascii=False, separators=(",", ":")) + "\n"
+            for row in batch
+        ).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what the Parquet writer emits until taken."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parse_datetime(value: str | None, utc: bool) -> datetime | None:
+    if value is None:
+        return None
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # start_date_local is wall-clock time that Strava suffixes with Z anyway
+    return dt if utc else dt.replace(tzinfo=None)
+
+
+def _arrow_column(pa, field: str, values: list):
+    if field == "start_date":
+        return pa.array([_parse_datetime(v, True) for v in values], pa.timestamp("s", tz="UTC"))
+    if field == "start_date_local":
+        return pa.array([_parse_datetime(v, False) for v in values], pa.timestamp("s"))
+    if field in INT_FIELDS:
+        return pa.array(values, pa.int64())
+    if field in FLOAT_FIELDS:
+        return pa.array(values, pa.float64())
+    if field in BOOL_FIELDS:
+        return pa.array(values, pa.bool_())
+    if field in LATLNG_FIELDS:
+        return pa.array(values, pa.list_(pa.float64()))
+    return pa.array(values, pa.string())
+
+
+def _parquet(rows: Iterator[list], fields: tuple[str, ...]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(f, _arrow_column(pa, f, []).type) for f in fields])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        if header := sink.take():
+            yield header
+        for batch in _batches(rows, PARQUET_ROW_GROUP):
+            columns = [_arrow_column(pa, f, list(values)) for f, values in zip(fields, zip(*batch))]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
@@ -1,34 +1,55 @@
 from datetime import datetime
 
+from .activity import Activity
 from .sports import resolve_sport
 
 
 class ActivityFilter:
-    def __init__(self, activities: list[dict]):
-        self._activities = activities
+    """Conditions over activities, applied lazily.
+
+    Iterating streams the matching activities one at a time; `.activities`
+    materializes (and keeps) the list.
+    """
+
+    def __init__(self, activities: list[dict | Activity], predicates: tuple = ()):
+        self._source = activities
+        self._predicates = predicates
+        self._matched: list[dict | Activity] | None = None
+
+    def _where(self, predicate) -> "ActivityFilter":
+        return ActivityFilter(self._source, self._predicates + (predicate,))
 
     def by_sport(self, sport: str) -> "ActivityFilter":
         sport_type = resolve_sport(sport)
-        return ActivityFilter([a for a in self._activities if a.get("sport_type") == sport_type])
+        return self._where(lambda a: a.get("sport_type") == sport_type)
 
     def by_year(self, year: int) -> "ActivityFilter":
         return self.by_date_range(datetime(year, 1, 1), datetime(year + 1, 1, 1))
 
     def by_date_range(self, after: datetime, before: datetime) -> "ActivityFilter":
-        filtered = []
-        for a in self._activities:
+        def in_range(a) -> bool:
             dt = datetime.fromisoformat(a["start_date"].replace("Z", "+00:00"))
-            naive = dt.replace(tzinfo=None)
-            if after <= naive < before:
-                filtered.append(a)
-        return ActivityFilter(filtered)
+            return after <= dt.replace(tzinfo=None) < before
+
+        return self._where(in_range)
 
     def sport_types(self) -> list[str]:
-        return sorted({a.get("sport_type") for a in self._activities})
+        return sorted({a.get("sport_type") for a in self})
+
+    def _matching(self):
+        predicates = self._predicates
+        return (a for a in self._source if all(p(a) for p in predicates))
+
+    def __iter__(self):
+        if self._matched is not None or not self._predicates:
+            return iter(self.activities)
+        return self._matching()
 
     @property
-    def activities(self) -> list[dict]:
-        return self._activities
+    def activities(self) -> list[dict | Activity]:
+        if self._matched is None:
+            self._matched = list(self._matching()) if self._predicates else self._source
+        return self._matched
 
     def __len__(self) -> int:
-        return len(self._activities)
+        return len(self.activities)
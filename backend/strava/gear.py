@@ -0,0 +1,210 @@
+"""Running totals per gear_id and component wear counters.
+
+The ledger keeps, next to activities.json, each activity's contribution (gear,
+distance, moving time, elevation, date) and the per-gear sums. A sync subtracts the
+old contribution of every changed or deleted activity and adds the new one, so it
+costs O(changed activities) instead of a rescan of the history. The ledger records
+the source signature of the stored activities it reflects, so a save that bypassed
+it (e.g. main.py --fetch) is noticed and the totals rebuilt.
+"""
+
+import json
+import os
+
+from .config import GEAR_SERVICE_INTERVALS_KM
+
+
+def gear_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".gear.json"
+
+
+def _contribution(activity) -> list | None:
+    gear_id = activity.get("gear_id")
+    if not gear_id:
+        return None
+    return [
+        gear_id,
+        activity.get("distance") or 0,
+        activity.get("moving_time") or 0,
+        activity.get("total_elevation_gain") or 0,
+        activity.get("start_date"),
+    ]
+
+
+def default_intervals(gear_id: str) -> dict[str, float]:
+    """Service intervals (km) by Strava gear kind: "b..." bikes, "g..." shoes and skates."""
+    return dict(GEAR_SERVICE_INTERVALS_KM.get(gear_id[:1], {}))
+
+
+class GearLedger:
+    def __init__(self, path: str, config: dict | None = None):
+        """config is the athlete's gear.json: {gear_id: {"name": ..., "intervals": {...}}}."""
+        self._path = path
+        self._config = config or {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = None
+        self.is_new = data is None
+        data = data or {}
+        # Activity ids are strings (JSON object keys)
+        self._activities: dict[str, list] = data.get("activities", {})
+        self._gear: dict[str, dict] = data.get("gear", {})
+        # Gear distance (m) at each component's last service
+        self._services: dict[str, dict[str, float]] = data.get("services", {})
+        # [mtime_ns, size] of the stored activities the totals reflect (see source_signature)
+        self.source: list[int] | None = data.get("source")
+
+    def sync(
+        self, activities, source: list[int], changes=None, base: list[int] | None = None
+    ) -> int:
+        """Bring the ledger to activities, stored with the given source signature.
+
+        Only the ids in changes (a ChangeSet diffed against the stored activities whose
+        signature was base) are applied if the ledger reflects base; otherwise
+        everything is rebuilt. Returns the number of activities applied.
+        """
+        if changes is None or self.is_new or self.source is None or self.source != base:
+            current = {str(a.get("id")): a for a in activities}
+            removed = [i for i in self._activities if i not in current]
+            changed = list(current.values())
+        else:
+            changed = [a for a in activities if a.get("id") in changes.updated]
+            removed = [str(i) for i in changes.deleted]
+        return self.apply(changed, removed, source)
+
+    def apply(self, changed, removed_ids=(), source: list[int] | None = None) -> int:
+        """Replace the contributions of changed activities and drop removed ids.
+
+        The caller checks that the ledger reflects what the changes were diffed against.
+        """
+        touched_last_used = set()
+        added = []
+        count = 0
+        for activity_id in removed_ids:
+            count += self._remove(str(activity_id), touched_last_used)
+        for a in changed:
+            activity_id = str(a.get("id"))
+            self._remove(activity_id, touched_last_used)
+            contribution = _contribution(a)
+            if contribution is not None:
+                self._add(activity_id, contribution)
+                added.append(contribution)
+            count += 1
+        # Only gear whose most recent activity went away (and was not just re-added,
+        # e.g. renamed) needs a look at its history
+        touched_last_used -= {
+            c[0] for c in added if c[4] is not None and c[4] == self._gear.get(c[0], {}).get("last_used")
+        }
+        for gear_id in touched_last_used:
+            if gear_id in self._gear:
+                self._gear[gear_id]["last_used"] = max(
+                    (c[4] for c in self._activities.values() if c[0] == gear_id and c[4]),
+                    default=None,
+                )
+        if count or self.is_new or source != self.source:
+            self.source = source
+            self._write()
+            self.is_new = False
+        return count
+
+    def _add(self, activity_id: str, contribution: list):
+        gear_id, distance, moving_time, elevation, start_date = contribution
+        self._activities[activity_id] = contribution
+        totals = self._gear.setdefault(
+            gear_id,
+            {"distance": 0.0, "moving_time": 0, "elevation": 0.0, "activities": 0, "last_used": None},
+        )
+        totals["distance"] += distance
+        totals["moving_time"] += moving_time
+        totals["elevation"] += elevation
+        totals["activities"] += 1
+        if start_date and (totals["last_used"] is None or start_date > totals["last_used"]):
+            totals["last_used"] = start_date
+
+    def _remove(self, activity_id: str, touched_last_used: set) -> int:
+        contribution = self._activities.pop(activity_id, None)
+        if contribution is None:
+            return 0
+        gear_id, distance, moving_time, elevation, start_date = contribution
+        totals = self._gear[gear_id]
+        totals["distance"] -= distance
+        totals["moving_time"] -= moving_time
+        totals["elevation"] -= elevation
+        totals["activities"] -= 1
+        if totals["activities"] == 0:
+            # Keep service records: the gear may come back on a later edit
+            del self._gear[gear_id]
+        elif start_date == totals["last_used"]:
+            touched_last_used.add(gear_id)
+        return 1
+
+    def __contains__(self, gear_id: str) -> bool:
+        return gear_id in self._gear
+
+    def service(self, gear_id: str, component: str) -> dict:
+        """Record that a component was serviced now, resetting its wear counter."""
+        if component not in self._intervals(gear_id):
+            raise ValueError(f"Unknown component for {gear_id}: {component!r}")
+        self._services.setdefault(gear_id, {})[component] = self._gear[gear_id]["distance"]
+        self._write()
+        return self.gear(gear_id)
+
+    def _intervals(self, gear_id: str) -> dict[str, float]:
+        return self._config.get(gear_id, {}).get("intervals") or default_intervals(gear_id)
+
+    def gear(self, gear_id: str) -> dict:
+        """Totals and component wear for one gear."""
+        totals = self._gear[gear_id]
+        services = self._services.get(gear_id, {})
+        components = []
+        for component, interval_km in self._intervals(gear_id).items():
+            since_km = (totals["distance"] - services.get(component, 0)) / 1000
+            components.append({
+                "component": component,
+                "interval_km": interval_km,
+                "since_service_km": round(since_km, 1),
+                "due": since_km >= interval_km,
+            })
+        return {
+            "gear_id": gear_id,
+            "name": self._config.get(gear_id, {}).get("name"),
+            "distance_km": round(totals["distance"] / 1000, 1),
+            "moving_time_h": round(totals["moving_time"] / 3600, 1),
+            "elevation_m": round(totals["elevation"]),
+            "activities": totals["activities"],
+            "last_used": totals["last_used"],
+            "components": components,
+        }
+
+    def all_gear(self) -> list[dict]:
+        """Every gear, most recently used first."""
+        return sorted(
+            (self.gear(gear_id) for gear_id in self._gear),
+            key=lambda g: g["last_used"] or "",
+            reverse=True,
+        )
+
+    def alerts(self) -> list[dict]:
+        return [
+            {"gear_id": g["gear_id"], "name": g["name"], **c}
+            for g in self.all_gear()
+            for c in g["components"]
+            if c["due"]
+        ]
+
+    def _write(self):
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "source": self.source,
+                    "activities": self._activities,
+                    "gear": self._gear,
+                    "services": self._services,
+                },
+                f,
+                separators=(",", ":"),
+            )
+        os.replace(tmp_path, self._path)
@@ -0,0 +1,112 @@
+import base64
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+from .sports import resolve_sport
+
+
+def _start_timestamps(activities) -> list[int]:
+    # Memory-mapped snapshots expose the parsed column directly
+    if hasattr(activities, "column"):
+        return list(activities.column("start_ts"))
+    return [
+        int(datetime.fromisoformat(a["start_date"].replace("Z", "+00:00")).timestamp())
+        for a in activities
+    ]
+
+
+def encode_cursor(key: tuple[int, int]) -> str:
+    return base64.urlsafe_b64encode(f"{key[0]}:{key[1]}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        ts, activity_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return int(ts), int(activity_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+class ActivityIndex:
+    """Sorted and inverted indexes over a dataset, for paginated listing without scans.
+
+    Activities are ranked by (start time, id). Per-sport and commute posting lists
+    hold ranks in ascending order, so date ranges and cursors reduce to bisections.
+    """
+
+    def __init__(self, activities, commute_flags: list[bool] | None = None):
+        timestamps = _start_timestamps(activities)
+        keys = [(ts, a.get("id") or 0) for ts, a in zip(timestamps, activities)]
+        self._order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[i] for i in self._order]
+
+        self._by_sport: dict[str, list[int]] = {}
+        self._commutes: list[int] = []
+        for rank, i in enumerate(self._order):
+            sport = activities[i].get("sport_type", "Unknown")
+            self._by_sport.setdefault(sport, []).append(rank)
+            if commute_flags is not None and commute_flags[i]:
+                self._commutes.append(rank)
+        self._has_commutes = commute_flags is not None
+        self._commute_set = frozenset(self._commutes)
+
+    def query(
+        self,
+        sport: str | None = None,
+        after: datetime | None = None,
+        before: datetime | None = None,
+        commute: bool | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+        descending: bool = True,
+    ) -> tuple[list[int], str | None]:
+        """Return (dataset positions of one page, cursor of the next page or None)."""
+        # Rank window [lo, hi) from the date range and the cursor
+        lo, hi = 0, len(self._keys)
+        if after is not None:
+            lo = bisect_left(self._keys, (self._ts(after),))
+        if before is not None:
+            hi = bisect_left(self._keys, (self._ts(before),))
+        if cursor is not None:
+            key = decode_cursor(cursor)
+            if descending:
+                hi = min(hi, bisect_left(self._keys, key))
+            else:
+                lo = max(lo, bisect_right(self._keys, key))
+
+        if sport is not None:
+            ranks = self._by_sport.get(resolve_sport(sport), [])
+        elif commute and self._has_commutes:
+            ranks = self._commutes
+        else:
+            ranks = None
+        check_commute = commute is not None and self._has_commutes and ranks is not self._commutes
+
+        page: list[int] = []
+        for rank in self._candidates(ranks, lo, hi, descending):
+            if check_commute and (rank in self._commute_set) != commute:
+                continue
+            if len(page) == limit:
+                return [self._order[r] for r in page], encode_cursor(self._keys[page[-1]])
+            page.append(rank)
+        return [self._order[r] for r in page], None
+
+    def _candidates(self, ranks, lo, hi, descending):
+        if ranks is None:
+            return range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+        start, stop = bisect_left(ranks, lo), bisect_left(ranks, hi)
+        if descending:
+            return (ranks[j] for j in range(stop - 1, start - 1, -1))
+        return (ranks[j] for j in range(start, stop))
+
+    @staticmethod
+    def _ts(dt: datetime) -> int:
+        # Start times are whole seconds: for bounds after <= t < before, t >= after and
+        # t < before hold exactly when they hold against the bound rounded up
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return math.ceil(dt.timestamp())
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,326 @@
+"""Append-only journaled activity storage (STRAVA_STORAGE=journal).
+
+Same interface as ActivityStorage, but a sync appends only what changed: one batch
+of checksummed records (an activity put, an id deleted) closed by a commit record,
+fsynced before the call returns. Replay stops at the first torn or corrupt record,
+so a crash mid-write loses at most the batch being written. Once the active segment
+outgrows STRAVA_JOURNAL_SEGMENT_MB it is sealed, and a background thread compacts
+the sealed segments into the base file. Loading reads the base and replays the
+segments after it; a process that loaded the journal before only replays what was
+appended since.
+
+Files beside activities.journal (the active segment, whose stat is the source
+signature of the snapshot and summary):
+    activities.journal.<n>    sealed segments, replayed in order
+    activities.base.json      everything up to segment <n>: a header line, then the array
+    activities.journal.lock   held shared by readers, exclusively to append or swap files
+
+Every record sets or removes one id, so replaying a segment twice changes nothing:
+what an interrupted rotation or compaction leaves behind is harmless.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from .activity import Activity, as_activity, to_dict
+from .storage import ActivityStorage, _Parsed
+from .summary import summary_path_for, write_summary
+
+# Size at which the active segment is sealed and handed to compaction; it bounds how
+# much a cold start replays record by record
+SEGMENT_BYTES = int(float(os.environ.get("STRAVA_JOURNAL_SEGMENT_MB", "4")) * 1024 * 1024)
+
+# One compaction at a time per process; the compaction lock serializes processes
+_compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-compaction")
+
+
+def _record(payload: dict) -> bytes:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    return b"%08x %s\n" % (zlib.crc32(data), data)
+
+
+def _replay(path: str, offset: int, activities: dict, wrap=Activity) -> int:
+    """Apply the committed batches of a segment from offset on; returns where they end."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+    end = position = offset
+    batch: list[dict] = []
+    with f:
+        f.seek(offset)
+        for line in f:
+            data = line[9:-1]
+            if not line.endswith(b"\n") or line[8:9] != b" ":
+                break
+            try:
+                if int(line[:8], 16) != zlib.crc32(data):
+                    break
+            except ValueError:
+                break
+            record = json.loads(data)
+            position += len(line)
+            if "commit" not in record:
+                batch.append(record)
+                continue
+            if record["commit"] != len(batch):
+                break
+            for r in batch:
+                if "put" in r:
+                    activities[r["put"]["id"]] = wrap(r["put"])
+                else:
+                    activities.pop(r["del"], None)
+            batch = []
+            end = position
+    return end
+
+
+def _fsync_dir(path: str):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _newest_first(activity) -> tuple:
+    return activity.get("start_date"), activity.get("id")
+
+
+class _JournalLock:
+    """Cross-process lock on a journal: shared to read, exclusive to change files."""
+
+    def __init__(self, path: str, shared: bool = False):
+        self._path = path
+        self._mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+
+    def __enter__(self):
+        self._file = open(self._path, "a")
+        fcntl.flock(self._file, self._mode)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+class _Journal:
+    """A journal replayed in memory, and how far into the active segment it was read."""
+
+    def __init__(self):
+        self.activities: dict[int, Activity] = {}
+        self.inode: int | None = None
+        self.offset = 0
+        self.parsed: _Parsed | None = None
+        self.lock = threading.Lock()
+
+
+class JournalActivityStorage(ActivityStorage):
+    # Replayed journals shared by every instance in the process, keyed by absolute path,
+    # so an append only replays what was added since; release() drops one
+    _journals: dict[str, _Journal] = {}
+    _journals_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._base_path = os.path.splitext(path)[0] + ".base.json"
+        self._lock_path = f"{path}.lock"
+
+    def _segments(self) -> list[tuple[int, str]]:
+        """Sealed segments as (number, path), oldest first."""
+        directory, name = os.path.split(os.path.abspath(self._path))
+        prefix = f"{name}."
+        try:
+            entries = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        numbers = sorted(
+            int(e[len(prefix):]) for e in entries if e.startswith(prefix) and e[len(prefix):].isdigit()
+        )
+        return [(n, f"{self._path}.{n:06d}") for n in numbers]
+
+    def _base_segment(self) -> int:
+        try:
+            with open(self._base_path, "rb") as f:
+                return json.loads(f.readline())["segment"]
+        except FileNotFoundError:
+            return 0
+
+    def _read_base(self, wrap=Activity) -> tuple[int, dict]:
+        try:
+            with open(self._base_path, "rb") as f:
+                header = json.loads(f.readline())
+                activities = json.loads(f.read())
+        except FileNotFoundError:
+            return 0, {}
+        return header["segment"], {a["id"]: wrap(a) for a in activities}
+
+    def _journal_entry(self) -> _Journal:
+        with self._journals_lock:
+            return self._journals.setdefault(os.path.abspath(self._path), _Journal())
+
+    def release(self):
+        """Drop the replayed journal; the next read replays the files again."""
+        with self._journals_lock:
+            self._journals.pop(os.path.abspath(self._path), None)
+
+    def _refresh(self, journal: _Journal):
+        """Bring journal up to date with the files; the caller holds the journal lock."""
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            st = None
+        inode = st.st_ino if st else None
+        if journal.inode is not None and inode == journal.inode and st.st_size >= journal.offset:
+            if st.st_size > journal.offset:
+                journal.offset = _replay(self._path, journal.offset, journal.activities)
+                journal.parsed = None
+            return
+        # First read, or the active segment was sealed or replaced since
+        segment, activities = self._read_base()
+        pending = [path for n, path in self._segments() if n > segment]
+        for path in pending:
+            _replay(path, 0, activities)
+        journal.offset = _replay(self._path, 0, activities)
+        journal.activities, journal.inode, journal.parsed = activities, inode, None
+        if pending:
+            # Left over from a process that stopped before compacting them
+            self._compact_in_background()
+
+    def _parsed(self) -> _Parsed:
+        # Reading a missing journal fails like reading a missing activities.json
+        os.stat(self._path)
+        journal = self._journal_entry()
+        with journal.lock:
+            with _JournalLock(self._lock_path, shared=True):
+                self._refresh(journal)
+            if journal.parsed is None:
+                activities = sorted(journal.activities.values(), key=_newest_first, reverse=True)
+                journal.parsed = _Parsed((journal.inode, journal.offset), activities)
+            return journal.parsed
+
+    def _commit(self, activities, deleted_ids=(), replace: bool = False) -> tuple[int, int]:
+        """Append the records that change the stored dataset, as one committed batch.
+
+        With replace, every stored activity missing from activities is deleted too.
+        Returns (activities written, activities deleted).
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        journal = self._journal_entry()
+        with journal.lock, _JournalLock(self._lock_path):
+            self._refresh(journal)
+            current = journal.activities
+            puts: dict[int, Activity] = {}
+            for a in activities:
+                # Compared as given: only what changed is turned into a record
+                if current.get(a.get("id")) != a:
+                    puts[a.get("id")] = as_activity(a)
+            if replace:
+                keep = {a.get("id") for a in activities}
+                removed = [i for i in current if i not in keep]
+            else:
+                removed = [i for i in dict.fromkeys(deleted_ids) if i in current and i not in puts]
+            if not puts and not removed:
+                return 0, 0
+            records = [_record({"put": to_dict(a)}) for a in puts.values()]
+            records += [_record({"del": i}) for i in removed]
+            records.append(_record({"commit": len(records)}))
+            created = not os.path.exists(self._path)
+            with open(self._path, "ab") as f:
+                if f.tell() > journal.offset:
+                    # A batch torn by a crash: never committed, so cut it off
+                    f.truncate(journal.offset)
+                f.write(b"".join(records))
+                f.flush()
+                os.fsync(f.fileno())
+                journal.offset = f.tell()
+                journal.inode = os.fstat(f.fileno()).st_ino
+            if created:
+                _fsync_dir(self._path)
+            current.update(puts)
+            for i in removed:
+                del current[i]
+            journal.parsed = None
+            if journal.offset > SEGMENT_BYTES:
+                self._rotate(journal)
+        return len(puts), len(removed)
+
+    def _rotate(self, journal: _Journal):
+        """Seal the active segment and start an empty one; the path never goes missing."""
+        numbers = [n for n, _ in self._segments()]
+        number = max(numbers + [self._base_segment()]) + 1
+        os.link(self._path, f"{self._path}.{number:06d}")
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        open(tmp_path, "wb").close()
+        os.replace(tmp_path, self._path)
+        _fsync_dir(self._path)
+        journal.inode, journal.offset = os.stat(self._path).st_ino, 0
+        self._compact_in_background()
+
+    def _compact_in_background(self):
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Compacting {self._path} failed: {e}")
+
+        _compactor.submit(run)
+
+    def compact(self) -> int:
+        """Fold the sealed segments into the base file; returns how many were folded.
+
+        Reading and writing happen outside the journal lock, which is only taken to
+        swap the files, so appends are not held up.
+        """
+        with _JournalLock(f"{self._path}.compact.lock"):
+            with _JournalLock(self._lock_path, shared=True):
+                base_segment = self._base_segment()
+                segments = [(n, p) for n, p in self._segments() if n > base_segment]
+            if not segments:
+                return 0
+            # Sealed segments never change, and only compaction removes them
+            _, activities = self._read_base(wrap=dict)
+            for _, path in segments:
+                _replay(path, 0, activities, wrap=dict)
+            last = segments[-1][0]
+            tmp_path = f"{self._base_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(json.dumps({"segment": last, "count": len(activities)}) + "\n")
+                f.write(json.dumps(list(activities.values()), ensure_ascii=False, separators=(",", ":")))
+                f.flush()
+                os.fsync(f.fileno())
+            with _JournalLock(self._lock_path):
+                os.replace(tmp_path, self._base_path)
+                _fsync_dir(self._base_path)
+                for n, path in self._segments():
+                    if n <= last:
+                        os.remove(path)
+        print(f"Compacted {len(segments)} journal segments into {self._base_path}")
+        return len(segments)
+
+    def save(self, activities: list[dict | Activity], summary: bool = True):
+        """Make the stored dataset equal to activities, appending only the difference."""
+        written, deleted = self._commit(activities, replace=True)
+        if summary and (written or deleted or not os.path.exists(summary_path_for(self._path))):
+            write_summary(self._path, activities)
+        print(
+            f"Saved {len(activities)} activities to {self._path} "
+            f"({written} written, {deleted} deleted)"
+        )
+
+    def upsert(self, activities: list[dict | Activity], summary: bool = True) -> int:
+        """Insert or update activities by id; returns the number that changed."""
+        written, _ = self._commit(activities)
+        if summary and written:
+            write_summary(self._path, self.load())
+        return written
+
+    def delete(self, activity_ids, summary: bool = True) -> int:
+        _, deleted = self._commit((), activity_ids)
+        if summary and deleted:
+            write_summary(self._path, self.load())
+        return deleted
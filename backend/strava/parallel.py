@@ -0,0 +1,153 @@
+"""Process-pool map-reduce over large activity histories.
+
+The dataset is split into partitions (fixed-size chunks, or one per calendar
+year); each worker aggregates its partition with the regular ActivityStats and
+CommuteDetector code and the partial results are merged. Memory-mapped snapshots
+are not pickled: workers re-open the file and read the same page-cache pages. Row
+ranges are only valid for the generation they were taken from, so workers check it;
+if the snapshot was rebuilt meanwhile the parent computes the result itself.
+
+main.py uses it for the CLI statistics. The API does not: its aggregates are cached
+per dataset version and patched on sync, so a pool per request would cost more
+than it saves.
+"""
+
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from .commute import CommuteDetector
+from .config import PARALLEL_MIN_ACTIVITIES
+from .snapshot import SnapshotActivities
+from .stats import ActivityStats
+
+_OPERATIONS = {
+    "total_km_by_sport": lambda chunk, _: ActivityStats(chunk).total_km_by_sport(),
+    "total_km_by_year": lambda chunk, _: ActivityStats(chunk).total_km_by_year(),
+    "total_km_by_year_and_sport": lambda chunk, _: ActivityStats(chunk).total_km_by_year_and_sport(),
+    "commute_activities": lambda chunk, detector: detector.get_commute_activities(chunk),
+}
+
+# Snapshots opened in this worker process, by path
+_worker_snapshots: dict[str, SnapshotActivities] = {}
+
+
+class SnapshotChanged(RuntimeError):
+    """A worker found a different snapshot generation than the parent partitioned."""
+
+
+def _run_partition(source, operation: str, arg):
+    """Worker entry point. source is a list of activities or (snapshot path,
+    generation, indices)."""
+    if isinstance(source, tuple):
+        path, generation, indices = source
+        snapshot = _worker_snapshots.get(path)
+        if snapshot is None or snapshot.generation != generation:
+            snapshot = _worker_snapshots[path] = SnapshotActivities(path)
+        if snapshot.generation != generation:
+            raise SnapshotChanged(
+                f"{path} is at generation {snapshot.generation}, not {generation}"
+            )
+        source = [snapshot[i] for i in indices]
+    return _OPERATIONS[operation](source, arg)
+
+
+def _sum_into(total: dict, partial: dict):
+    for key, value in partial.items():
+        if isinstance(value, dict):
+            _sum_into(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0.0) + value
+
+
+def _sorted_nested(d: dict) -> dict:
+    return {k: _sorted_nested(v) if isinstance(v, dict) else v for k, v in sorted(d.items())}
+
+
+class ParallelStats:
+    """ActivityStats-style aggregations and commute classification on a process pool.
+
+    Falls back to the single-process code when the dataset is smaller than
+    min_parallel_size or only one worker is requested.
+    """
+
+    def __init__(
+        self,
+        activities,
+        workers: int | None = None,
+        partition: str = "chunks",
+        chunk_size: int | None = None,
+        min_parallel_size: int = PARALLEL_MIN_ACTIVITIES,
+    ):
+        if partition not in ("chunks", "year"):
+            raise ValueError(f"Unknown partitioning: {partition!r}")
+        self._activities = activities
+        self._workers = workers or os.cpu_count() or 1
+        self._partition = partition
+        self._chunk_size = chunk_size
+        self._min_parallel_size = min_parallel_size
+
+    def _parallel(self) -> bool:
+        return self._workers > 1 and len(self._activities) >= self._min_parallel_size
+
+    def _partitions(self) -> list:
+        n = len(self._activities)
+        if self._partition == "year":
+            by_year = defaultdict(list)
+            if isinstance(self._activities, SnapshotActivities):
+                for i, ts in enumerate(self._activities.column("start_ts")):
+                    by_year[datetime.fromtimestamp(ts, timezone.utc).year].append(i)
+            else:
+                for i, a in enumerate(self._activities):
+                    by_year[int(a["start_date"][:4])].append(i)
+            return list(by_year.values())
+        # A few chunks per worker keeps the pool busy when partitions are uneven
+        size = self._chunk_size or max(1, -(-n // (self._workers * 4)))
+        return [range(start, min(start + size, n)) for start in range(0, n, size)]
+
+    def _map(self, operation: str, arg=None) -> list:
+        activities = self._activities
+        if isinstance(activities, SnapshotActivities):
+            generation = activities.generation
+            sources = [(activities.path, generation, part) for part in self._partitions()]
+        else:
+            sources = [[activities[i] for i in part] for part in self._partitions()]
+        with ProcessPoolExecutor(self._workers) as pool:
+            futures = [pool.submit(_run_partition, source, operation, arg) for source in sources]
+            try:
+                return [f.result() for f in futures]
+            except SnapshotChanged:
+                # The parent's mapping still holds the generation it partitioned
+                for f in futures:
+                    f.cancel()
+                return [_OPERATIONS[operation](activities, arg)]
+
+    def _reduce_totals(self, operation: str) -> dict:
+        total: dict = {}
+        for partial in self._map(operation):
+            _sum_into(total, partial)
+        return _sorted_nested(total)
+
+    def total_km_by_sport(self) -> dict[str, float]:
+        if not self._parallel():
+            return ActivityStats(self._activities).total_km_by_sport()
+        return self._reduce_totals("total_km_by_sport")
+
+    def total_km_by_year(self) -> dict[int, float]:
+        if not self._parallel():
+            return ActivityStats(self._activities).total_km_by_year()
+        return self._reduce_totals("total_km_by_year")
+
+    def total_km_by_year_and_sport(self) -> dict[int, dict[str, float]]:
+        if not self._parallel():
+            return ActivityStats(self._activities).total_km_by_year_and_sport()
+        return self._reduce_totals("total_km_by_year_and_sport")
+
+    def commute_activities(self, detector: CommuteDetector | None = None) -> list[dict]:
+        detector = detector or CommuteDetector()
+        if not self._parallel():
+            return detector.get_commute_activities(self._activities)
+        result = [row for part in self._map("commute_activities", detector) for row in part]
+        result.sort(key=lambda x: x["datetime"])
+        return result
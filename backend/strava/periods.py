@@ -0,0 +1,60 @@
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
+
+from .config import RATE_PER_KM, REPORT_CUTOFF_DAY
+
+# Years whose periods, and the periods next to them, fall within datetime.date's range
+MIN_YEAR, MAX_YEAR = 2, 9998
+
+
+class ReportingPeriods:
+    """Reimbursement periods named after the month they end in.
+
+    Period (year, month) runs from the day after the previous period's cut-off to the
+    cut-off day of `month` (clamped to the month's length). With the default cut-off
+    of 20, January 2026 is 21 Dec 2025 → 20 Jan 2026; a cut-off of 31 gives calendar
+    months.
+    """
+
+    def __init__(self, cutoff_day: int = REPORT_CUTOFF_DAY):
+        if not 1 <= cutoff_day <= 31:
+            raise ValueError(f"cutoff_day must be between 1 and 31, got {cutoff_day}")
+        self.cutoff_day = cutoff_day
+
+    def _end(self, year: int, month: int) -> date:
+        return date(year, month, min(self.cutoff_day, monthrange(year, month)[1]))
+
+    def period_of(self, d: date) -> tuple[int, int]:
+        if d <= self._end(d.year, d.month):
+            return d.year, d.month
+        if d.month == 12:
+            return d.year + 1, 1
+        return d.year, d.month + 1
+
+    def date_range(self, year: int, month: int) -> tuple[date, date]:
+        """First and last day (inclusive) of a period."""
+        prev_year, prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+        return self._end(prev_year, prev_month) + timedelta(days=1), self._end(year, month)
+
+    def index(self, commutes: list[dict]) -> dict[tuple[int, int], list[dict]]:
+        """Group commute rows (as from CommuteDetector.get_commute_activities) by period."""
+        periods = defaultdict(list)
+        for c in commutes:
+            periods[self.period_of(c["date"])].append(c)
+        return dict(periods)
+
+    @staticmethod
+    def summarize(rows: list[dict]) -> dict:
+        """Trips, days, km and amount of a period, totalled like the CommuteReport sheet."""
+        by_day = defaultdict(float)
+        for c in rows:
+            by_day[c["date"]] += c["distance_km"]
+        # The workbook rounds each day's distance before summing
+        km = sum(round(d, 2) for d in by_day.values())
+        return {
+            "trips": len(rows),
+            "days": len(by_day),
+            "km": round(km, 2),
+            "amount": round(km * RATE_PER_KM, 2),
+        }
@@ -0,0 +1,183 @@
+"""Opt-in profiling: a low-overhead stack sampler and a rotating profile directory.
+
+The sampler walks every thread's stack at a fixed interval, so it also sees the work
+that routes hand to worker threads, which cProfile attached to the request would
+miss. Samples are written in the "folded" format read by flamegraph.pl and
+speedscope, with the route/command, parameters and dataset version next to them.
+
+Each sample walks every thread's stack while holding the GIL, so the cost grows with
+the number of threads and the sampling rate: with four busy threads, sampling every
+20 ms (the default) slowed them by about 5%, every 5 ms by about 30%.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Innermost frames in these stdlib modules mean the thread is idle (waiting on a
+# lock, a queue or the selector), not doing work worth attributing
+_IDLE_MODULES = (
+    "threading.py", "selectors.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"),
+)
+TOP_FUNCTIONS = 15
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _top_functions(folded: Counter) -> list[dict]:
+    """Share of samples per innermost function ("self" time)."""
+    total = sum(folded.values()) or 1
+    leaves = Counter()
+    for stack, count in folded.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return [
+        {"function": fn, "samples": n, "percent": round(100 * n / total, 1)}
+        for fn, n in leaves.most_common(TOP_FUNCTIONS)
+    ]
+
+
+class StackSampler:
+    """Samples all threads while at least one recording is open."""
+
+    def __init__(self, interval: float = 0.02, max_samples: int = 100_000):
+        self._interval = interval
+        self._samples: deque[tuple[float, str]] = deque(maxlen=max_samples)
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> float:
+        """Open a recording; returns its start time for samples_since()."""
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+        return time.perf_counter()
+
+    def stop(self):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                # Nobody can ask for these samples any more
+                self._wake.clear()
+                self._samples.clear()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def samples_since(self, start: float) -> Counter:
+        """Folded stacks sampled since start, with their counts."""
+        with self._lock:
+            samples = list(self._samples)
+        return Counter(stack for t, stack in samples if t >= start)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            self._wake.wait()
+            now = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me or frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                stacks.append(";".join(reversed(labels)))
+            with self._lock:
+                if self._active:
+                    self._samples.extend((now, stack) for stack in stacks)
+            time.sleep(self._interval)
+
+
+class ProfileStore:
+    """A directory keeping the most recent `keep` profiles, each with a .json of metadata."""
+
+    def __init__(self, directory: str, keep: int = 50):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _base(self, name: str) -> str:
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() % 1_000_000_000:09d}"
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")[:60] or "profile"
+        return os.path.join(self.directory, f"{stamp}-{slug}")
+
+    def save_folded(self, name: str, folded: Counter, meta: dict) -> str:
+        """Write sampled stacks as <base>.folded and their metadata as <base>.json."""
+        base = self._base(name)
+        meta = {**meta, "samples": sum(folded.values()), "top_functions": _top_functions(folded)}
+        lines = "".join(f"{stack} {count}\n" for stack, count in folded.most_common())
+        return self._save(base, ".folded", lines.encode(), meta)
+
+    def save_cprofile(self, name: str, profile: cProfile.Profile, meta: dict) -> str:
+        """Write a cProfile run as <base>.prof (pstats) and its metadata as <base>.json."""
+        base = self._base(name)
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        top = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+        meta = {
+            **meta,
+            "top_functions": [
+                {
+                    "function": f"{os.path.basename(file)}:{line}({fn})",
+                    "calls": calls,
+                    "self_s": round(tottime, 4),
+                    "cumulative_s": round(cumtime, 4),
+                }
+                for (file, line, fn), (_, calls, tottime, cumtime, _) in top
+            ],
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        stats.dump_stats(base + ".prof")
+        return self._save(base, None, None, meta)
+
+    def _save(self, base: str, suffix: str | None, data: bytes | None, meta: dict) -> str:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if suffix is not None:
+                with open(base + suffix, "wb") as f:
+                    f.write(data)
+            with open(base + ".json", "w") as f:
+                json.dump(meta, f, indent=2, default=str)
+            self._rotate()
+        return base
+
+    def _rotate(self):
+        metas = sorted(f for f in os.listdir(self.directory) if f.endswith(".json"))
+        for name in metas[: max(0, len(metas) - self.keep)]:
+            stem = os.path.join(self.directory, name[: -len(".json")])
+            for suffix in (".json", ".folded", ".prof"):
+                try:
+                    os.remove(stem + suffix)
+                except FileNotFoundError:
+                    pass
+
+
+def profile_call(store: ProfileStore, name: str, meta: dict, fn, *args):
+    """Run fn(*args) under cProfile and save the profile, even if fn exits early."""
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    profile.enable()
+    try:
+        return fn(*args)
+    finally:
+        profile.disable()
+        meta = {**meta, "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+        print(f"Profile written to {store.save_cprofile(name, profile, meta)}.prof")
@@ -0,0 +1,304 @@
+"""Text search over activity names, locations and devices.
+
+Text is split into normalized terms (case and accents folded). Each (term, field)
+has a posting list of document keys sorted newest first, and the vocabulary has a
+trigram index. A query token matches terms exactly, by prefix, or fuzzily by trigram
+similarity, which only touches the vocabulary: a few thousand distinct terms even
+for 100k activities. Results are ranked by score, then recency; posting lists are
+only read until a page of results is found.
+"""
+
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from itertools import product
+
+# Fields searched and the weight of a match in each
+FIELD_WEIGHTS = {"name": 1.0, "location_city": 0.6, "device_name": 0.4}
+FIELDS = tuple(FIELD_WEIGHTS)
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+MIN_SIMILARITY = 0.25
+MAX_EXPANSIONS = 32  # vocabulary terms a single query token may expand to
+MAX_LEVELS = 5  # distinct scores kept per query token
+MAX_QUERY_TOKENS = 4
+
+_TOKEN = re.compile(r"\w+")
+_ID_BITS = 40
+_ID_MASK = (1 << _ID_BITS) - 1
+# A Python-level probe costs about this many C-level set operations
+_PROBE_COST = 20
+
+
+def normalize(text: str) -> str:
+    if text.isascii():
+        return text.casefold()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN.findall(normalize(text)) if text else []
+
+
+def trigrams(term: str) -> set[str]:
+    padded = f"^{term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _timestamp(start_date: str | None) -> int:
+    if not start_date:
+        return 0
+    return int(datetime.fromisoformat(start_date.replace("Z", "+00:00")).timestamp())
+
+
+def _documents(activities):
+    """(position, id, start timestamp, texts in FIELDS order) for every activity."""
+    if hasattr(activities, "column"):
+        # Mapped snapshots: read the columns directly and decode each distinct string once
+        ids, starts = activities.column("id"), activities.column("start_ts")
+        columns = [activities.column(f) for f in FIELDS]
+        strings: dict[int, str | None] = {}
+        for i in range(len(activities)):
+            texts = []
+            for column in columns:
+                idx = column[i]
+                if idx not in strings:
+                    strings[idx] = activities.string(idx)
+                texts.append(strings[idx])
+            yield i, ids[i], starts[i], tuple(texts)
+        return
+    for i, a in enumerate(activities):
+        texts = tuple(a.get(f) for f in FIELDS)
+        yield i, a.get("id") or 0, _timestamp(a.get("start_date")), texts
+
+
+def _doc_key(ts: int, activity_id: int) -> int:
+    """One int ordering documents newest first (ids break ties), cheap to hash and compare."""
+    return -((ts << _ID_BITS) | (activity_id & _ID_MASK))
+
+
+class _Union:
+    """The union of some posting lists, iterated in key order or as a set."""
+
+    __slots__ = ("lists", "size", "_cache")
+
+    def __init__(self, lists: list[list], cache: dict):
+        self.lists = lists
+        self.size = sum(len(postings) for postings in lists)
+        self._cache = cache
+
+    def __iter__(self):
+        # May repeat a key found in several lists; search() skips keys already seen
+        return iter(self.lists[0]) if len(self.lists) == 1 else heapq.merge(*self.lists)
+
+    def members(self) -> frozenset:
+        sets = [
+            self._cache.get(id(p)) or self._cache.setdefault(id(p), frozenset(p)) for p in self.lists
+        ]
+        return sets[0] if len(sets) == 1 else frozenset().union(*sets)
+
+
+def _intersect(unions: list[_Union], needed: int, total: int):
+    """Keys present in every union, in ascending order.
+
+    Scanning the smallest union and probing the others stops after `needed` hits,
+    which is cheap when matches are common; when they are rare (by an independence
+    estimate), intersecting whole sets in C is cheaper.
+    """
+    smallest, *rest = sorted(unions, key=lambda u: u.size)
+    if not rest:
+        return iter(smallest)
+    density = 1.0
+    for union in rest:
+        density *= union.size / max(total, 1)
+    if needed / max(density, 1e-9) * len(rest) * _PROBE_COST < smallest.size:
+        sets = [union.members() for union in rest]
+        return (key for key in smallest if all(key in members for members in sets))
+    return iter(sorted(smallest.members().intersection(*(union.members() for union in rest))))
+
+
+class SearchIndex:
+    def __init__(self, activities=()):
+        # Document keys sort newest first (see _doc_key)
+        self._postings: dict[str, dict[str, list[int]]] = {}
+        self._docs: dict[int, tuple[int, tuple[str | None, ...]]] = {}
+        self._positions: dict[int, int] = {}
+        for position, activity_id, ts, texts in _documents(activities):
+            key = _doc_key(ts, activity_id)
+            self._docs[activity_id] = (key, texts)
+            self._positions[activity_id] = position
+            for field, text in zip(FIELDS, texts):
+                for term in set(tokenize(text)):
+                    self._postings.setdefault(term, {}).setdefault(field, []).append(key)
+        for fields in self._postings.values():
+            for postings in fields.values():
+                postings.sort()
+        self._index_vocabulary()
+        # Membership sets of posting lists by id(list), built on first probe (see _Union).
+        # Ids are stable since the index keeps its lists alive.
+        self._sets: dict[int, frozenset] = {}
+
+    def _index_vocabulary(self):
+        self._vocabulary = sorted(self._postings)
+        self._trigrams: dict[str, list[str]] = {}
+        for term in self._vocabulary:
+            for gram in trigrams(term):
+                self._trigrams.setdefault(gram, []).append(term)
+
+    def refreshed(self, activities) -> "SearchIndex":
+        """A copy updated to activities, touching only the documents that changed.
+
+        Posting lists are copied when first modified, so queries running on this
+        index (an older dataset) are unaffected.
+        """
+        return self._updated(_documents(activities), complete=True)
+
+    def patched(self, placed: list[tuple[int, object]], deleted_ids=()) -> "SearchIndex":
+        """A copy with the (position, activity) pairs re-indexed and deleted_ids dropped,
+        every other document kept as is (see refreshed())."""
+        documents = (
+            (position, a.get("id") or 0, _timestamp(a.get("start_date")),
+             tuple(a.get(f) for f in FIELDS))
+            for position, a in placed
+        )
+        return self._updated(documents, complete=False, deleted_ids=deleted_ids)
+
+    def _updated(self, documents, complete: bool, deleted_ids=()) -> "SearchIndex":
+        """Apply documents; when complete, they are the whole dataset and anything else
+        was deleted."""
+        new = SearchIndex.__new__(SearchIndex)
+        new._postings = dict(self._postings)
+        new._docs = {} if complete else dict(self._docs)
+        new._positions = {} if complete else dict(self._positions)
+        new._sets = {}
+        copied: set[tuple[str, str]] = set()
+
+        def postings_of(term: str, field: str) -> list:
+            if (term, field) not in copied:
+                copied.add((term, field))
+                fields = new._postings[term] = dict(new._postings.get(term, {}))
+                fields[field] = list(fields.get(field, []))
+            return new._postings[term][field]
+
+        def remove(key, texts):
+            for field, text in zip(FIELDS, texts):
+                for term in set(tokenize(text)):
+                    postings = postings_of(term, field)
+                    del postings[bisect_left(postings, key)]
+
+        def add(key, texts):
+            for field, text in zip(FIELDS, texts):
+                for term in set(tokenize(text)):
+                    postings = postings_of(term, field)
+                    postings.insert(bisect_left(postings, key), key)
+
+        for position, activity_id, ts, texts in documents:
+            key = _doc_key(ts, activity_id)
+            old = self._docs.get(activity_id)
+            if old != (key, texts):
+                if old is not None:
+                    remove(*old)
+                add(key, texts)
+            new._docs[activity_id] = (key, texts)
+            new._positions[activity_id] = position
+        if complete:
+            deleted_ids = [i for i in self._docs if i not in new._docs]
+        for activity_id in deleted_ids:
+            old = self._docs.get(activity_id)
+            if old is not None:
+                remove(*old)
+            new._docs.pop(activity_id, None)
+            new._positions.pop(activity_id, None)
+
+        vocabulary_changed = False
+        for term, field in copied:
+            fields = new._postings.get(term)
+            if fields is None:
+                continue  # emptied through another field
+            if not fields.get(field, True):
+                del fields[field]
+            if not fields:
+                del new._postings[term]
+            if not fields or term not in self._postings:
+                vocabulary_changed = True
+        if vocabulary_changed:
+            new._index_vocabulary()
+        else:
+            new._vocabulary, new._trigrams = self._vocabulary, self._trigrams
+        return new
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _expand(self, token: str, fuzzy: bool) -> dict[str, float]:
+        """Vocabulary terms matching a query token, with their match quality."""
+        matches = {}
+        lo = bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[lo:lo + MAX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            matches[term] = EXACT if term == token else PREFIX
+        if fuzzy and len(token) >= 3:
+            grams = trigrams(token)
+            shared = Counter(t for g in grams for t in self._trigrams.get(g, ()))
+            similar = []
+            for term, overlap in shared.items():
+                if term in matches:
+                    continue
+                similarity = overlap / (len(grams) + len(trigrams(term)) - overlap)
+                if similarity >= MIN_SIMILARITY:
+                    similar.append((similarity, term))
+            for similarity, term in heapq.nlargest(MAX_EXPANSIONS, similar):
+                # Coarse steps keep the number of distinct scores small
+                matches[term] = FUZZY * round(similarity, 1)
+        return matches
+
+    def _levels(self, token: str, fuzzy: bool) -> dict[float, _Union]:
+        """Posting lists matching a token, grouped by score (field weight x quality)."""
+        levels: dict[float, list[list]] = {}
+        for term, quality in self._expand(token, fuzzy).items():
+            for field, postings in self._postings[term].items():
+                score = round(FIELD_WEIGHTS[field] * quality, 2)
+                levels.setdefault(score, []).append(postings)
+        best = sorted(levels, reverse=True)[:MAX_LEVELS]
+        return {score: _Union(levels[score], self._sets) for score in best}
+
+    def search(self, query: str, limit: int = 20, fuzzy: bool = True) -> list[tuple[int, float]]:
+        """[(activity id, score)] of the best matches for every query token, best first.
+
+        A document's score sums, per token, its best-scoring match; ties go to the
+        most recent activity.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+        if not tokens or limit <= 0:
+            return []
+        per_token = [self._levels(t, fuzzy) for t in tokens]
+        if not all(per_token):
+            return []
+
+        # Score combinations, best first; a document appears under its best one
+        combos: dict[float, list[list[_Union]]] = {}
+        for choice in product(*(sorted(levels.items(), reverse=True) for levels in per_token)):
+            total = round(sum(score for score, _ in choice), 2)
+            combos.setdefault(total, []).append([union for _, union in choice])
+
+        results: list[tuple[int, float]] = []
+        seen = set()
+        for total in sorted(combos, reverse=True):
+            needed = limit - len(results)
+            streams = [_intersect(unions, needed, len(self._docs)) for unions in combos[total]]
+            for key in heapq.merge(*streams) if len(streams) > 1 else streams[0]:
+                if key in seen:
+                    continue
+                seen.add(key)
+                results.append((-key & _ID_MASK, total))
+                if len(results) == limit:
+                    return results
+        return results
+
+    def position(self, activity_id: int) -> int:
+        """Position of the activity in the dataset the index was built from."""
+        return self._positions[activity_id]
@@ -0,0 +1,405 @@
+"""Columnar, memory-mapped activity snapshots shared read-only between processes.
+
+One process converts activities.json into a flat binary file; every API worker maps
+it read-only, so the OS page cache holds a single copy however many workers run.
+Each rebuild bumps a generation counter stored in the file prefix, letting workers
+notice a new snapshot with a 24-byte read instead of reparsing anything.
+"""
+
+import fcntl
+import json
+import math
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timezone
+
+from .activity import Activity
+from .storage import ActivityStorage
+
+MAGIC = b"STRVSNP1"
+_PREFIX = struct.Struct("<8sQI")  # magic, generation, header length
+_ALIGN = 8
+
+# Activity fields kept in the snapshot, by column type. Anything else in the raw
+# Strava payload is dropped.
+INT_FIELDS = ("id",)
+FLOAT_FIELDS = (
+    "distance", "moving_time", "elapsed_time", "total_elevation_gain", "kilojoules",
+    "average_speed", "max_speed", "average_heartrate", "max_heartrate", "suffer_score",
+    "utc_offset",
+)
+STRING_FIELDS = ("name", "sport_type", "type", "gear_id", "location_city", "device_name", "timezone")
+BOOL_FIELDS = ("commute", "trainer", "manual", "private")
+LATLNG_FIELDS = ("start_latlng", "end_latlng")
+
+_ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def snapshot_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".snapshot"
+
+
+def read_generation(path: str) -> int:
+    """Return the generation of the snapshot at path, or 0 if there is none."""
+    try:
+        with open(path, "rb") as f:
+            magic, generation, _ = _PREFIX.unpack(f.read(_PREFIX.size))
+    except (FileNotFoundError, struct.error):
+        return 0
+    return generation if magic == MAGIC else 0
+
+
+def source_signature(json_path: str) -> list[int]:
+    """(mtime_ns, size) of the stored activities, recorded by files derived from them."""
+    st = os.stat(json_path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _read_header(path: str) -> dict | None:
+    try:
+        with open(path, "rb") as f:
+            magic, _, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                return None
+            return json.loads(f.read(header_len))
+    except (FileNotFoundError, struct.error, ValueError):
+        return None
+
+
+def _parse_ts(start_date: str) -> int:
+    dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+    return int(dt.timestamp())
+
+
+def write_snapshot(
+    activities: list[dict | Activity], path: str, source: list[int] | None = None
+) -> int:
+    """Write activities as a new snapshot generation. Returns the new generation."""
+    n = len(activities)
+    columns: dict[str, array] = {}
+    strings: dict[str, int] = {}
+    string_list: list[bytes] = []
+
+    def intern(value) -> int:
+        # 0 is reserved for missing values
+        if value is None:
+            return 0
+        idx = strings.get(value)
+        if idx is None:
+            string_list.append(str(value).encode())
+            idx = strings[value] = len(string_list)
+        return idx
+
+    columns["start_ts"] = array("q", (_parse_ts(a["start_date"]) for a in activities))
+    for field in INT_FIELDS:
+        columns[field] = array("q", (a.get(field) or 0 for a in activities))
+    for field in FLOAT_FIELDS:
+        columns[field] = array(
+            "d", (math.nan if a.get(field) is None else float(a[field]) for a in activities)
+        )
+    for field in STRING_FIELDS:
+        columns[field] = array("I", (intern(a.get(field)) for a in activities))
+    for field in BOOL_FIELDS:
+        columns[field] = array(
+            "b", (-1 if a.get(field) is None else int(bool(a[field])) for a in activities)
+        )
+    for field in LATLNG_FIELDS:
+        lat, lng = array("d"), array("d")
+        for a in activities:
+            latlng = a.get(field)
+            if latlng and len(latlng) >= 2:
+                lat.append(latlng[0])
+                lng.append(latlng[1])
+            else:
+                lat.append(math.nan)
+                lng.append(math.nan)
+        columns[f"{field}.lat"] = lat
+        columns[f"{field}.lng"] = lng
+
+    string_offsets = array("Q", [0])
+    for s in string_list:
+        string_offsets.append(string_offsets[-1] + len(s))
+    columns["_string_offsets"] = string_offsets
+    return _write_columns(columns, b"".join(string_list), n, path, source)
+
+
+def _write_columns(columns: dict[str, array], blob: bytes, n: int, path: str, source) -> int:
+    # Lay out every column at an aligned offset, relative to the start of the data area
+    layout = {}
+    offset = 0
+    for name, col in columns.items():
+        layout[name] = [col.typecode, offset, len(col)]
+        offset += -(-len(col) * col.itemsize // _ALIGN) * _ALIGN
+    blob_offset = offset
+
+    header = json.dumps(
+        {"count": n, "source": source, "columns": layout, "blob": [blob_offset, len(blob)]}
+    ).encode()
+    header += b" " * (-(_PREFIX.size + len(header)) % _ALIGN)
+    generation = read_generation(path) + 1
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, generation, len(header)))
+        f.write(header)
+        for name, col in columns.items():
+            data = col.tobytes()
+            f.write(data)
+            f.write(b"\0" * (-len(data) % _ALIGN))
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return generation
+
+
+class _SnapshotLock:
+    """Cross-process lock so only one worker builds a given snapshot."""
+
+    def __init__(self, path: str):
+        self._path = f"{path}.lock"
+
+    def __enter__(self):
+        self._file = open(self._path, "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def build_snapshot(storage: ActivityStorage, activities: list[dict | Activity] | None = None) -> int:
+    """(Re)build the snapshot for storage, from activities if given or from disk."""
+    path = snapshot_path_for(storage.path)
+    with _SnapshotLock(path):
+        if activities is None:
+            activities = storage.load()
+        return write_snapshot(activities, path, source_signature(storage.path))
+
+
+def ensure_snapshot(storage: ActivityStorage) -> int:
+    """Build the snapshot unless an up-to-date one exists. Returns its generation.
+
+    Safe to call from every worker at boot: the first one builds, the others wait on
+    the lock and then find the snapshot fresh.
+    """
+    path = snapshot_path_for(storage.path)
+    with _SnapshotLock(path):
+        header = _read_header(path)
+        if header is not None and header["source"] == source_signature(storage.path):
+            return read_generation(path)
+        return write_snapshot(storage.load(), path, source_signature(storage.path))
+
+
+def _row_values(activity, intern) -> dict:
+    """One activity's value in every column, encoded as write_snapshot() does."""
+    values = {"start_ts": _parse_ts(activity["start_date"])}
+    for field in INT_FIELDS:
+        values[field] = activity.get(field) or 0
+    for field in FLOAT_FIELDS:
+        value = activity.get(field)
+        values[field] = math.nan if value is None else float(value)
+    for field in STRING_FIELDS:
+        values[field] = intern(activity.get(field))
+    for field in BOOL_FIELDS:
+        value = activity.get(field)
+        values[field] = -1 if value is None else int(bool(value))
+    for field in LATLNG_FIELDS:
+        latlng = activity.get(field)
+        valid = latlng and len(latlng) >= 2
+        values[f"{field}.lat"] = latlng[0] if valid else math.nan
+        values[f"{field}.lng"] = latlng[1] if valid else math.nan
+    return values
+
+
+def _copy_column(column: memoryview) -> array:
+    copy = array(column.format)
+    copy.frombytes(column.cast("B"))
+    return copy
+
+
+def patch_snapshot(
+    storage: ActivityStorage, base: "SnapshotActivities", upserts, deleted_ids=()
+) -> tuple[int, dict[int, int]] | None:
+    """Publish base with some activities upserted and others deleted, without reparsing
+    the rest: columns are copied as raw bytes and only the touched rows are encoded.
+
+    Edited activities keep their row, new ones are appended and a deleted row is
+    replaced by the last one, so the snapshot is no longer strictly newest first (the
+    next full build restores that). Strings of replaced rows stay in the string table
+    until then. Returns the new generation and the row of every activity written or
+    moved, or None when another process published a newer generation than base.
+    """
+    path = snapshot_path_for(storage.path)
+    with _SnapshotLock(path):
+        if read_generation(path) != base.generation:
+            return None
+        columns = {name: _copy_column(col) for name, col in base._columns.items()}
+        offsets = columns.pop("_string_offsets")
+        new_strings: dict[str, int] = {}
+        added: list[bytes] = []
+
+        def intern(value) -> int:
+            # New strings go after the base ones, deduplicated among themselves only
+            if value is None:
+                return 0
+            idx = new_strings.get(value)
+            if idx is None:
+                data = str(value).encode()
+                added.append(data)
+                offsets.append(offsets[-1] + len(data))
+                idx = new_strings[value] = len(offsets) - 1
+            return idx
+
+        ids = columns["id"]
+        placed: dict[int, int] = {}
+        for activity in upserts:
+            values = _row_values(activity, intern)
+            try:
+                row = ids.index(values["id"])
+            except ValueError:
+                for name, col in columns.items():
+                    col.append(values[name])
+                row = len(ids) - 1
+            else:
+                for name, col in columns.items():
+                    col[row] = values[name]
+            placed[values["id"]] = row
+        for activity_id in deleted_ids:
+            try:
+                row = ids.index(activity_id)
+            except ValueError:
+                continue
+            last = len(ids) - 1
+            for col in columns.values():
+                col[row] = col[last]
+                col.pop()
+            placed.pop(activity_id, None)
+            if row != last:
+                placed[ids[row]] = row
+
+        columns["_string_offsets"] = offsets
+        blob = bytes(base._blob) + b"".join(added)
+        generation = _write_columns(columns, blob, len(ids), path, source_signature(storage.path))
+    return generation, placed
+
+
+class SnapshotActivity(Mapping):
+    """Read-only, dict-like view of one activity row in a snapshot."""
+
+    __slots__ = ("_snap", "_i")
+
+    def __init__(self, snap: "SnapshotActivities", i: int):
+        self._snap = snap
+        self._i = i
+
+    def __getitem__(self, key):
+        value = self._snap.value(key, self._i)
+        if value is None and key not in _NULLABLE:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return (key for key in FIELDS if self._snap.value(key, self._i) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"SnapshotActivity({dict(self)!r})"
+
+
+FIELDS = (
+    INT_FIELDS + ("start_date", "start_date_local") + FLOAT_FIELDS + STRING_FIELDS
+    + BOOL_FIELDS + LATLNG_FIELDS
+)
+# Fields Strava sends as explicit nulls; keep returning None rather than raising
+_NULLABLE = frozenset(("gear_id", "location_city", "start_latlng", "end_latlng"))
+
+
+class SnapshotActivities(Sequence):
+    """A mapped snapshot, exposed as a sequence of dict-like activity rows."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.generation, header_len = _PREFIX.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an activity snapshot")
+        header = json.loads(self._mm[_PREFIX.size:_PREFIX.size + header_len])
+        self.size_bytes = len(self._mm)
+        self._count = header["count"]
+        # Signature of the stored activities this snapshot was written from
+        self.source = header["source"]
+
+        view = memoryview(self._mm)
+        data_start = _PREFIX.size + header_len
+        self._columns = {}
+        for name, (typecode, offset, length) in header["columns"].items():
+            start = data_start + offset
+            itemsize = array(typecode).itemsize
+            self._columns[name] = view[start:start + length * itemsize].cast(typecode)
+        blob_offset, blob_len = header["blob"]
+        self._blob = view[data_start + blob_offset:data_start + blob_offset + blob_len]
+
+    def column(self, name: str) -> memoryview:
+        """Zero-copy access to a raw column (start_ts, distance, sport_type, ...)."""
+        return self._columns[name]
+
+    def rows_of(self, activity_ids) -> dict[int, int]:
+        """The row of each of activity_ids present in the snapshot."""
+        ids = _copy_column(self._columns["id"])
+        rows = {}
+        for activity_id in activity_ids:
+            try:
+                rows[activity_id] = ids.index(activity_id)
+            except ValueError:
+                pass
+        return rows
+
+    def string(self, idx: int) -> str | None:
+        if idx == 0:
+            return None
+        offsets = self._columns["_string_offsets"]
+        return str(self._blob[offsets[idx - 1]:offsets[idx]], "utf-8")
+
+    def value(self, key: str, i: int):
+        cols = self._columns
+        if key == "start_date":
+            ts = cols["start_ts"][i]
+            return datetime.fromtimestamp(ts, timezone.utc).strftime(_ISO_FORMAT)
+        if key == "start_date_local":
+            offset = cols["utc_offset"][i]
+            ts = cols["start_ts"][i] + (0 if math.isnan(offset) else int(offset))
+            return datetime.fromtimestamp(ts, timezone.utc).strftime(_ISO_FORMAT)
+        if key in LATLNG_FIELDS:
+            lat = cols[f"{key}.lat"][i]
+            return None if math.isnan(lat) else [lat, cols[f"{key}.lng"][i]]
+        col = cols.get(key)
+        if col is None:
+            return None
+        raw = col[i]
+        if col.format == "d":
+            return None if math.isnan(raw) else raw
+        if col.format == "I":
+            return self.string(raw)
+        if col.format == "b":
+            return None if raw < 0 else bool(raw)
+        return raw
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [SnapshotActivity(self, j) for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return SnapshotActivity(self, i)
+
+    def __len__(self):
+        return self._count
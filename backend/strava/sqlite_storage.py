@@ -0,0 +1,270 @@
+"""Embedded SQLite activity storage.
+
+Same interface as ActivityStorage, but activities live in one normalized table
+(indexed on start_date, sport_type and gear_id) and syncs upsert by id instead of
+rewriting the whole dataset. Filters and statistics run as SQL aggregates, so they
+never materialize the history in memory.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+from .activity import Activity, to_dict
+from .sports import resolve_sport
+from .summary import write_summary
+
+# Queryable columns extracted from each activity; the full record is kept in `data`
+_COLUMNS = (
+    ("name", "TEXT"),
+    ("sport_type", "TEXT"),
+    ("type", "TEXT"),
+    ("start_date", "TEXT NOT NULL"),
+    ("start_date_local", "TEXT"),
+    ("timezone", "TEXT"),
+    ("distance", "REAL"),
+    ("moving_time", "REAL"),
+    ("elapsed_time", "REAL"),
+    ("total_elevation_gain", "REAL"),
+    ("average_speed", "REAL"),
+    ("max_speed", "REAL"),
+    ("average_heartrate", "REAL"),
+    ("max_heartrate", "REAL"),
+    ("kilojoules", "REAL"),
+    ("suffer_score", "REAL"),
+    ("gear_id", "TEXT"),
+    ("commute", "INTEGER"),
+    ("trainer", "INTEGER"),
+    ("manual", "INTEGER"),
+    ("private", "INTEGER"),
+    ("start_lat", "REAL"),
+    ("start_lng", "REAL"),
+    ("end_lat", "REAL"),
+    ("end_lng", "REAL"),
+)
+_LATLNG = {"start_lat": ("start_latlng", 0), "start_lng": ("start_latlng", 1),
+           "end_lat": ("end_latlng", 0), "end_lng": ("end_latlng", 1)}
+_NAMES = ["id"] + [name for name, _ in _COLUMNS] + ["data"]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{name} {sql_type}" for name, sql_type in _COLUMNS)},
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS activities_start_date ON activities (start_date);
+CREATE INDEX IF NOT EXISTS activities_sport_type ON activities (sport_type, start_date);
+CREATE INDEX IF NOT EXISTS activities_gear_id ON activities (gear_id);
+"""
+
+# Unchanged activities are skipped, so a sync only writes what Strava changed
+_UPSERT = (
+    f"INSERT INTO activities ({', '.join(_NAMES)}) VALUES ({', '.join('?' * len(_NAMES))}) "
+    f"ON CONFLICT(id) DO UPDATE SET "
+    f"{', '.join(f'{name} = excluded.{name}' for name in _NAMES[1:])} "
+    f"WHERE data IS NOT excluded.data"
+)
+
+# Newest first, like the Strava API and activities.json
+_ORDER = "ORDER BY start_date DESC, id DESC"
+
+
+def _row(activity: dict | Activity) -> tuple:
+    activity = to_dict(activity)
+    values = [activity["id"]]
+    for name, _ in _COLUMNS:
+        if name in _LATLNG:
+            field, i = _LATLNG[name]
+            latlng = activity.get(field)
+            values.append(latlng[i] if latlng and len(latlng) >= 2 else None)
+        else:
+            value = activity.get(name)
+            values.append(int(value) if isinstance(value, bool) else value)
+    values.append(json.dumps(activity, ensure_ascii=False, separators=(",", ":")))
+    return tuple(values)
+
+
+def _iso(dt: datetime) -> str:
+    """A naive-UTC bound in start_date's format, for comparing as text."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    # start_date has whole seconds, so rounding the bound up keeps `>=` and `<` exact
+    if dt.microsecond:
+        dt = dt.replace(microsecond=0) + timedelta(seconds=1)
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SQLiteActivityStorage:
+    def __init__(self, path: str):
+        self._path = path
+        self._ready = False
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _connect(self, create: bool = False) -> sqlite3.Connection:
+        # Reading a missing database fails like reading a missing activities.json
+        if not create and not os.path.exists(self._path):
+            raise FileNotFoundError(self._path)
+        if not self._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        conn = sqlite3.connect(self._path)
+        if not self._ready:
+            conn.executescript(_SCHEMA)
+            self._ready = True
+        return conn
+
+    def query(self, sql: str, params=()) -> list[tuple]:
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def iter_query(self, sql: str, params=(), batch: int = 500):
+        """Like query(), but yields rows as they are read, one batch in memory at a time."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(sql, params)
+            while rows := cursor.fetchmany(batch):
+                yield from rows
+
+    def save(self, activities: list[dict | Activity], summary: bool = True):
+        """Make the stored dataset equal to activities: upsert them, drop the rest."""
+        with closing(self._connect(create=True)) as conn, conn:
+            changed = conn.executemany(_UPSERT, map(_row, activities)).rowcount
+            conn.execute("CREATE TEMP TABLE keep (id INTEGER PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO keep VALUES (?)", ((a["id"],) for a in activities))
+            deleted = conn.execute(
+                "DELETE FROM activities WHERE id NOT IN (SELECT id FROM keep)"
+            ).rowcount
+            conn.execute("DROP TABLE keep")
+        if summary:
+            write_summary(self._path, activities)
+        print(
+            f"Saved {len(activities)} activities to {self._path} "
+            f"({changed} written, {deleted} deleted)"
+        )
+
+    def upsert(self, activities: list[dict | Activity], summary: bool = True) -> int:
+        """Insert or update activities by id, leaving all others untouched.
+
+        Returns the number of rows actually written.
+        """
+        with closing(self._connect(create=True)) as conn, conn:
+            changed = conn.executemany(_UPSERT, map(_row, activities)).rowcount
+        if summary and changed:
+            write_summary(self._path, self.load())
+        print(f"Upserted {len(activities)} activities into {self._path} ({changed} written)")
+        return changed
+
+    def delete(self, activity_ids, summary: bool = True) -> int:
+        with closing(self._connect(create=True)) as conn, conn:
+            deleted = conn.executemany(
+                "DELETE FROM activities WHERE id = ?", ((i,) for i in activity_ids)
+            ).rowcount
+        if summary and deleted:
+            write_summary(self._path, self.load())
+        return deleted
+
+    def load(self) -> list[Activity]:
+        rows = self.query(f"SELECT data FROM activities {_ORDER}")
+        return [Activity(json.loads(data)) for (data,) in rows]
+
+    def release(self):
+        """Nothing is held between queries."""
+
+    def get_by_sport(self, sport: str) -> list[Activity]:
+        rows = self.query(
+            f"SELECT data FROM activities WHERE sport_type = ? {_ORDER}", (resolve_sport(sport),)
+        )
+        return [Activity(json.loads(data)) for (data,) in rows]
+
+    def get_sport_types(self) -> list[str]:
+        return [sport for (sport,) in self.query("SELECT DISTINCT sport_type FROM activities ORDER BY 1")]
+
+    def filter(self) -> "SQLActivityFilter":
+        return SQLActivityFilter(self)
+
+    def stats(self) -> "SQLActivityStats":
+        return SQLActivityStats(self.filter())
+
+
+class SQLActivityFilter:
+    """ActivityFilter over a SQLite storage: filters accumulate into a WHERE clause."""
+
+    def __init__(self, storage: SQLiteActivityStorage, clauses: tuple = (), params: tuple = ()):
+        self._storage = storage
+        self._clauses = clauses
+        self._params = params
+
+    def _where(self, clause: str, *params) -> "SQLActivityFilter":
+        return SQLActivityFilter(self._storage, self._clauses + (clause,), self._params + params)
+
+    def by_sport(self, sport: str) -> "SQLActivityFilter":
+        return self._where("sport_type = ?", resolve_sport(sport))
+
+    def by_year(self, year: int) -> "SQLActivityFilter":
+        return self.by_date_range(datetime(year, 1, 1), datetime(year + 1, 1, 1))
+
+    def by_date_range(self, after: datetime, before: datetime) -> "SQLActivityFilter":
+        return self._where("start_date >= ? AND start_date < ?", _iso(after), _iso(before))
+
+    def _sql(self, columns: str, tail: str) -> str:
+        where = f"WHERE {' AND '.join(self._clauses)}" if self._clauses else ""
+        return f"SELECT {columns} FROM activities {where} {tail}"
+
+    def select(self, columns: str, tail: str = "") -> list[tuple]:
+        return self._storage.query(self._sql(columns, tail), self._params)
+
+    def sport_types(self) -> list[str]:
+        return [sport for (sport,) in self.select("DISTINCT sport_type", "ORDER BY 1")]
+
+    def __iter__(self):
+        """Stream the matching activities from a cursor instead of fetching them all."""
+        for (data,) in self._storage.iter_query(self._sql("data", _ORDER), self._params):
+            yield Activity(json.loads(data))
+
+    @property
+    def activities(self) -> list[Activity]:
+        return [Activity(json.loads(data)) for (data,) in self.select("data", _ORDER)]
+
+    def __len__(self) -> int:
+        return self.select("COUNT(*)")[0][0]
+
+
+class SQLActivityStats:
+    """ActivityStats computed by SQLite aggregates."""
+
+    _SPORT = "COALESCE(sport_type, 'Unknown')"
+    _YEAR = "CAST(substr(start_date, 1, 4) AS INTEGER)"
+    _DISTANCE = "SUM(COALESCE(distance, 0))"
+
+    def __init__(self, activity_filter: SQLActivityFilter):
+        self._filter = activity_filter
+
+    def total_km(self) -> float:
+        return (self._filter.select(self._DISTANCE)[0][0] or 0) / 1000
+
+    def total_km_by_sport(self) -> dict[str, float]:
+        rows = self._filter.select(f"{self._SPORT}, {self._DISTANCE}", "GROUP BY 1")
+        return {sport: dist / 1000 for sport, dist in sorted(rows)}
+
+    def total_km_by_year(self) -> dict[int, float]:
+        rows = self._filter.select(f"{self._YEAR}, {self._DISTANCE}", "GROUP BY 1")
+        return {year: dist / 1000 for year, dist in sorted(rows)}
+
+    def total_km_by_year_and_sport(self) -> dict[int, dict[str, float]]:
+        rows = self._filter.select(f"{self._YEAR}, {self._SPORT}, {self._DISTANCE}", "GROUP BY 1, 2")
+        result: dict[int, dict[str, float]] = {}
+        for year, sport, dist in sorted(rows):
+            result.setdefault(year, {})[sport] = dist / 1000
+        return result
+
+    def by_sport(self, sport: str) -> "SQLActivityStats":
+        return SQLActivityStats(self._filter.by_sport(sport))
+
+    def by_year(self, year: int) -> "SQLActivityStats":
+        return SQLActivityStats(self._filter.by_year(year))
+
+    def by_date_range(self, after: datetime, before: datetime) -> "SQLActivityStats":
+        return SQLActivityStats(self._filter.by_date_range(after, before))
@@ -1,12 +1,13 @@
 from collections import defaultdict
 from datetime import datetime
 
+from .activity import Activity
 from .filter import ActivityFilter
 from .sports import resolve_sport
 
 
 class ActivityStats:
-    def __init__(self, activities: list[dict]):
+    def __init__(self, activities: list[dict | Activity]):
         self._filter = ActivityFilter(activities)
 
     def total_km(self) -> float:
@@ -1,24 +1,160 @@
 import json
+import os
 
+from .activity import Activity, as_activity, to_dict
+from .athletes import DEFAULT_ATHLETE, activities_path, database_path, journal_path
+from .filter import ActivityFilter
 from .sports import resolve_sport
+from .stats import ActivityStats
+from .summary import write_summary
+
+# Storage backend for every athlete: "json" (one activities.json file), "sqlite" or
+# "journal" (append-only segments compacted in the background)
+STORAGE_BACKEND = os.environ.get("STRAVA_STORAGE", "json")
+
+
+class _Parsed:
+    """A parsed activities file and the indexes derived from it."""
+
+    def __init__(self, signature: tuple, activities: list[Activity]):
+        self.signature = signature
+        self.activities = activities
+        self._by_sport: dict[str, list[Activity]] | None = None
+
+    @property
+    def by_sport(self) -> dict[str, list[Activity]]:
+        if self._by_sport is None:
+            by_sport: dict[str, list[dict]] = {}
+            for a in self.activities:
+                by_sport.setdefault(a.get("sport_type"), []).append(a)
+            self._by_sport = by_sport
+        return self._by_sport
 
 
 class ActivityStorage:
     def __init__(self, path: str):
         self._path = path
+        # The file as last parsed by this instance, validated against its
+        # (mtime, size, inode) on each access. Per instance, so it is freed with it:
+        # the API opens storage per request and serves reads from the snapshot.
+        self._cached: _Parsed | None = None
 
-    def save(self, activities: list[dict]):
-        with open(self._path, "w") as f:
-            json.dump(activities, f, indent=2, ensure_ascii=False)
-        print(f"Saved {len(activities)} activities to {self._path}")
+    @property
+    def path(self) -> str:
+        return self._path
 
-    def load(self) -> list[dict]:
+    def _signature(self) -> tuple:
+        st = os.stat(self._path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _parsed(self) -> _Parsed:
+        signature = self._signature()
+        parsed = self._cached
+        if parsed is not None and parsed.signature == signature:
+            return parsed
         with open(self._path) as f:
-            return json.load(f)
+            activities = json.load(f)
+        # Replaced one by one, so the full dicts are freed as the records are built
+        for i, a in enumerate(activities):
+            activities[i] = Activity(a)
+        self._cached = parsed = _Parsed(signature, activities)
+        return parsed
+
+    def release(self):
+        """Drop what was parsed into memory; the next read parses the file again."""
+        self._cached = None
+
+    def save(self, activities: list[dict | Activity], summary: bool = True):
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        # Write to a temporary file and swap it in, so readers never see a half-written file
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([to_dict(a) for a in activities], f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self._path)
+        if summary:
+            # Precomputed aggregates let the API answer before parsing the activities
+            write_summary(self._path, activities)
+        # Not kept as parsed: the caller already holds the list, and a later load()
+        # parses the file only if it is asked for
+        self._cached = None
+        print(f"Saved {len(activities)} activities to {self._path}")
+
+    def upsert(self, activities: list[dict | Activity], summary: bool = True) -> int:
+        """Insert or update activities by id, keeping the file newest first.
+
+        The whole file is rewritten; returns the number of activities that changed.
+        """
+        current = self._loaded_or_empty()
+        existing = {a.get("id"): a for a in current}
+        changed = {}
+        for a in map(as_activity, activities):
+            if existing.get(a.get("id")) != a:
+                changed[a.get("id")] = a
+        if not changed:
+            return 0
+        merged = [a for a in current if a.get("id") not in changed] + list(changed.values())
+        # Stable, so activities starting at the same second keep their order
+        merged.sort(key=lambda a: a["start_date"], reverse=True)
+        self.save(merged, summary)
+        return len(changed)
 
-    def get_by_sport(self, sport: str) -> list[dict]:
+    def delete(self, activity_ids, summary: bool = True) -> int:
+        removed = set(activity_ids)
+        current = self._loaded_or_empty()
+        kept = [a for a in current if a.get("id") not in removed]
+        deleted = len(current) - len(kept)
+        if deleted:
+            self.save(kept, summary)
+        return deleted
+
+    def _loaded_or_empty(self) -> list[Activity]:
+        try:
+            return self.load()
+        except FileNotFoundError:
+            return []
+
+    def load(self) -> list[Activity]:
+        """Parsed activities as compact records, reparsed only when the file changed on disk.
+
+        The list is shared between callers and must be treated as read-only.
+        """
+        return self._parsed().activities
+
+    def get_by_sport(self, sport: str) -> list[Activity]:
         sport_type = resolve_sport(sport)
-        return [a for a in self.load() if a.get("sport_type") == sport_type]
+        return list(self._parsed().by_sport.get(sport_type, []))
 
     def get_sport_types(self) -> list[str]:
-        return sorted({a.get("sport_type") for a in self.load()})
+        return sorted(self._parsed().by_sport)
+
+    def filter(self) -> ActivityFilter:
+        return ActivityFilter(self.load())
+
+    def stats(self) -> ActivityStats:
+        return ActivityStats(self.load())
+
+
+def open_storage(base_dir: str, athlete_id: str = DEFAULT_ATHLETE, backend: str | None = None):
+    """The athlete's storage for the configured backend (STRAVA_STORAGE by default).
+
+    A new SQLite database or journal is seeded from the athlete's activities.json, if any.
+    """
+    backend = backend or STORAGE_BACKEND
+    json_path = activities_path(base_dir, athlete_id)
+    if backend == "json":
+        return ActivityStorage(json_path)
+    if backend == "sqlite":
+        from .sqlite_storage import SQLiteActivityStorage
+
+        path = database_path(base_dir, athlete_id)
+        storage = SQLiteActivityStorage(path)
+    elif backend == "journal":
+        from .journal_storage import JournalActivityStorage
+
+        path = journal_path(base_dir, athlete_id)
+        storage = JournalActivityStorage(path)
+    else:
+        raise ValueError(f"Unknown storage backend: {backend!r}")
+    if not os.path.exists(path) and os.path.exists(json_path):
+        storage.save(ActivityStorage(json_path).load())
+    return storage
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from .config import STREAM_DOWNLOAD_WINDOW_SECONDS, STREAM_DOWNLOADS_PER_WINDOW
+
+
+class DownloadBudget:
+    """Downloads allowed within a sliding time window, shared by every sync in the process."""
+
+    def __init__(self, limit: int, window: float):
+        self._limit = limit
+        self._window = window
+        self._times: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """Spend one download if the window allows it."""
+        now = time.monotonic()
+        with self._lock:
+            while self._times and now - self._times[0] >= self._window:
+                self._times.popleft()
+            if len(self._times) >= self._limit:
+                return False
+            self._times.append(now)
+            return True
+
+
+download_budget = DownloadBudget(STREAM_DOWNLOADS_PER_WINDOW, STREAM_DOWNLOAD_WINDOW_SECONDS)
+
+
+class StreamStore:
+    """Per-activity distance/time streams, cached as files in one directory.
+
+    Streams are read from <directory>/<activity id>.json (the Strava key_by_type
+    format). Missing ones are downloaded when a StravaClient is given; without one
+    the directory alone acts as the source, e.g. a local fixture. Downloads draw from
+    the process-wide budget; once it is spent, missing streams are unavailable until
+    the window moves on.
+    """
+
+    def __init__(self, directory: str, client=None, budget: DownloadBudget = download_budget):
+        self._directory = directory
+        self._client = client
+        self._budget = budget
+
+    def _path(self, activity_id) -> str:
+        return os.path.join(self._directory, f"{int(activity_id)}.json")
+
+    def has(self, activity_id) -> bool:
+        return os.path.exists(self._path(activity_id))
+
+    @property
+    def can_download(self) -> bool:
+        return self._client is not None
+
+    def get(self, activity_id) -> tuple[list[float], list[float]] | None:
+        """(cumulative distance in m, elapsed time in s), or None if unavailable."""
+        path = self._path(activity_id)
+        try:
+            with open(path) as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            if self._client is None or not self._budget.take():
+                return None
+            raw = self._client.fetch_streams(activity_id)
+            os.makedirs(self._directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(raw, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        # Manual activities have no streams; Strava answers with an empty object
+        distance = raw.get("distance", {}).get("data") or []
+        time = raw.get("time", {}).get("data") or []
+        return distance, time
@@ -0,0 +1,172 @@
+"""Compact precomputed aggregates, written next to activities.json on every save.
+
+The summary holds the monthly distance cube, the commute classification, the
+reporting-period index and the sport list, computed with the athlete's commute
+settings. The API can answer its aggregate endpoints from it at boot, before (or
+without) mapping the raw activities.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from .commute import CommuteDetector
+from .periods import ReportingPeriods
+
+
+def summary_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".summary.json"
+
+
+def _commute_config_beside(json_path: str) -> dict:
+    # Same file as strava.athletes.commute_config_path for the athlete owning json_path
+    try:
+        with open(os.path.join(os.path.dirname(json_path), "commute.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def settings_key(detector: CommuteDetector) -> str:
+    return json.dumps(detector.cache_key())
+
+
+def build_summary(
+    activities, detector: CommuteDetector, periods: ReportingPeriods, source: list[int]
+) -> dict:
+    monthly = defaultdict(float)
+    for a in activities:
+        dt = datetime.fromisoformat(a["start_date"].replace("Z", "+00:00"))
+        monthly[(dt.year, dt.month, a.get("sport_type", "Unknown"))] += a.get("distance", 0)
+
+    commutes = detector.get_commute_activities(activities)
+    return summary_data(monthly, commutes, periods.index(commutes), detector, periods, source)
+
+
+def summary_data(
+    monthly: dict[tuple[int, int, str], float],
+    commutes: list[dict],
+    index: dict[tuple[int, int], list[dict]],
+    detector: CommuteDetector,
+    periods: ReportingPeriods,
+    source: list[int],
+) -> dict:
+    """The summary of already computed aggregates (commutes and index made with detector
+    and periods)."""
+    return {
+        "source": source,
+        "settings": settings_key(detector),
+        "cutoff_day": periods.cutoff_day,
+        # Every activity has a bucket, so the cube knows every sport
+        "sport_types": sorted({sport for _, _, sport in monthly}),
+        "monthly": [[y, m, sport, dist] for (y, m, sport), dist in monthly.items()],
+        "commutes": [
+            [
+                c["datetime"].isoformat(), c["departure"], c["arrival"], c["distance_km"],
+                c["name"], c.get("id"),
+            ]
+            for c in commutes
+        ],
+        "periods": [[y, m, periods.summarize(rows)] for (y, m), rows in sorted(index.items())],
+    }
+
+
+def write_summary(json_path: str, activities) -> str:
+    """Summarize activities just saved at json_path, with the athlete's commute settings."""
+    st = os.stat(json_path)
+    summary = build_summary(
+        activities,
+        CommuteDetector.from_config(_commute_config_beside(json_path)),
+        ReportingPeriods(),
+        [st.st_mtime_ns, st.st_size],
+    )
+    return _write(json_path, summary)
+
+
+def write_summary_aggregates(
+    json_path: str,
+    monthly: dict[tuple[int, int, str], float],
+    commutes: list[dict],
+    index: dict[tuple[int, int], list[dict]],
+) -> str:
+    """Like write_summary(), from aggregates kept up to date elsewhere instead of the
+    activities. commutes and index must use the athlete's settings and default periods."""
+    st = os.stat(json_path)
+    summary = summary_data(
+        monthly,
+        commutes,
+        index,
+        CommuteDetector.from_config(_commute_config_beside(json_path)),
+        ReportingPeriods(),
+        [st.st_mtime_ns, st.st_size],
+    )
+    return _write(json_path, summary)
+
+
+def _write(json_path: str, summary: dict) -> str:
+    path = summary_path_for(json_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        # dumps() takes the C encoder; dump() streams through the pure-Python one
+        f.write(json.dumps(summary, ensure_ascii=False, separators=(",", ":")))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_summary(json_path: str) -> "Summary | None":
+    """The summary for json_path, or None if missing or older than the file."""
+    try:
+        with open(summary_path_for(json_path)) as f:
+            data = json.load(f)
+        st = os.stat(json_path)
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get("source") != [st.st_mtime_ns, st.st_size]:
+        return None
+    return Summary(data)
+
+
+class Summary:
+    """Aggregates read from a summary file, with the same cached() hook as a dataset."""
+
+    def __init__(self, data: dict):
+        self.source = tuple(data["source"])
+        self.settings = data["settings"]
+        self.cutoff_day = data["cutoff_day"]
+        self.sport_types = data["sport_types"]
+        self.monthly = {(y, m, sport): dist for y, m, sport, dist in data["monthly"]}
+        self.commutes = []
+        # Summaries written before activity ids were recorded have five columns
+        for dt, departure, arrival, distance_km, name, *activity_id in data["commutes"]:
+            local_dt = datetime.fromisoformat(dt)
+            self.commutes.append({
+                "date": local_dt.date(),
+                "datetime": local_dt,
+                "departure": departure,
+                "arrival": arrival,
+                "distance_km": distance_km,
+                "name": name,
+                "id": activity_id[0] if activity_id else None,
+            })
+        self.period_summaries = {(y, m): summary for y, m, summary in data["periods"]}
+        self._cache: dict = {}
+        self._cache_lock = threading.Lock()
+
+    def covers(self, detector: CommuteDetector) -> bool:
+        """Whether the stored commute classification was made with these settings."""
+        return settings_key(detector) == self.settings
+
+    def cached_value(self, key, default=None):
+        """The value cached under key, without computing it."""
+        return self._cache.get(key, default)
+
+    def cached(self, key, compute):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        value = compute()
+        with self._cache_lock:
+            return self._cache.setdefault(key, value)
@@ -0,0 +1,89 @@
+import math
+from datetime import date, timedelta
+from itertools import accumulate
+
+from .config import ATL_DAYS, CTL_DAYS, HR_MAX, HR_REST
+
+METRICS = ("distance_km", "moving_time_h", "elevation_m", "kilojoules", "load")
+ROLLING_WINDOWS = (7, 28, 42)
+
+
+def _trimp(activity) -> float:
+    """Training load of one activity: Strava's suffer score, else Banister TRIMP from heart rate."""
+    suffer = activity.get("suffer_score")
+    if suffer is not None:
+        return float(suffer)
+    avg_hr = activity.get("average_heartrate")
+    if not avg_hr:
+        return 0.0
+    minutes = activity.get("moving_time", 0) / 60
+    hr_reserve = min(max((avg_hr - HR_REST) / (HR_MAX - HR_REST), 0.0), 1.0)
+    return minutes * hr_reserve * 0.64 * math.exp(1.92 * hr_reserve)
+
+
+class TrainingSeries:
+    """Dense per-day metric series, with rolling windows and acute/chronic load.
+
+    Activities are bucketed once by local start day; every per-day computation
+    after that is a cumulative pass (prefix sums, exponential accumulate) rather
+    than a loop over windows.
+    """
+
+    def __init__(self, activities, start: date | None = None, end: date | None = None):
+        buckets: dict[date, list[float]] = {}
+        for a in activities:
+            day = date.fromisoformat(a["start_date_local"][:10])
+            row = buckets.get(day)
+            if row is None:
+                row = buckets[day] = [0.0] * len(METRICS)
+            row[0] += a.get("distance", 0) / 1000
+            row[1] += a.get("moving_time", 0) / 3600
+            row[2] += a.get("total_elevation_gain") or 0
+            row[3] += a.get("kilojoules") or 0
+            row[4] += _trimp(a)
+
+        if not buckets and (start is None or end is None):
+            self.days: list[date] = []
+            self.metrics = {m: [] for m in METRICS}
+            return
+        start = start or min(buckets)
+        end = end or max(buckets)
+        self.days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        empty = [0.0] * len(METRICS)
+        rows = [buckets.get(d, empty) for d in self.days]
+        self.metrics = {m: [row[i] for row in rows] for i, m in enumerate(METRICS)}
+
+    def rolling(self, metric: str, window: int) -> list[float]:
+        """Trailing window sums, from differences of one prefix-sum pass."""
+        prefix = list(accumulate(self.metrics[metric], initial=0.0))
+        return [
+            prefix[i + 1] - prefix[max(0, i + 1 - window)] for i in range(len(self.days))
+        ]
+
+    def ewma(self, metric: str, time_constant: float) -> list[float]:
+        k = 1 - math.exp(-1 / time_constant)
+        smoothed = accumulate(self.metrics[metric], lambda prev, x: prev + (x - prev) * k, initial=0.0)
+        return list(smoothed)[1:]
+
+    def training_load(self) -> dict[str, list[float]]:
+        """Acute (ATL) and chronic (CTL) training load, and their balance (TSB = CTL - ATL)."""
+        atl = self.ewma("load", ATL_DAYS)
+        ctl = self.ewma("load", CTL_DAYS)
+        return {"atl": atl, "ctl": ctl, "tsb": [c - a for a, c in zip(atl, ctl)]}
+
+    def to_dict(self, windows=ROLLING_WINDOWS, ndigits: int = 2) -> dict:
+        """Columnar representation: one list per series, aligned on `dates`."""
+        def r(values):
+            return [round(v, ndigits) for v in values]
+
+        return {
+            "dates": [d.isoformat() for d in self.days],
+            "daily": {m: r(values) for m, values in self.metrics.items()},
+            "rolling": {
+                m: {str(w): r(self.rolling(m, w)) for w in windows} for m in METRICS
+            },
+            **{k: r(v) for k, v in self.training_load().items()},
+        }
+
+    def __len__(self) -> int:
+        return len(self.days)
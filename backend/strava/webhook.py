@@ -0,0 +1,82 @@
+"""Strava push subscription events.
+
+Strava POSTs a small event for each change: an activity created, edited or deleted,
+or an athlete revoking access. Events carry ids only, so the activity is fetched on
+its own (StravaClient.fetch_activity); that detailed representation is trimmed to
+what the activity list, and so a full sync, would have stored.
+"""
+
+ASPECT_TYPES = ("create", "update", "delete")
+OBJECT_TYPES = ("activity", "athlete")
+
+# Bulky parts of a detailed activity that the athlete's activity list does not return
+DETAIL_ONLY_FIELDS = frozenset((
+    "segment_efforts", "splits_metric", "splits_standard", "laps", "best_efforts", "photos",
+    "similar_activities", "stats_visibility", "available_zones",
+))
+
+
+def stored_fields(activity: dict) -> dict:
+    """A fetched activity without its detail-only parts."""
+    return {k: v for k, v in activity.items() if k not in DETAIL_ONLY_FIELDS}
+
+
+class WebhookEvent:
+    def __init__(
+        self,
+        object_type: str,
+        object_id: int,
+        aspect_type: str,
+        owner_id: int,
+        updates: dict | None = None,
+        event_time: int = 0,
+        subscription_id: int | None = None,
+    ):
+        self.object_type = object_type
+        self.object_id = object_id
+        self.aspect_type = aspect_type
+        self.owner_id = owner_id
+        self.updates = updates or {}
+        self.event_time = event_time
+        self.subscription_id = subscription_id
+
+    @classmethod
+    def from_payload(cls, payload) -> "WebhookEvent":
+        """Parse the JSON body Strava posts, raising ValueError if it is not an event."""
+        if not isinstance(payload, dict):
+            raise ValueError("Event must be a JSON object")
+        try:
+            event = cls(
+                object_type=payload["object_type"],
+                object_id=int(payload["object_id"]),
+                aspect_type=payload["aspect_type"],
+                owner_id=int(payload["owner_id"]),
+                updates=payload.get("updates"),
+                event_time=int(payload.get("event_time", 0)),
+                subscription_id=payload.get("subscription_id"),
+            )
+        except KeyError as e:
+            raise ValueError(f"Missing event field {e.args[0]!r}")
+        except (TypeError, ValueError):
+            raise ValueError("Event ids and times must be integers")
+        if event.object_type not in OBJECT_TYPES:
+            raise ValueError(f"Unknown object_type {event.object_type!r}")
+        if event.aspect_type not in ASPECT_TYPES:
+            raise ValueError(f"Unknown aspect_type {event.aspect_type!r}")
+        if not isinstance(event.updates, dict):
+            raise ValueError("updates must be an object")
+        return event
+
+    @property
+    def is_activity(self) -> bool:
+        return self.object_type == "activity"
+
+    def to_dict(self) -> dict:
+        return {
+            "object_type": self.object_type,
+            "object_id": self.object_id,
+            "aspect_type": self.aspect_type,
+            "owner_id": self.owner_id,
+            "updates": self.updates,
+            "event_time": self.event_time,
+        }
@@ -0,0 +1,99 @@
+"""Shared fixtures: a throwaway data directory and a local stand-in for the Strava API.
+
+Configuration is read from the environment when the API modules are imported, so it
+is set here before any test imports them.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.synthetic import generate_streams
+
+DATA_DIR = tempfile.mkdtemp(prefix="strava-tests-")
+VERIFY_TOKEN = "test-verify-token"
+
+
+class FakeStrava(BaseHTTPRequestHandler):
+    """GET /api/v3/activities/{id} and /api/v3/activities/{id}/streams from `activities`."""
+
+    activities: dict[int, dict] = {}
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) < 4 or parts[:3] != ["api", "v3", "activities"] or not parts[3].isdigit():
+            return self._send(404, {"message": "Record Not Found"})
+        activity = self.activities.get(int(parts[3]))
+        if activity is None:
+            return self._send(404, {"message": "Record Not Found"})
+        if parts[4:] == ["streams"]:
+            return self._send(200, generate_streams(activity))
+        return self._send(200, self.detail(activity))
+
+    @staticmethod
+    def detail(activity: dict) -> dict:
+        """The detailed representation, with more than the list endpoint returns."""
+        return {**activity, "segment_efforts": [], "laps": [], "calories": 321.0}
+
+    def _send(self, status: int, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+_fake = ThreadingHTTPServer(("127.0.0.1", 0), FakeStrava)
+threading.Thread(target=_fake.serve_forever, daemon=True).start()
+
+os.environ["STRAVA_DATA_DIR"] = DATA_DIR
+os.environ["STRAVA_API_URL"] = f"http://127.0.0.1:{_fake.server_address[1]}/api/v3"
+os.environ["STRAVA_WEBHOOK_VERIFY_TOKEN"] = VERIFY_TOKEN
+
+
+def pytest_sessionfinish(session, exitstatus):
+    _fake.shutdown()
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+def owned_by(owner_id: int, activities: list[dict]) -> list[dict]:
+    """activities with the athlete reference Strava includes in each one."""
+    return [dict(a, athlete={"id": owner_id, "resource_state": 1}) for a in activities]
+
+
+def write_athlete(athlete_id: str, activities: list[dict]) -> str:
+    """An athlete shard holding activities.json and tokens that never expire."""
+    directory = os.path.join(DATA_DIR, "athletes", athlete_id)
+    os.makedirs(directory)
+    with open(os.path.join(directory, "activities.json"), "w") as f:
+        json.dump(activities, f)
+    with open(os.path.join(directory, ".env"), "w") as f:
+        f.write("CLIENT_ID=1\nCLIENT_SECRET=x\nACCESS_TOKEN=x\nREFRESH_TOKEN=x\n")
+        f.write(f"EXPIRES_AT={int(time.time()) + 10 * 365 * 86400}\n")
+    return directory
+
+
+@pytest.fixture
+def fake_strava() -> dict[int, dict]:
+    """The activities the stand-in serves, emptied after each test."""
+    yield FakeStrava.activities
+    FakeStrava.activities.clear()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    return TestClient(app)
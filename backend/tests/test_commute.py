@@ -0,0 +1,31 @@
+"""Commute detection: the numpy and pure Python passes agree with is_commute()."""
+
+import random
+
+import pytest
+
+from benchmarks.synthetic import generate_activities
+from strava import commute
+from strava.commute import CommuteDetector, PlaceDistances
+
+pytest.importorskip("numpy")
+
+
+def _team_detector() -> CommuteDetector:
+    rng = random.Random(1)
+    extra = [
+        {"name": f"site {i}", "lat": 50 + rng.uniform(-1, 1), "lon": 4 + rng.uniform(-1, 1)}
+        for i in range(6)
+    ]
+    return CommuteDetector(places=CommuteDetector().places + extra, radius_km=5)
+
+
+@pytest.mark.parametrize("detector", [CommuteDetector(), _team_detector()])
+def test_numpy_and_python_routes_agree(detector, monkeypatch):
+    activities = generate_activities(3000)
+    vectorized = detector.routes(activities, PlaceDistances(activities))
+    monkeypatch.setattr(commute, "_numpy", lambda: None)
+    looped = detector.routes(activities, PlaceDistances(activities))
+    assert vectorized == looped
+    assert any(vectorized)
+    assert [r is not None for r in looped] == [detector.is_commute(a) for a in activities]
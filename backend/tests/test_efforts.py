@@ -0,0 +1,108 @@
+"""Best efforts: the window scans, and downloads that fail or run out of budget."""
+
+import json
+import time
+
+import requests
+
+from benchmarks.synthetic import generate_activities, generate_streams
+from strava.efforts import BestEfforts, farthest_in_duration, fastest_over_distance
+from strava.streams import DownloadBudget, StreamStore
+
+
+class FakeClient:
+    """Serves synthetic streams, answering 429 once `fail_after` downloads were made."""
+
+    def __init__(self, activities: list[dict], fail_after: int | None = None):
+        self._activities = {a["id"]: a for a in activities}
+        self._fail_after = fail_after
+        self.downloads = 0
+
+    def fetch_streams(self, activity_id):
+        if self._fail_after is not None and self.downloads >= self._fail_after:
+            raise requests.HTTPError("429 Client Error: Too Many Requests")
+        self.downloads += 1
+        return generate_streams(self._activities[int(activity_id)])
+
+
+def test_window_scans():
+    distance = [0, 100, 200, 400, 500, 600]
+    seconds = [0, 30, 50, 80, 120, 130]
+    # 200 m from index 2 to 3 takes 30 s, the fastest of any 200 m window
+    assert fastest_over_distance(distance, seconds, 200) == (30, 2, 3)
+    assert fastest_over_distance(distance, seconds, 1000) is None
+    assert farthest_in_duration(distance, seconds, 50) == (300, 1, 3)
+    assert farthest_in_duration(distance, seconds, 200) is None
+
+
+def test_failed_download_keeps_what_was_scanned(tmp_path):
+    activities = generate_activities(20)
+    client = FakeClient(activities, fail_after=5)
+    streams = StreamStore(str(tmp_path / "streams"), client, DownloadBudget(100, 60))
+    efforts = BestEfforts(str(tmp_path / "activities.efforts.json"))
+
+    assert efforts.update(activities, streams) == 5
+    # The next update resumes where the failed one stopped
+    client = FakeClient(activities)
+    streams = StreamStore(str(tmp_path / "streams"), client, DownloadBudget(100, 60))
+    reloaded = BestEfforts(str(tmp_path / "activities.efforts.json"))
+    assert len(reloaded) == 5
+    scanned = reloaded.update(activities, streams)
+    assert scanned == client.downloads == sum(1 for a in activities if a.get("distance")) - 5
+
+
+def test_budget_is_shared_across_updates(tmp_path):
+    activities = generate_activities(20)
+    client = FakeClient(activities)
+    budget = DownloadBudget(8, 60)
+    efforts = BestEfforts(str(tmp_path / "activities.efforts.json"))
+
+    streams = StreamStore(str(tmp_path / "streams"), client, budget)
+    assert efforts.update(activities, streams, limit=5) == 5
+    streams = StreamStore(str(tmp_path / "streams"), client, budget)
+    assert efforts.update(activities, streams, limit=5) == 3
+    assert client.downloads == 8
+    assert efforts.update(activities, streams) == 0
+
+
+def test_budget_window_moves_on():
+    budget = DownloadBudget(2, 0.05)
+    assert budget.take() and budget.take()
+    assert not budget.take()
+    time.sleep(0.06)
+    assert budget.take()
+
+
+def test_corrupt_stream_file_is_skipped(tmp_path):
+    activities = [a for a in generate_activities(10) if a.get("distance")]
+    directory = tmp_path / "streams"
+    directory.mkdir()
+    for a in activities:
+        (directory / f"{a['id']}.json").write_text(json.dumps(generate_streams(a)))
+    # Truncated by a full disk or a copy gone wrong
+    (directory / f"{activities[0]['id']}.json").write_text('{"distance": {"data": [0.0, 1')
+    efforts = BestEfforts(str(tmp_path / "activities.efforts.json"))
+    assert efforts.update(activities, StreamStore(str(directory))) == len(activities) - 1
+
+
+class CountingBudget(DownloadBudget):
+    def __init__(self, limit: int, window: float):
+        super().__init__(limit, window)
+        self.asked = 0
+
+    def take(self) -> bool:
+        self.asked += 1
+        return super().take()
+
+
+def test_refused_download_ends_the_update(tmp_path):
+    activities = generate_activities(20)
+    client = FakeClient(activities)
+    budget = CountingBudget(2, 60)
+    efforts = BestEfforts(str(tmp_path / "activities.efforts.json"))
+    streams = StreamStore(str(tmp_path / "streams"), client, budget)
+    assert efforts.update(activities, streams, limit=5) == 2
+    # Two downloads and one refusal; refusals are not counted as downloads
+    assert (budget.asked, client.downloads) == (3, 2)
+    streams = StreamStore(str(tmp_path / "streams"), client, DownloadBudget(100, 60))
+    assert efforts.update(activities, streams, limit=5) == 5
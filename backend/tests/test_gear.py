@@ -0,0 +1,78 @@
+"""Gear ledger: kept in step with storage, including saves that bypass the API."""
+
+import itertools
+import time
+
+import pytest
+
+from benchmarks.synthetic import generate_activities
+from conftest import owned_by, write_athlete
+from strava.gear import GearLedger, gear_path_for
+from strava.snapshot import source_signature
+from strava.webhook import WebhookEvent
+
+_owner_ids = itertools.count(2000)
+
+
+def _fresh_gear(storage, tmp_path) -> list[dict]:
+    ledger = GearLedger(str(tmp_path / "fresh.gear.json"))
+    ledger.sync(storage.load(), source_signature(storage.path))
+    return ledger.all_gear()
+
+
+def _saved_elsewhere(storage) -> int:
+    """Rewrite storage like main.py --fetch does; returns the edited activity id."""
+    activities = [dict(a) for a in storage.load()]
+    edited = next(a for a in activities if a.get("gear_id"))
+    edited["distance"] += 50_000
+    # A distinct mtime even on coarse clocks
+    time.sleep(0.01)
+    storage.save(activities)
+    return edited["id"]
+
+
+@pytest.fixture(params=["json", "journal"])
+def athlete(request, monkeypatch):
+    monkeypatch.setattr("strava.storage.STORAGE_BACKEND", request.param)
+    owner_id = next(_owner_ids)
+    write_athlete(str(owner_id), owned_by(owner_id, generate_activities(300, seed=owner_id)))
+    return owner_id
+
+
+def test_gear_route_rebuilds_after_an_outside_save(athlete, client, tmp_path):
+    from api.loader import registry
+
+    athlete_id = str(athlete)
+    assert client.get("/gear", params={"athlete": athlete_id}).json()["gear"]
+    storage = registry.storage(athlete_id)
+    _saved_elsewhere(storage)
+    gear = client.get("/gear", params={"athlete": athlete_id}).json()["gear"]
+    assert gear == _fresh_gear(storage, tmp_path)
+
+
+def test_webhook_rebuilds_after_an_outside_save(athlete, client, fake_strava, tmp_path):
+    from api.loader import registry
+    from api.routes.webhook import apply_event
+
+    athlete_id = str(athlete)
+    client.get("/gear", params={"athlete": athlete_id})
+    registry.get(athlete_id)
+    storage = registry.storage(athlete_id)
+    edited_id = _saved_elsewhere(storage)
+    # An event for another activity: its change set alone would miss the outside edit
+    activity = next(dict(a) for a in storage.load() if a["id"] != edited_id)
+    fake_strava[activity["id"]] = dict(activity, name="Renamed")
+    event = WebhookEvent.from_payload({
+        "object_type": "activity", "object_id": activity["id"], "aspect_type": "update",
+        "owner_id": athlete, "subscription_id": 1, "updates": {},
+        "event_time": int(time.time()),
+    })
+    assert apply_event(event) == "applied"
+    ledger = GearLedger(gear_path_for(storage.path))
+    assert ledger.source == source_signature(storage.path)
+    assert ledger.all_gear() == _fresh_gear(storage, tmp_path)
+    # The snapshot was patched from what is stored, not from the stale dataset
+    activities = registry.get(athlete_id).activities
+    row = activities.rows_of([edited_id])[edited_id]
+    stored = next(a for a in storage.load() if a["id"] == edited_id)
+    assert activities[row]["distance"] == stored["distance"]
@@ -0,0 +1,51 @@
+"""ActivityIndex: date bounds and cursor pagination."""
+
+from datetime import datetime
+
+from benchmarks.synthetic import generate_activities
+from strava.filter import ActivityFilter
+from strava.index import ActivityIndex
+
+ACTIVITIES = [
+    {"id": 1, "start_date": "2025-01-01T10:00:00Z", "sport_type": "Ride"},
+    {"id": 2, "start_date": "2025-01-01T10:00:01Z", "sport_type": "Ride"},
+    {"id": 3, "start_date": "2025-01-01T10:00:02Z", "sport_type": "Run"},
+]
+
+
+def _ids(positions: list[int]) -> list[int]:
+    return [ACTIVITIES[i]["id"] for i in positions]
+
+
+def test_sub_second_bounds():
+    index = ActivityIndex(ACTIVITIES)
+    half_past = datetime(2025, 1, 1, 10, 0, 0, 500_000)
+    # after is inclusive: 10:00:00 started before 10:00:00.5
+    assert _ids(index.query(after=half_past, descending=False)[0]) == [2, 3]
+    # before is exclusive: 10:00:00 started before 10:00:00.5, 10:00:01 did not
+    assert _ids(index.query(before=half_past)[0]) == [1]
+    assert _ids(index.query(before=datetime(2025, 1, 1, 10, 0, 1))[0]) == [1]
+
+
+def test_bounds_agree_with_the_filter():
+    activities = generate_activities(500)
+    index = ActivityIndex(activities)
+    after, before = datetime(2023, 3, 4, 5, 6, 7, 890_000), datetime(2024, 6, 7, 8, 9, 10, 120_000)
+    positions, _ = index.query(after=after, before=before, limit=len(activities))
+    expected = ActivityFilter(activities).by_date_range(after, before).activities
+    assert sorted(activities[i]["id"] for i in positions) == sorted(a["id"] for a in expected)
+
+
+def test_cursor_pages_cover_everything_once():
+    activities = generate_activities(230)
+    index = ActivityIndex(activities)
+    seen, cursor = [], None
+    while True:
+        page, cursor = index.query(sport="Ride", cursor=cursor, limit=50)
+        seen += page
+        if cursor is None:
+            break
+    rides = [i for i, a in enumerate(activities) if a["sport_type"] == "Ride"]
+    assert sorted(seen) == sorted(rides)
+    starts = [activities[i]["start_date"] for i in seen]
+    assert starts == sorted(starts, reverse=True)
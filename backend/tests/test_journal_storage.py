@@ -0,0 +1,95 @@
+"""Journaled storage: same results as activities.json, torn batches and compaction."""
+
+import os
+
+import pytest
+
+from benchmarks.synthetic import generate_activities
+from strava import journal_storage
+from strava.activity import to_dict
+from strava.athletes import activities_path
+from strava.journal_storage import JournalActivityStorage
+from strava.storage import ActivityStorage, open_storage
+
+
+def _contents(storage) -> dict[int, dict]:
+    return {a["id"]: to_dict(a) for a in storage.load()}
+
+
+def _reloaded(storage) -> dict[int, dict]:
+    """What another process would read: the in-memory journal is dropped first."""
+    JournalActivityStorage._journals.pop(os.path.abspath(storage.path), None)
+    return _contents(JournalActivityStorage(storage.path))
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """A JSON and a journal store, both seeded from the same activities.json."""
+    activities = generate_activities(300)
+    ActivityStorage(activities_path(str(tmp_path), "a")).save(activities)
+    json_store = open_storage(str(tmp_path), "a", backend="json")
+    journal = open_storage(str(tmp_path), "a", backend="journal")
+    return json_store, journal, activities
+
+
+def _edits(activities: list[dict], round_: int) -> tuple[list[dict], list[int]]:
+    changed = [dict(a, name=f"{a['name']} ({round_})") for a in activities[round_::7][:10]]
+    created = generate_activities(3, seed=100 + round_)
+    for i, a in enumerate(created):
+        a["id"] = 10**9 + round_ * 10 + i
+    deleted = [a["id"] for a in activities[round_ + 3::11][:5]]
+    return changed + created, deleted
+
+
+def test_seeded_from_json(stores):
+    json_store, journal, _ = stores
+    assert _contents(journal) == _contents(json_store)
+    assert _reloaded(journal) == _contents(json_store)
+
+
+def test_changes_match_the_json_backend(stores):
+    json_store, journal, activities = stores
+    for round_ in range(3):
+        upserts, deleted = _edits(activities, round_)
+        assert journal.upsert(upserts) == json_store.upsert(upserts)
+        assert journal.delete(deleted) == json_store.delete(deleted)
+    # Writing what is stored, or deleting what is gone, changes nothing
+    assert journal.upsert([to_dict(a) for a in journal.load()[:20]]) == 0
+    assert journal.delete(deleted) == 0
+    assert _contents(journal) == _contents(json_store)
+    assert _reloaded(journal) == _contents(json_store)
+
+
+def test_torn_batch_is_ignored_and_cut_off(stores):
+    json_store, journal, activities = stores
+    expected = _contents(json_store)
+    with open(journal.path, "ab") as f:
+        # A crash halfway through a record: no newline, no commit
+        f.write(b'0badc0de {"put":{"id":1,"na')
+    assert _reloaded(journal) == expected
+
+    journal = JournalActivityStorage(journal.path)
+    upserts, _ = _edits(activities, 0)
+    journal.upsert(upserts)
+    json_store.upsert(upserts)
+    assert _reloaded(journal) == _contents(json_store)
+    with open(journal.path, "rb") as f:
+        assert b"0badc0de" not in f.read()
+
+
+def test_sealed_segments_are_compacted(stores, monkeypatch):
+    json_store, journal, activities = stores
+    monkeypatch.setattr(journal_storage, "SEGMENT_BYTES", 4096)
+    for round_ in range(6):
+        upserts, deleted = _edits(activities, round_)
+        journal.upsert(upserts)
+        json_store.upsert(upserts)
+        journal.delete(deleted)
+        json_store.delete(deleted)
+    # Wait for the compactions the rotations queued
+    journal_storage._compactor.submit(lambda: None).result()
+
+    assert os.path.exists(os.path.splitext(journal.path)[0] + ".base.json")
+    assert journal._segments() == []
+    assert _contents(journal) == _contents(json_store)
+    assert _reloaded(journal) == _contents(json_store)
@@ -0,0 +1,64 @@
+"""ParallelStats: same results as the single-process code, and snapshot generations."""
+
+import pytest
+
+from benchmarks.synthetic import generate_activities
+from strava.commute import CommuteDetector
+from strava.parallel import ParallelStats, SnapshotChanged, _run_partition
+from strava.snapshot import SnapshotActivities, write_snapshot
+from strava.stats import ActivityStats
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "activities.snapshot")
+    write_snapshot(generate_activities(2000), path)
+    return SnapshotActivities(path)
+
+
+def _close(a: dict, b: dict) -> bool:
+    return a.keys() == b.keys() and all(
+        _close(a[k], b[k]) if isinstance(a[k], dict) else a[k] == pytest.approx(b[k]) for k in a
+    )
+
+
+@pytest.mark.parametrize("partition", ["chunks", "year"])
+def test_matches_single_process(snapshot, partition):
+    parallel = ParallelStats(snapshot, workers=3, partition=partition, min_parallel_size=0)
+    stats = ActivityStats(snapshot)
+    assert _close(parallel.total_km_by_sport(), stats.total_km_by_sport())
+    assert _close(parallel.total_km_by_year_and_sport(), stats.total_km_by_year_and_sport())
+    detector = CommuteDetector()
+    ids = [row["id"] for row in parallel.commute_activities(detector)]
+    assert ids == [row["id"] for row in detector.get_commute_activities(snapshot)]
+
+
+def test_worker_refuses_another_generation(snapshot):
+    with pytest.raises(SnapshotChanged):
+        task = (snapshot.path, snapshot.generation + 1, range(10))
+        _run_partition(task, "total_km_by_sport", None)
+
+
+def test_rebuilt_snapshot_falls_back_to_the_parent(snapshot):
+    expected = ActivityStats(snapshot).total_km_by_sport()
+    parallel = ParallelStats(snapshot, workers=2, min_parallel_size=0)
+    # A newer, smaller generation replaces the file the workers would open
+    write_snapshot(generate_activities(10, seed=1), snapshot.path)
+    assert _close(parallel.total_km_by_sport(), expected)
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_cli_pools_only_in_memory_backends(backend, tmp_path, monkeypatch, capsys):
+    import main
+    from strava.athletes import activities_path
+    from strava.storage import ActivityStorage
+
+    ActivityStorage(activities_path(str(tmp_path), "cli")).save(generate_activities(300))
+    monkeypatch.setattr(main, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr("strava.storage.STORAGE_BACKEND", backend)
+    monkeypatch.setattr("sys.argv", ["main.py", "--athlete", "cli"])
+    built = []
+    monkeypatch.setattr(main, "ParallelStats", lambda a: built.append(a) or ParallelStats(a))
+    main.main()
+    assert "--- Commute activities in 2025 ---" in capsys.readouterr().out
+    assert len(built) == (backend == "json")
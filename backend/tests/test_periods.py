@@ -0,0 +1,55 @@
+"""Reporting periods and the report month checks of the CLI and API."""
+
+import os
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+from strava.periods import MAX_YEAR, MIN_YEAR, ReportingPeriods
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_default_cutoff_periods():
+    periods = ReportingPeriods(20)
+    assert periods.date_range(2026, 1) == (date(2025, 12, 21), date(2026, 1, 20))
+    assert periods.period_of(date(2025, 12, 20)) == (2025, 12)
+    assert periods.period_of(date(2025, 12, 21)) == (2026, 1)
+
+
+def test_cutoff_is_clamped_to_the_month():
+    periods = ReportingPeriods(31)
+    assert periods.date_range(2025, 2) == (date(2025, 2, 1), date(2025, 2, 28))
+    assert periods.date_range(2025, 3) == (date(2025, 3, 1), date(2025, 3, 31))
+
+
+def test_invalid_cutoff():
+    with pytest.raises(ValueError):
+        ReportingPeriods(0)
+
+
+@pytest.mark.parametrize("month", ["2025-13", "2025-0", "2025-x", "1-1", "0-5", "10000-1"])
+def test_cli_rejects_invalid_report_month(month):
+    result = subprocess.run(
+        [sys.executable, "main.py", "--report", month],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert "Use --report YYYY-MM" in result.stdout
+    assert "Traceback" not in result.stderr
+
+
+@pytest.mark.parametrize("year, month", [(2025, 13), (2025, 0), (1, 1), (10000, 1)])
+def test_api_rejects_invalid_report_month(client, year, month):
+    response = client.get("/activities/report", params={"year": year, "month": month})
+    assert response.status_code == 422
+
+
+def test_periods_at_the_year_bounds():
+    periods = ReportingPeriods()
+    assert periods.date_range(MIN_YEAR, 1)[0] == date(MIN_YEAR - 1, 12, 21)
+    assert periods.date_range(MAX_YEAR, 12)[1] == date(MAX_YEAR, 12, 20)
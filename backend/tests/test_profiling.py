@@ -0,0 +1,36 @@
+"""Request profiling middleware: the sampler always stops."""
+
+import asyncio
+
+import pytest
+
+
+class BrokenStore:
+    def save_folded(self, name, folded, meta):
+        raise RuntimeError("profile store broke")
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def _request(middleware):
+    scope = {"type": "http", "path": "/x", "method": "GET", "query_string": b"", "headers": []}
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+
+
+def test_sampler_stops_when_saving_fails():
+    from api.profiling import ProfilingMiddleware
+
+    middleware = ProfilingMiddleware(_ok, store=BrokenStore(), slow_ms=1e-9)
+    with pytest.raises(RuntimeError):
+        _request(middleware)
+    assert middleware.sampler.active == 0
@@ -0,0 +1,57 @@
+"""ActivityStorage: parsed once per instance, reparsed when the file changes."""
+
+import gc
+
+from benchmarks.synthetic import generate_activities
+from conftest import write_athlete
+from strava.activity import Activity
+from strava.storage import ActivityStorage
+
+
+def _resident_activities() -> int:
+    gc.collect()
+    return sum(1 for o in gc.get_objects() if isinstance(o, Activity))
+
+
+def test_repeated_loads_reuse_the_parse(tmp_path):
+    storage = ActivityStorage(str(tmp_path / "activities.json"))
+    storage.save(generate_activities(50))
+    assert storage.load() is storage.load()
+    assert storage.get_sport_types() == sorted({a["sport_type"] for a in storage.load()})
+
+
+def test_file_rewritten_elsewhere_is_reparsed(tmp_path):
+    path = str(tmp_path / "activities.json")
+    storage = ActivityStorage(path)
+    storage.save(generate_activities(50))
+    first = storage.load()
+    ActivityStorage(path).save(generate_activities(60))
+    assert len(storage.load()) == 60
+    assert storage.load() is not first
+
+
+def test_registry_keeps_no_parsed_copy(monkeypatch):
+    from api.loader import registry
+
+    monkeypatch.setattr("strava.storage.STORAGE_BACKEND", "json")
+    write_athlete("parse-cache", generate_activities(200))
+    before = _resident_activities()
+    assert len(registry.get("parse-cache").activities) == 200
+    # Only the snapshot stays resident: the activities parsed to build it are freed
+    assert _resident_activities() == before
+
+
+def test_eviction_releases_the_replayed_journal(monkeypatch):
+    from api.loader import DATA_DIR, DatasetRegistry
+    from strava.journal_storage import JournalActivityStorage
+
+    monkeypatch.setattr("strava.storage.STORAGE_BACKEND", "journal")
+    registry = DatasetRegistry(DATA_DIR, 1)
+    for athlete in ("evicted", "resident"):
+        write_athlete(athlete, generate_activities(50))
+        registry.get(athlete)
+        registry.storage(athlete).load()
+    journals = JournalActivityStorage._journals
+    assert registry.peek("evicted") is None
+    assert registry.storage("evicted").path not in journals
+    assert any(path.endswith("resident/activities.journal") for path in journals)
@@ -0,0 +1,31 @@
+"""Post-sync warm-up: which reports it renders, and that it leaves user renders alone."""
+
+from benchmarks.synthetic import generate_activities
+from conftest import write_athlete
+from strava.commute import CommuteDetector
+
+
+def test_only_recent_reports_are_warmed_up():
+    from api.loader import registry
+    from api.routes.activities import _warmup_tasks
+    from api.warmup import WARMUP_REPORTS
+
+    write_athlete("warmup", generate_activities(200))
+    dataset = registry.get("warmup")
+    period_keys = [(y, m) for y in (2023, 2024, 2025) for m in range(1, 13)]
+    labels = [label for label, _ in _warmup_tasks(dataset, CommuteDetector(), period_keys)]
+    reports = [label for label in labels if label.startswith("report ")]
+    assert reports == ["report 2025-12", "report 2025-11", "report 2025-10"][:WARMUP_REPORTS]
+    # Aggregates come before any report
+    assert labels[: len(labels) - len(reports)] == [
+        "monthly-totals", "commutes", "commute-months", "commute-periods"
+    ]
+
+
+def test_warmup_renders_do_not_take_user_slots():
+    from api.singleflight import bounded_render, warmup_render_slots
+
+    with warmup_render_slots:
+        # A user's download still renders while the warm-up slot is busy
+        assert bounded_render(lambda x: x * 2, 21) == 42
+        assert not warmup_render_slots.acquire(blocking=False)
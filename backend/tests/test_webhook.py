@@ -0,0 +1,229 @@
+"""Webhook ingestion against the local Strava stand-in.
+
+Create, update and delete events are applied to a dashboard that has already been
+visited, so derived caches are patched rather than rebuilt. Everything must then
+match a fresh full load of the same stored activities.
+"""
+
+import itertools
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks.synthetic import generate_activities
+from conftest import DATA_DIR, VERIFY_TOKEN, FakeStrava, owned_by, write_athlete
+from strava.activity import to_dict
+from strava.changes import ChangeSet, diff_activities
+from strava.commute import CommuteDetector
+from strava.periods import ReportingPeriods
+from strava.snapshot import FIELDS, SnapshotActivities, snapshot_path_for
+from strava.webhook import WebhookEvent, stored_fields
+
+BACKENDS = ("json", "sqlite", "journal")
+# Each test gets its own Strava owner id, so the shared registry never mixes them
+_owner_ids = itertools.count(1000)
+# Files derived from storage, left out when a fresh load is wanted
+DERIVED = ("*.snapshot*", "*.summary.json", "*.changes.json", "*.gear.json", "*.efforts.json")
+
+
+def _event(activity_id: int, aspect: str, owner_id: int) -> WebhookEvent:
+    return WebhookEvent.from_payload({
+        "object_type": "activity", "object_id": activity_id, "aspect_type": aspect,
+        "owner_id": owner_id, "subscription_id": 1, "updates": {},
+        "event_time": int(time.time()),
+    })
+
+
+def _rounded(value):
+    # Running sums and fresh sums may differ in the last bits of a float
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {k: _rounded(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_rounded(v) for v in value]
+    return value
+
+
+def _views(client, athlete: str) -> dict:
+    """What a dashboard shows, in a comparable form."""
+    params = {"athlete": athlete}
+    totals = client.get("/activities/monthly-totals", params=params).json()
+    return _rounded({
+        "monthly-totals": sorted(totals, key=lambda r: (r["year"], r["month"], r["sport_type"])),
+        "commute-months": client.get("/activities/commute-months", params=params).json(),
+        "commute-periods": client.get("/activities/commute-periods", params=params).json(),
+        "search": client.get(
+            "/activities/search", params={**params, "q": "webhook"}
+        ).json()["results"],
+        "gear": client.get("/gear", params=params).json(),
+    })
+
+
+@pytest.fixture(params=BACKENDS)
+def athlete(request, monkeypatch, fake_strava):
+    """A visited athlete of the given storage backend, also served by the stand-in."""
+    monkeypatch.setattr("strava.storage.STORAGE_BACKEND", request.param)
+    owner_id = next(_owner_ids)
+    activities = owned_by(owner_id, generate_activities(400, seed=owner_id))
+    write_athlete(str(owner_id), activities)
+    fake_strava.update({a["id"]: a for a in activities})
+    return owner_id
+
+
+def test_events_match_a_fresh_load(athlete, client, fake_strava):
+    from api.loader import registry
+    from api.routes.webhook import apply_event
+
+    athlete_id = str(athlete)
+    _views(client, athlete_id)
+    before = [to_dict(a) for a in registry.storage(athlete_id).load()]
+    version = registry.get(athlete_id).version
+
+    # A new activity, an edit that changes distance, name and gear, and a deletion
+    start = datetime(2026, 1, 15, tzinfo=timezone.utc)
+    created = owned_by(athlete, generate_activities(1, seed=7, start=start))[0]
+    created["id"] = max(fake_strava) + 1
+    fake_strava[created["id"]] = created
+    # Commutes, so that the commute views have rows to patch
+    detector = CommuteDetector()
+    edited_id, deleted_id = [a["id"] for a in before if detector.is_commute(a)][:2]
+    edited = fake_strava[edited_id]
+    fake_strava[edited_id] = dict(
+        edited,
+        name=f"{edited['name']} webhook edit",
+        distance=edited["distance"] * 1.5,
+        gear_id="b7654321" if edited.get("gear_id") != "b7654321" else "b1234567",
+    )
+    del fake_strava[deleted_id]
+    events = [(created["id"], "create"), (edited_id, "update"), (deleted_id, "delete")]
+    for activity_id, aspect in events:
+        assert apply_event(_event(activity_id, aspect, athlete)) == "applied"
+    # Replayed events change nothing
+    assert apply_event(_event(edited_id, "update", athlete)) == "unchanged"
+    assert apply_event(_event(deleted_id, "delete", athlete)) == "unchanged"
+
+    storage = registry.storage(athlete_id)
+    stored = {a["id"]: a for a in map(to_dict, storage.load())}
+    written = {created["id"], edited_id}
+    assert stored == {
+        i: stored_fields(FakeStrava.detail(a)) if i in written else a
+        for i, a in fake_strava.items()
+    }
+
+    # One snapshot generation per applied event, holding what storage holds
+    snapshot = SnapshotActivities(snapshot_path_for(storage.path))
+    assert snapshot.generation == version + len(events)
+    rows = {snapshot[i]["id"]: snapshot[i] for i in range(len(snapshot))}
+    assert rows.keys() == stored.keys()
+    for activity_id, row in rows.items():
+        assert {f: row.get(f) for f in FIELDS} == {f: stored[activity_id].get(f) for f in FIELDS}
+
+    # The change log covers exactly what the events changed
+    changes = client.get(
+        "/activities/changes", params={"since": version, "athlete": athlete_id}
+    ).json()
+    expected = diff_activities(
+        before, list(stored.values()), detector, ReportingPeriods().period_of
+    )
+    assert changes["version"] == snapshot.generation
+    assert not changes["reset"]
+    assert set(changes["updated_ids"]) == expected.updated == written
+    assert set(changes["deleted_ids"]) == expected.deleted == {deleted_id}
+    buckets = {(r["year"], r["month"], r["sport_type"]) for r in changes["monthly_totals"]}
+    assert buckets == expected.buckets
+    assert {(r["year"], r["month"]) for r in changes["commute_months"]} == expected.commute_periods
+
+    live = _views(client, athlete_id)
+    assert all(live.values()), "every view has something to compare"
+    fresh_id = f"{athlete_id}-fresh"
+    shutil.copytree(
+        os.path.join(DATA_DIR, "athletes", athlete_id),
+        os.path.join(DATA_DIR, "athletes", fresh_id),
+        ignore=shutil.ignore_patterns(*DERIVED),
+    )
+    fresh = _views(client, fresh_id)
+    for view in live:
+        assert live[view] == fresh[view], view
+
+
+def test_event_for_unknown_activity_is_a_deletion(athlete, client):
+    from api.loader import registry
+    from api.routes.webhook import apply_event
+
+    athlete_id = str(athlete)
+    count = len(registry.get(athlete_id).activities)
+    # Created and deleted again before the event was handled: nothing to store
+    assert apply_event(_event(10**12, "create", athlete)) == "unchanged"
+    assert len(registry.get(athlete_id).activities) == count
+
+
+def test_changeset_merge_keeps_latest_state():
+    first, second = ChangeSet(), ChangeSet()
+    first.updated, second.deleted = {1, 2}, {2}
+    first.merge(second)
+    assert (first.updated, first.deleted) == ({1}, {2})
+
+
+def test_subscription_handshake(client):
+    params = {"hub.mode": "subscribe", "hub.challenge": "42"}
+    ok = client.get("/webhook", params={**params, "hub.verify_token": VERIFY_TOKEN})
+    assert ok.status_code == 200
+    assert ok.json() == {"hub.challenge": "42"}
+    assert client.get("/webhook", params={**params, "hub.verify_token": "wrong"}).status_code == 403
+
+
+def test_posted_events_are_queued_and_applied(athlete, client, fake_strava):
+    from api.loader import registry
+
+    athlete_id = str(athlete)
+    registry.get(athlete_id)
+    activity_id = next(iter(fake_strava))
+    fake_strava[activity_id] = dict(fake_strava[activity_id], name="Renamed by webhook")
+    handled = sum(client.get("/webhook/status").json()["outcomes"].values())
+
+    response = client.post("/webhook", json=_event(activity_id, "update", athlete).to_dict())
+    assert response.json() == {"queued": True}
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        status = client.get("/webhook/status").json()
+        if status["pending"] == 0 and sum(status["outcomes"].values()) > handled:
+            break
+        time.sleep(0.01)
+    assert status["last"]["outcome"] == "applied", status["last"]
+    stored = {a["id"]: a for a in registry.storage(athlete_id).load()}
+    assert stored[activity_id]["name"] == "Renamed by webhook"
+
+
+def test_malformed_event_is_rejected(client):
+    assert client.post("/webhook", json={"object_type": "activity"}).status_code == 400
+    assert client.post("/webhook", json=[1, 2]).status_code == 400
+
+
+def test_event_of_unknown_owner_is_ignored(client, fake_strava):
+    from api.loader import registry
+    from api.routes.webhook import apply_event
+
+    # No athletes/<owner>/ shard, and not the default athlete's Strava id
+    owner_id = next(_owner_ids)
+    activity = owned_by(owner_id, generate_activities(1, seed=owner_id))[0]
+    fake_strava[activity["id"]] = activity
+    assert apply_event(_event(activity["id"], "create", owner_id)) == "ignored"
+    assert not os.path.exists(registry.storage("default").path)
+
+
+def test_activity_of_another_owner_is_ignored(athlete, client, fake_strava):
+    from api.loader import registry
+    from api.routes.webhook import apply_event
+
+    athlete_id = str(athlete)
+    stored = {a["id"]: a for a in registry.storage(athlete_id).load()}
+    # The event claims this athlete, but the fetched activity is someone else's
+    foreign = owned_by(athlete + 1, generate_activities(1, seed=3))[0]
+    foreign["id"] = max(fake_strava) + 1
+    fake_strava[foreign["id"]] = foreign
+    assert apply_event(_event(foreign["id"], "create", athlete)) == "ignored"
+    assert {a["id"] for a in registry.storage(athlete_id).load()} == stored.keys()
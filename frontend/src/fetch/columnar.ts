@@ -0,0 +1,32 @@
+// Decoder for the `format=columnar` responses of the aggregate endpoints:
+// parallel arrays, with dictionary-encoded columns sent as indexes.
+
+export interface ColumnarPayload {
+    length: number
+    columns: Record<string, unknown[]>
+    dictionaries: Record<string, unknown[]>
+}
+
+export const MONTH_NAMES = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December',
+]
+
+export const decodeColumnar = <T>(payload: ColumnarPayload): T[] => {
+    const fields = Object.keys(payload.columns)
+    const columns = fields.map((field) => {
+        const values = payload.columns[field]
+        const dictionary = payload.dictionaries[field]
+        return dictionary ? values.map((code) => dictionary[code as number]) : values
+    })
+    const rows: T[] = new Array(payload.length)
+    for (let i = 0; i < payload.length; i++) {
+        const row: Record<string, unknown> = {}
+        for (let f = 0; f < fields.length; f++) row[fields[f]] = columns[f][i]
+        rows[i] = row as T
+    }
+    return rows
+}
+
+export const periodLabel = (year: number, month: number): string =>
+    `${MONTH_NAMES[month - 1]} ${year}`
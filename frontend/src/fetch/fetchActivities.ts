@@ -1,3 +1,5 @@
+import { type ColumnarPayload, MONTH_NAMES, decodeColumnar, periodLabel } from './columnar'
+
 const API_URL = 'http://localhost:8000/'
 const ACTIVITIES_ENDPOINT = 'activities'
 
@@ -10,8 +12,12 @@ export interface MonthlyRow {
 }
 
 export const fetchMonthlyTotals = async (): Promise<MonthlyRow[]> => {
-    const response = await fetch(`${API_URL}${ACTIVITIES_ENDPOINT}/monthly-totals`)
-    return response.json()
+    const response = await fetch(`${API_URL}${ACTIVITIES_ENDPOINT}/monthly-totals?format=columnar`)
+    const payload: ColumnarPayload = await response.json()
+    return decodeColumnar<Omit<MonthlyRow, 'month_name'>>(payload).map((row) => ({
+        ...row,
+        month_name: MONTH_NAMES[row.month - 1],
+    }))
 }
 
 export const triggerFetch = async (): Promise<{ fetched: number }> => {
@@ -30,9 +36,13 @@ export interface CommuteMonth {
 }
 
 export const fetchCommuteMonths = async (): Promise<CommuteMonth[]> => {
-    const response = await fetch(`${API_URL}${ACTIVITIES_ENDPOINT}/commute-months`)
+    const response = await fetch(`${API_URL}${ACTIVITIES_ENDPOINT}/commute-months?format=columnar`)
     if (!response.ok) throw new Error('Failed to fetch commute months')
-    return response.json()
+    const payload: ColumnarPayload = await response.json()
+    return decodeColumnar<Omit<CommuteMonth, 'label'>>(payload).map((row) => ({
+        ...row,
+        label: periodLabel(row.year, row.month),
+    }))
 }
 
 export const downloadReport = async (year: number, month: number): Promise<void> => {